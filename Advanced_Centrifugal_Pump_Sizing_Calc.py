@@ -5,34 +5,8 @@
 import tkinter as tk
 from tkinter import messagebox
 from Hydraulics_Script_Advanced_Core_Working import calculate_pressure_drop
-from thermo.chemical import Chemical
-from thermo.vapor_pressure import VaporPressure
-
-#--------Define Atmospheric Pressure at Altitude Given by User----------
-#---------Generally this is irrelevant, it has been built in for completeness only---------------
-def atmospheric_pressure(altitude_m):
-    """
-    Calculates atmospheric pressure in Pascals at a given altitude in meters,
-    using the barometric formula (valid up to ~11,000 m).
-    """
-    P0 = 101325      # sea level standard atmospheric pressure, Pa
-    T0 = 288.15      # sea level standard temperature, K
-    L = 0.0065       # temperature lapse rate, K/m
-    R = 8.314462618     # universal gas constant, J/(mol·K)
-    M = 0.02896968  # molar mass of Earth's air, kg/mol
-    g = 9.80665      # gravity, m/s^2
-
-    if altitude_m < 0:
-        altitude_m = 0  # Clamp negative altitudes to sea level
-
-    T = T0 - L * altitude_m
-    if T <= 0:
-        raise ValueError("Altitude too high causing non-physical temperature")
-
-    # barometric formula
-    P = P0 * (T / T0) ** (g * M / (R * L))
-    return P  # Pa
-
+from fluid_properties import get_property_table
+from Centrifugal_Pump_Sizing_Core import atmospheric_pressure, pump_sizing
 
 class FluidInputDialog(tk.Toplevel):
     def __init__(self, parent):
@@ -97,9 +71,10 @@ def get_fluid_info(root):
         fluid_name, min_temp, max_temp = dialog.result
 
         try:
-            fluid_min = Chemical(fluid_name, T=min_temp + 273.15)
-            density_min = fluid_min.rho
-            viscosity_min = fluid_min.mu * 1000  # Pa.s to cP
+            # Warm-started from the on-disk property store when this fluid and range were used before
+            fluid_table = get_property_table(fluid_name, min_temp + 273.15, max_temp + 273.15)
+            density_min = fluid_table.rho(min_temp + 273.15)
+            viscosity_min = fluid_table.mu(min_temp + 273.15) * 1000  # Pa.s to cP
         except Exception as e:
             messagebox.showerror("Calculation Error", f"Failed to calculate fluid properties at min temperature: {e}")
             root.destroy()
@@ -120,42 +95,6 @@ def get_fluid_info(root):
         exit()
     
 
-def pump_sizing(suction_pressure_drop_kPa, discharge_pressure_drop_kPa, flow_rate_m3hr, suction_elev_diff,total_elevation_diff, max_dest_pressure,density= 1000, efficiency=0.75, vapor_pressure_kPa= 6, altitude_m =400):
-    g = 9.81
-    margin = 1 # Define NPSH_a margin, usually 0.8-1m
-    Q_m3s = flow_rate_m3hr / 3600
-    atmospheric_Pa = atmospheric_pressure(altitude_m ) # Determines the atmospheric pressure
-    atmospheric_head = atmospheric_Pa/(density*g) # Converts atmospheric pressure (Pa) to head (m) using fluid density and grav. constant
-    vapor_pressure_head = (vapor_pressure_kPa*1000)/(density*g) # Converts vapor pressure (kPa) to (m) using fluid density and grav. constant
-    suction_loss_head = suction_pressure_drop_kPa*1000/(density*g) # Converts suction pressure drop (kPa) to (m) using fluid density and grav. constant
-    discharge_loss_head = discharge_pressure_drop_kPa*1000/(density*g) # Converts suction pressure drop (kPa) to (m) using fluid density and grav. constant 
-    max_req_dist_head= max_dest_pressure*1000/(density * g ) # Maximum head to be overcome (m) due to final destination pressure
-    #---------------------------------Calculate the NPSH_a including a 1 m margin------------- 
-    NPSH_a = atmospheric_head + suction_elev_diff - suction_loss_head -vapor_pressure_head # NPSH_a in m
-
-    #---------------Calculate dynamic head from pressure drop H = ΔP / (ρ g) and static elevation diff.------------
-    
-    total_dynamic_head_req = suction_loss_head + discharge_loss_head + total_elevation_diff + max_req_dist_head # Total dynamic head required in (m)
-    
-    #-------------------------------Calculate Requited Power------------------------------
-    
-    # Hydraulic power in Watts
-    power_hydraulic_W = density * g * Q_m3s * total_dynamic_head_req
-
-    if efficiency <= 0 or efficiency > 1:
-        raise ValueError("Pump efficiency should be between 0 and 1")
-
-    power_brake_W = power_hydraulic_W / efficiency
-
-    return {
-        "pump_head_m": total_dynamic_head_req,
-        "hydraulic_power_kW": power_hydraulic_W / 1000,
-        "brake_power_kW": power_brake_W / 1000,
-        "NPSHA": NPSH_a,
-        "NPSHA_margin_included": NPSH_a - margin
-    }
-
-
 def on_calculate(fluid_props):
     try:
         flow_rate = float(flow_rate_entry.get())
@@ -193,10 +132,11 @@ def on_calculate(fluid_props):
     viscosity = fluid_props["viscosity_cP"]
         # Calculate vapor pressure at max temp and altitude = pump centreline elevation
     try:
-        fluid_at_max = Chemical(fluid_props["fluid_name"], T=fluid_props["max_temp_C"] + 273.15)
-        # VaporPressure expects temperature in K and pressure returned in Pa
+        fluid_table = get_property_table(fluid_props["fluid_name"], fluid_props["min_temp_C"] + 273.15,
+                                         fluid_props["max_temp_C"] + 273.15)
+        # Vapour pressure (Psat) is returned in Pa
         # Adjust vapor pressure for atmospheric pressure at pump elevation:
-        vapor_pressure_Pa = fluid_at_max.VaporPressure(fluid_props["max_temp_C"] + 273.15)
+        vapor_pressure_Pa = fluid_table.Psat(fluid_props["max_temp_C"] + 273.15)
         
         # Atmospheric pressure at pump centreline elevation:
         atm_pressure_Pa = atmospheric_pressure(pump_centreline)
@@ -0,0 +1,65 @@
+# Centrifugal Pump Sizing Core
+# Built by Louis Walker, Process Engineer, 2025
+# This script takes only the core working code from the centrifugal pump sizing programs
+# It removes all inputs and pop_ups so it can be used headless (no tkinter or matplotlib needed)
+
+
+#--------Define Atmospheric Pressure at Altitude Given by User----------
+def atmospheric_pressure(altitude_m):
+    """
+    Calculates atmospheric pressure in Pascals at a given altitude in meters,
+    using the barometric formula (valid up to ~11,000 m).
+    """
+    P0 = 101325      # sea level standard atmospheric pressure, Pa
+    T0 = 288.15      # sea level standard temperature, K
+    L = 0.0065       # temperature lapse rate, K/m
+    R = 8.314462618     # universal gas constant, J/(mol·K)
+    M = 0.02896968  # molar mass of Earth's air, kg/mol
+    g = 9.80665      # gravity, m/s^2
+
+    if altitude_m < 0:
+        altitude_m = 0  # Clamp negative altitudes to sea level
+
+    T = T0 - L * altitude_m
+    if T <= 0:
+        raise ValueError("Altitude too high causing non-physical temperature")
+
+    # barometric formula
+    P = P0 * (T / T0) ** (g * M / (R * L))
+    return P  # Pa
+
+
+def pump_sizing(suction_pressure_drop_kPa, discharge_pressure_drop_kPa, flow_rate_m3hr, suction_elev_diff,
+                total_elevation_diff, max_dest_pressure, density=1000, efficiency=0.75, 
+                vapor_pressure_kPa=6, altitude_m=400):
+    g = 9.81
+    margin = 1 # Define NPSH_a margin, usually 0.8-1m
+    Q_m3s = flow_rate_m3hr / 3600
+    atmospheric_Pa = atmospheric_pressure(altitude_m) # Determines the atmospheric pressure
+    atmospheric_head = atmospheric_Pa/(density*g) # Converts atmospheric pressure (Pa) to head (m)
+    vapor_pressure_head = (vapor_pressure_kPa*1000)/(density*g) # Converts vapor pressure (kPa) to (m)
+    suction_loss_head = suction_pressure_drop_kPa*1000/(density*g) # Converts suction pressure drop (kPa) to (m)
+    discharge_loss_head = discharge_pressure_drop_kPa*1000/(density*g) # Converts discharge pressure drop (kPa) to (m)
+    max_req_dist_head = max_dest_pressure*1000/(density * g) # Maximum head to be overcome (m)
+    
+    # Calculate the NPSH_a
+    NPSH_a = atmospheric_head + suction_elev_diff - suction_loss_head - vapor_pressure_head # NPSH_a in m
+
+    # Calculate dynamic head
+    total_dynamic_head_req = suction_loss_head + discharge_loss_head + total_elevation_diff + max_req_dist_head
+    
+    # Calculate Required Power
+    power_hydraulic_W = density * g * Q_m3s * total_dynamic_head_req
+
+    if efficiency <= 0 or efficiency > 1:
+        raise ValueError("Pump efficiency should be between 0 and 1")
+
+    power_brake_W = power_hydraulic_W / efficiency
+
+    return {
+        "pump_head_m": total_dynamic_head_req,
+        "hydraulic_power_kW": power_hydraulic_W / 1000,
+        "brake_power_kW": power_brake_W / 1000,
+        "NPSHA": NPSH_a,
+        "NPSHA_margin_included": NPSH_a - margin
+    }
@@ -4,36 +4,13 @@
 # Import Key Modules and Programs Here
 import tkinter as tk
 from tkinter import messagebox
-from Hydraulics_Script_Advanced_Core_Working import calculate_pressure_drop
-from thermo.chemical import Chemical
-from thermo.vapor_pressure import VaporPressure
+from Hydraulics_Script_Advanced_Core_Working import calculate_pressure_drop, calculate_pressure_drop_array
+from fluid_properties import get_property_table
+from Centrifugal_Pump_Sizing_Core import atmospheric_pressure, pump_sizing
+from result_cache import cached_flow_curve
+from pump_curve import operating_point
 import numpy as np
-import matplotlib.pyplot as plt
-
-#--------Define Atmospheric Pressure at Altitude Given by User----------
-def atmospheric_pressure(altitude_m):
-    """
-    Calculates atmospheric pressure in Pascals at a given altitude in meters,
-    using the barometric formula (valid up to ~11,000 m).
-    """
-    P0 = 101325      # sea level standard atmospheric pressure, Pa
-    T0 = 288.15      # sea level standard temperature, K
-    L = 0.0065       # temperature lapse rate, K/m
-    R = 8.314462618     # universal gas constant, J/(mol·K)
-    M = 0.02896968  # molar mass of Earth's air, kg/mol
-    g = 9.80665      # gravity, m/s^2
-
-    if altitude_m < 0:
-        altitude_m = 0  # Clamp negative altitudes to sea level
-
-    T = T0 - L * altitude_m
-    if T <= 0:
-        raise ValueError("Altitude too high causing non-physical temperature")
-
-    # barometric formula
-    P = P0 * (T / T0) ** (g * M / (R * L))
-    return P  # Pa
-
+# matplotlib is imported in plot_curve, it takes over a second to load and is only needed for plots
 
 class FluidInputDialog(tk.Toplevel):
     def __init__(self, parent):
@@ -150,9 +127,10 @@ def get_fluid_info(root):
         fluid_name, min_temp, max_temp = dialog.result
 
         try:
-            fluid_min = Chemical(fluid_name, T=min_temp + 273.15)
-            density_min = fluid_min.rho
-            viscosity_min = fluid_min.mu * 1000  # Pa.s to cP
+            # Warm-started from the on-disk property store when this fluid and range were used before
+            fluid_table = get_property_table(fluid_name, min_temp + 273.15, max_temp + 273.15)
+            density_min = fluid_table.rho(min_temp + 273.15)
+            viscosity_min = fluid_table.mu(min_temp + 273.15) * 1000  # Pa.s to cP
         except Exception as e:
             messagebox.showerror("Calculation Error", f"Failed to calculate fluid properties at min temperature: {e}")
             root.destroy()
@@ -171,96 +149,55 @@ def get_fluid_info(root):
         exit()
     
 
-def pump_sizing(suction_pressure_drop_kPa, discharge_pressure_drop_kPa, flow_rate_m3hr, suction_elev_diff,
-                total_elevation_diff, max_dest_pressure, density=1000, efficiency=0.75, 
-                vapor_pressure_kPa=6, altitude_m=400):
-    g = 9.81
-    margin = 1 # Define NPSH_a margin, usually 0.8-1m
-    Q_m3s = flow_rate_m3hr / 3600
-    atmospheric_Pa = atmospheric_pressure(altitude_m) # Determines the atmospheric pressure
-    atmospheric_head = atmospheric_Pa/(density*g) # Converts atmospheric pressure (Pa) to head (m)
-    vapor_pressure_head = (vapor_pressure_kPa*1000)/(density*g) # Converts vapor pressure (kPa) to (m)
-    suction_loss_head = suction_pressure_drop_kPa*1000/(density*g) # Converts suction pressure drop (kPa) to (m)
-    discharge_loss_head = discharge_pressure_drop_kPa*1000/(density*g) # Converts discharge pressure drop (kPa) to (m)
-    max_req_dist_head = max_dest_pressure*1000/(density * g) # Maximum head to be overcome (m)
-    
-    # Calculate the NPSH_a
-    NPSH_a = atmospheric_head + suction_elev_diff - suction_loss_head - vapor_pressure_head # NPSH_a in m
-
-    # Calculate dynamic head
-    total_dynamic_head_req = suction_loss_head + discharge_loss_head + total_elevation_diff + max_req_dist_head
-    
-    # Calculate Required Power
-    power_hydraulic_W = density * g * Q_m3s * total_dynamic_head_req
-
-    if efficiency <= 0 or efficiency > 1:
-        raise ValueError("Pump efficiency should be between 0 and 1")
-
-    power_brake_W = power_hydraulic_W / efficiency
-
-    return {
-        "pump_head_m": total_dynamic_head_req,
-        "hydraulic_power_kW": power_hydraulic_W / 1000,
-        "brake_power_kW": power_brake_W / 1000,
-        "NPSHA": NPSH_a,
-        "NPSHA_margin_included": NPSH_a - margin
-    }
-
-
 def run_flow_curve(fluid_props, flow_min, flow_max, num_points, other_inputs):
     """
     Runs pump sizing over a range of flow rates and returns results for plotting/comparison.
+    Pressure drops for all flow points are evaluated in one vectorized pass per line.
     """
     flow_rates = np.linspace(flow_min, flow_max, num_points)
-    npsha_list = []
-    pump_head_list = []
-    brake_power_list = []
-
-    for Q in flow_rates:
-        # Calculate pressure drops for suction and discharge
-        results_suction = calculate_pressure_drop(
-            other_inputs["segments_suction"], 
-            fluid_props["density"], 
-            fluid_props["viscosity_cP"], 
-            Q
-        )
-        suction_pressure_drop_kPa = results_suction["total_pressure_drop_kPa"]
-        
-        results_discharge = calculate_pressure_drop(
-            other_inputs["segments_discharge"],
-            fluid_props["density"],
-            fluid_props["viscosity_cP"],
-            Q
-        )
-        discharge_pressure_drop_kPa = results_discharge["total_pressure_drop_kPa"]
-        
-        sizing_results = pump_sizing(
-            suction_pressure_drop_kPa,
-            discharge_pressure_drop_kPa,
-            Q,
-            other_inputs["suction_elev_diff"],
-            other_inputs["total_elevation_diff"],
-            max_dest_pressure=other_inputs["max_dest_pressure"],
-            density=fluid_props["density"],
-            efficiency=other_inputs.get("efficiency", 0.75),
-            vapor_pressure_kPa=other_inputs.get("vapor_pressure_kPa", 0),
-            altitude_m=other_inputs.get("altitude_m", 0)
-        )
-        
-        npsha_list.append(sizing_results["NPSHA"])
-        pump_head_list.append(sizing_results["pump_head_m"])
-        brake_power_list.append(sizing_results["brake_power_kW"])
-    
+
+    # Calculate pressure drops for suction and discharge at every flow point
+    results_suction = calculate_pressure_drop_array(
+        other_inputs["segments_suction"],
+        fluid_props["density"],
+        fluid_props["viscosity_cP"],
+        flow_rates
+    )
+    results_discharge = calculate_pressure_drop_array(
+        other_inputs["segments_discharge"],
+        fluid_props["density"],
+        fluid_props["viscosity_cP"],
+        flow_rates
+    )
+
+    # pump_sizing is plain arithmetic, so it accepts the pressure drop and flow arrays directly
+    sizing_results = pump_sizing(
+        results_suction["total_pressure_drop_kPa"],
+        results_discharge["total_pressure_drop_kPa"],
+        flow_rates,
+        other_inputs["suction_elev_diff"],
+        other_inputs["total_elevation_diff"],
+        max_dest_pressure=other_inputs["max_dest_pressure"],
+        density=fluid_props["density"],
+        efficiency=other_inputs.get("efficiency", 0.75),
+        vapor_pressure_kPa=other_inputs.get("vapor_pressure_kPa", 0),
+        altitude_m=other_inputs.get("altitude_m", 0)
+    )
+
     return {
         "flow_rates": flow_rates,
-        "NPSHA": npsha_list,
-        "pump_head": pump_head_list,
-        "brake_power": brake_power_list
+        "NPSHA": sizing_results["NPSHA"],
+        "pump_head": sizing_results["pump_head_m"],
+        "brake_power": sizing_results["brake_power_kW"]
     }
 
 
-def plot_curve(results, fluid_name):
-    """Enhanced plotting function with both NPSH_A and Head on same plot"""
+def plot_curve(results, fluid_name, pump=None):
+    """
+    Enhanced plotting function with both NPSH_A and Head on same plot. With a fitted pump curve
+    (pump_curve.PumpCurve) the pump head and the operating point are drawn as well.
+    """
+    import matplotlib.pyplot as plt
     flow = results["flow_rates"]
     npsha = results["NPSHA"]
     head = results["pump_head"]
@@ -276,6 +213,13 @@ def plot_curve(results, fluid_name):
                      markersize=5, label='Pump Head')
     ax1.tick_params(axis='y', labelcolor=color)
     ax1.grid(True, alpha=0.3)
+    if pump is not None:
+        op = operating_point(pump, results)
+        line1 += ax1.plot(flow, pump.head(flow), color='tab:green', linewidth=2, label=f'{pump.name or "Pump"} Head')
+        if op["found"]:
+            ax1.plot(op["flow_m3hr"], op["head_m"], 'k*', markersize=14)
+            ax1.annotate(f'{op["flow_m3hr"]:.1f} m³/h, {op["head_m"]:.1f} m', (op["flow_m3hr"], op["head_m"]),
+                         textcoords='offset points', xytext=(10, 10))
     
     # Create secondary y-axis for NPSH_A
     ax2 = ax1.twinx()
@@ -337,8 +281,9 @@ def on_calculate(fluid_props, entries):
     
     # Calculate vapor pressure at max temp
     try:
-        fluid_at_max = Chemical(fluid_props["fluid_name"], T=fluid_props["max_temp_C"] + 273.15)
-        vapor_pressure_Pa = fluid_at_max.VaporPressure(fluid_props["max_temp_C"] + 273.15)
+        fluid_table = get_property_table(fluid_props["fluid_name"], fluid_props["min_temp_C"] + 273.15,
+                                         fluid_props["max_temp_C"] + 273.15)
+        vapor_pressure_Pa = fluid_table.Psat(fluid_props["max_temp_C"] + 273.15)
         vapor_pressure_kPa = vapor_pressure_Pa / 1000
     except Exception:
         vapor_pressure_kPa = 0
@@ -413,8 +358,9 @@ def on_plot_curves(fluid_props, entries):
     
     # Calculate vapor pressure
     try:
-        fluid_at_max = Chemical(fluid_props["fluid_name"], T=fluid_props["max_temp_C"] + 273.15)
-        vapor_pressure_Pa = fluid_at_max.VaporPressure(fluid_props["max_temp_C"] + 273.15)
+        fluid_table = get_property_table(fluid_props["fluid_name"], fluid_props["min_temp_C"] + 273.15,
+                                         fluid_props["max_temp_C"] + 273.15)
+        vapor_pressure_Pa = fluid_table.Psat(fluid_props["max_temp_C"] + 273.15)
         vapor_pressure_kPa = vapor_pressure_Pa / 1000
     except Exception:
         vapor_pressure_kPa = 0
@@ -446,7 +392,8 @@ def on_plot_curves(fluid_props, entries):
     
     # Generate curve data
     try:
-        results = run_flow_curve(fluid_props, flow_min, flow_max, num_points, other_inputs)
+        # Re-plotting the same inputs is answered from the result cache
+        results = cached_flow_curve(fluid_props, flow_min, flow_max, num_points, other_inputs)
         plot_curve(results, fluid_props["fluid_name"])
     except Exception as e:
         messagebox.showerror("Plotting Error", f"Failed to generate curves: {e}")
@@ -10,12 +10,16 @@
 #---------------------------Import necessary libraries---------------------------------------------------
 import tkinter as tk
 from tkinter import simpledialog, messagebox
-from thermo.chemical import Chemical
 # from thermo.vapor_pressure import VaporPressure ---- For now leave this out to make things a little faster
+from fluid_properties import get_property_table
 from math import pi, sqrt, log10
-from fluids import nearest_pipe, fittings
-from AS_4130_HDPE_Capability_Matrix import lookup_hdpe_pipe, AS4130_HDPE
+from fluids import fittings
+from pipe_catalog import steel_pipe, steel_pipe_by_Di, hdpe_pipe, hdpe_sizes, standard_steel_sizes
 from pipe_data import roughness
+from line_optimizer import optimize_line, size_segment
+from fitting_matrix import segment_fitting_K
+from friction_factor import friction_factor
+from pipe_segment import Segment
 #----------------------Define the fluid input class and build the pop up box------------------------------
 #  Define a function to check if the input is a float and show error if not, this generalizes the float check
 # and avoids duplication.
@@ -441,23 +445,21 @@ class SegmentLengthsApp(tk.Toplevel):
 
             if material.lower() == "hdpe":
                 SDR = segment.get("SDR", "SDR17")
-                props = lookup_hdpe_pipe(current_nom_D, SDR)
-                ID_pipe = props["MeanID"] / 1000
+                ID_pipe, _ = hdpe_pipe(current_nom_D, SDR)
                 epsilon = roughness["HDPE"]
             else:
                 schedule = segment.get("schedule", "40")
-                _, ID_pipe, _, _ = nearest_pipe(NPS=current_nom_D, schedule=schedule)
+                _, ID_pipe, _, _ = steel_pipe(current_nom_D, schedule)
                 epsilon = roughness["Carbon Steel"]
 
-            ID_pipe_val = ID_pipe.magnitude if hasattr(ID_pipe, 'magnitude') else ID_pipe
+            ID_pipe_val = ID_pipe
             velocity = (max_Q / 3600) / (pi / 4 * ID_pipe_val ** 2)
             Re = density * velocity * ID_pipe_val / viscosity
 
             #---------Calculates moody factor explictly, rather than by Cole-Whitebrook eqn.
-            if Re < 2300:
-                moody_fac = 64 / Re
-            else:
-                moody_fac = 1 / (-2 * log10(epsilon / (ID_pipe_val * 1000) / 3.7 + 5.74 / Re ** 0.9))**2
+            # Same regimes as the core and size_segment (64/Re laminar, 0.02 transitional, Swamee-Jain
+            # turbulent), so the reported kPa/100m matches the limits the size was chosen for
+            moody_fac = friction_factor(Re, epsilon / (ID_pipe_val * 1000), "swamee_jain")
 
             rhov2 = (density*velocity ** 2) # Caclulates rhov2 
             p_drop_100 = moody_fac * (100 / ID_pipe_val) * (rhov2)/(2*1000) # Explicitly calculates pressure drop per 100 m using the
@@ -467,15 +469,29 @@ class SegmentLengthsApp(tk.Toplevel):
         
     #----------------------Functions to get HDPE and Carbon Steel Pipe sizes for the user to choose from------------------------
     def get_hdpe_sizes(self):
-        return sorted(list(AS4130_HDPE.keys()))
+        return hdpe_sizes()
 
     def get_CS_sizes(self):
-        return [0.25,0.5,0.75,1,1.25,1.5,2,2.5,3,3.5,4.0,5.0,6.0,8.0,10.0,12.0,14.0,16.0,18.0,20.0,24.0,30.0]
+        return list(standard_steel_sizes)
     def on_optimize(self,):
         # Do any GUI cleanup if needed
         self.optimize_segments(segments, dlg.p_drop_threshold, dlg.velocity_threshold)
         messagebox.showinfo("Optimization Complete", "Pipe sizes have been optimized!\nNow hit the Report Results button if you want to see results.")
 
+    def on_optimize_line(self,):
+        # Sizes all segments together, accounting for the reducer losses between neighbouring segments
+        # viscosity is in Pa.s here, optimize_line expects cP
+        results = optimize_line(segments, density, viscosity * 1000, max_Q, dlg.p_drop_threshold, dlg.velocity_threshold)
+        for seg, seg_result in zip(segments, results["segments"]):
+            seg["Nom_D"] = seg_result["Nom_D"]
+            seg["ID_Used"] = seg_result["pipe_id_m"]
+            seg["pressure_drop_100"] = seg_result["p_drop_100"]
+            seg["Velocity"] = seg_result["velocity"]
+        infeasible = [seg_result["segment_index"] for seg_result in results["segments"] if not seg_result["feasible"]]
+        if infeasible:
+            messagebox.showwarning("Optimization Warning", f"No size meets the thresholds for segment(s) {infeasible}; largest size used.")
+        messagebox.showinfo("Optimization Complete", "Whole line pipe sizes have been optimized (including reducer losses)!\nNow hit the Report Results button if you want to see results.")
+
     # Create the Tkinter results window with the optimize button
     def show_results_window(self):
         win = tk.Toplevel(root)
@@ -484,6 +500,9 @@ class SegmentLengthsApp(tk.Toplevel):
         btn_optimize = tk.Button(win, text="Optimize Pipe Sizes", command=self.on_optimize)
         btn_optimize.pack(pady=10)
 
+        btn_optimize_line = tk.Button(win, text="Optimize Whole Line (incl. Reducers)", command=self.on_optimize_line)
+        btn_optimize_line.pack(pady=10)
+
         # Optionally add a button to view results (so user runs reporting after optimizing)
         btn_view = tk.Button(win, text="Show Results", command= self.run_main_calculation)
         btn_view.pack(pady=10)
@@ -535,41 +554,26 @@ class SegmentLengthsApp(tk.Toplevel):
             all_sizes_carbon_steel = self.get_CS_sizes()
             size_list = all_sizes_carbon_steel
         try:
-            new_size = size_list[size_list.index(current_nom_D) -1]
-            return new_size 
+            current_index = size_list.index(current_nom_D)
         except ValueError:
+            print(f"Size not in list: {current_nom_D}")
+            return current_nom_D
+        if current_index == 0:
+            # Index -1 would wrap around to the largest size
             print(f"Already at min size: {current_nom_D}")
             return current_nom_D
+        return size_list[current_index - 1]
+
     def optimize_segments(self,segments, p_drop_threshold, velocity_threshold):
+        # Inverse sizing: solves for the minimum internal diameter meeting both thresholds, then snaps
+        # to the smallest catalog size at or above it by binary search. Always terminates, in
+        # O(log sizes) steps, instead of stepping up and down one size at a time.
         for i, seg in enumerate(segments):
-            current_nom_D = seg["Nom_D"]  # Start with provided Nom_D
-            acceptable_drop = False
-            material = seg["material"]
-            
-            
-            while not acceptable_drop:
-                p_drop_100, moody_fac, Nom_D, ID_pipe_val,velocity = self.calculate_pressure_drop_for_segment(seg, current_nom_D)      
-                velocity = (max_Q / 3600) / (pi / 4 * ID_pipe_val ** 2)
-
-                threshold_min_P = 10 # Set minimum pressure drop (kPa/100m) as 10
- 
-                if p_drop_100 > p_drop_threshold or velocity > velocity_threshold:
-                    current_nom_D = self.increase_size(current_nom_D, material)
-                elif p_drop_100 < threshold_min_P:
-                    prev_nom_D_bigger = current_nom_D
-                    current_nom_D = self.decrease_size(current_nom_D, material)
-                    #Recalculates the pressure drop and velocity at the smaller size
-
-                    p_drop_small, moody_fac_small, Nom_D_small, ID_pipe_val_small, velocity_small = self.calculate_pressure_drop_for_segment(seg, current_nom_D)
-
-                    if (p_drop_small > p_drop_threshold or velocity_small > velocity_threshold):
-                        # Can't go down a size so revert to prevous size
-                            current_nom_D = prev_nom_D_bigger
-                            moody_fac = moody_fac_small
-                            acceptable_drop = True
-
-                else:
-                    acceptable_drop = True
+            # viscosity is in Pa.s here, size_segment expects cP
+            sizing = size_segment(seg, density, viscosity * 1000, max_Q, p_drop_threshold, velocity_threshold)
+            current_nom_D = sizing["Nom_D"]
+            if not sizing["feasible"]:
+                print(f"Segment {i+1}: no size meets the thresholds, using largest size {current_nom_D}")
             
             # Always calculate results for current_nom_D, which is the accepted optimal size
             p_drop_100, moody_fac, Nom_D, ID_pipe_val, velocity = self.calculate_pressure_drop_for_segment(seg, current_nom_D)
@@ -579,6 +583,7 @@ class SegmentLengthsApp(tk.Toplevel):
             seg["pressure_drop_100"] = p_drop_100
             seg["Velocity"] = velocity
             seg["Moody Factor"] = moody_fac
+            seg["Limiting Criterion"] = sizing["limiting"]
 
 # ------------------------------- Main Script Block ---------------------------------
 # This is the main script block that runs when the script is executed
@@ -604,13 +609,14 @@ if __name__ == "__main__":
     temp_max_K = max_pump_temp + 273.15
 
     try:
-        fluid_at_min = Chemical(fluid_name, T=temp_min_K)
-        fluid_at_max = Chemical(fluid_name, T=temp_max_K)
-
-        density = fluid_at_min.rho
-        viscosity = fluid_at_min.mu
-        vapor_pressure = fluid_at_max.VaporPressure(temp_max_K)
-        boiling_point_K = fluid_at_min.Tb
+        # Property table over the pumping temperature range, warm-started from the on-disk store
+        # when this fluid and range have been used before. The end points are exact values.
+        fluid_table = get_property_table(fluid_name, temp_min_K, temp_max_K)
+
+        density = fluid_table.rho(temp_min_K)
+        viscosity = fluid_table.mu(temp_min_K)
+        vapor_pressure = fluid_table.Psat(temp_max_K)
+        boiling_point_K = fluid_table.Tb
         boiling_point_C = boiling_point_K - 273.15
         if temp_max_K > boiling_point_K:
             proceed = messagebox.askyesno(
@@ -678,7 +684,8 @@ if __name__ == "__main__":
             
 
         }
-        segments.append(segment)
+        # Checked against the segment schema once here; results are written back onto the Segment
+        segments.append(Segment.from_dict(segment))
         app.segments = segments
     app.show_results_window()
     root.mainloop()
@@ -703,77 +710,19 @@ if __name__ == "__main__":
         pipe_length = seg["length"]
         num_pipe_entrances = seg["Pipe Entrances"]
         num_pipe_exits = seg["Pipe Exits"]
-        num_90_elbows = seg["elbows_90"]
-        num_45_elbows = seg["elbows_45"]
-        num_U_bends = seg["U-bends"]
-        num_tees_branch = seg["Tees through branch"]
-        num_tees_thru = seg["Tees run thru"]
-        num_globe_valve = seg["Std Globe Valve"]
-        num_Yglobe_valve = seg["Y type Globe Valve"]
-        num_plug_branch = seg["Plug Valve through branch"]
-        num_plug_thru = seg["Plug Valve run thru"]
-        num_gate_valve = seg["Gate Valve"]
-        num_std_ball = seg["Std Ball Valve-2 port"]
-        num_ball_3port = seg["Std Ball Valve-3 port"]
-        num_BFV_centric = seg["Butterfly valve centric"]
-        num_BFV_do = seg["Butterfly valve double offset"]
-        num_BFV_to = seg["Butterfly valve triple offset"]
-        num_check_valve_swing = seg["Check Valve Swing"]
-        num_check_valve_lift = seg["Check Valve Lift"]
-        num_check_valve_tilt = seg["Check Valve Tilting"]
-
         user_K = seg["User supplied K"]
 
         D_use = ID_pipe_val
-#----------------------Computes K-values for all valves and fittings based on Crane TPM-410,2009, A-26 to A-29---------------
-        k_elbows = num_90_elbows * 14 * moody_fac   # From Crane TPM-410, 2009, Page A-30 - For Long Radius Elbows where r/D = 1.5
-        k_45_elbows = num_45_elbows * 16 * moody_fac # From Crane TPM-410, 2009, Page A-30 - For Std. 45 deg. elbows
-        k_u_bends = num_U_bends * 50 * moody_fac # From Crane TPM-410, 2009, Page A-30
-        k_tee_branch = num_tees_branch * 60 * moody_fac # From Crane TPM-410, 2009, Page A-30 
-        k_tee_thru = num_tees_thru * 20 * moody_fac # From Crane TPM-410, 2009, Page A-30
-
-        k_std_globe = num_globe_valve * fittings.K_globe_valve_Crane(D1=D_use, D2=D_use,fd=moody_fac)
-        k_Y_globe = 0
-        k_plug_branch_valve = num_plug_branch*fittings.K_plug_valve_Crane(D1=D_use, D2=D_use, angle= 180, style= 2)
-        k_plug_straight_valve = num_plug_thru*fittings.K_plug_valve_Crane(D1=D_use, D2=D_use,angle = 180, style= 1)
-        k_std_ball = num_std_ball * fittings.K_ball_valve_Crane(D1=D_use, D2=D_use, angle=180)
-        k_3_port_ball = num_ball_3port*0.3
-
-        k_BFV_c = num_BFV_centric * fittings.K_butterfly_valve_Crane(D_use, fd=moody_fac, style=0)
-        k_BFV_do = num_BFV_do * fittings.K_butterfly_valve_Crane(D_use, fd=moody_fac, style=1)
-        k_BFV_to = num_BFV_to * fittings.K_butterfly_valve_Crane(D_use, fd=moody_fac, style=2)
-
-        k_check_valve_swing =num_check_valve_swing*fittings.K_swing_check_valve_Crane(D_use)
-        k_check_valve_lift = num_check_valve_lift*fittings.K_lift_check_valve_Crane(D1=(D_use*0.5),D2 = D_use) # K value associated with check valve lift type
-        # From Crane TPM-410, 2009, Page A-28. Assumes that seat of lifting valve is approx half the bore of pipe internal diameter
-        k_check_valve_tilt = num_check_valve_tilt*fittings.K_tilting_disk_check_valve_Crane(D_use,15)
+#----------------------Computes K-values for all valves and fittings based on Crane TPM-410,2009, A-26 to A-30---------------
+        # The segment's fitting counts times the Crane K basis for this diameter, see fitting_matrix.py
+        # (elbows, bends, tees, globe and butterfly valves scale with the friction factor)
+        K_fd_fittings, K_const_fittings = segment_fitting_K(seg, D_use, include_ends=False)
 
         k_pipe_entrance = fittings.entrance_sharp(method='Crane') * num_pipe_entrances
         k_pipe_exit = fittings.exit_normal() * num_pipe_exits
         k_user_sup = user_K
 
-        fittings_k_values = [
-            k_elbows,
-            k_45_elbows,
-            k_u_bends,
-            k_tee_branch,
-            k_tee_thru,
-            k_std_globe,
-            #k_Y_globe,
-            k_plug_branch_valve,
-            k_plug_straight_valve,
-            k_3_port_ball,
-            k_std_ball,
-            k_BFV_c,
-            k_BFV_do,
-            k_BFV_to,
-            k_check_valve_swing,
-            k_check_valve_lift,
-            k_check_valve_tilt,
-
-        ]
-
-        k_fittings_total = sum(fittings_k_values)
+        k_fittings_total = K_fd_fittings * moody_fac + K_const_fittings
         k_pipe_length = moody_fac * pipe_length / D_use
         k_ent_exit = (k_pipe_entrance + k_pipe_exit)
         p_drop_ent_exit = k_ent_exit * rhov2 / (2 * 1000)
@@ -792,7 +741,7 @@ if __name__ == "__main__":
         # For example ID 96 mm HDPE has an NPS of 4"
         if material.lower() == "hdpe" :
             ID_pipe = ID_pipe_val
-            NPS, _, _, _= nearest_pipe(Di = ID_pipe, schedule= '40')
+            NPS, _, _, _= steel_pipe_by_Di(ID_pipe, schedule= '40')
         else:
             ID_pipe = ID_pipe_val
             NPS = current_nom_D
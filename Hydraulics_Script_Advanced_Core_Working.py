@@ -5,16 +5,26 @@
 
 
 #------------Import key modules and programs--------------------
-from thermo.chemical import Chemical
-from thermo.vapor_pressure import VaporPressure
 from math import pi, sqrt, log10
-from fluids import nearest_pipe, fittings
-from AS_4130_HDPE_Capability_Matrix import lookup_hdpe_pipe, AS4130_HDPE
+import numpy as np
+from fluids import fittings
+from pipe_catalog import steel_pipe, hdpe_pipe, hdpe_nps
 from pipe_data import roughness
 from ASME_Concentric_Reducers_table import reducer_lengths_dict
+from fitting_matrix import segment_fitting_K, fitting_count_matrix, fitting_K
+from pipe_segment import Segment
+from friction_factor import (darcy_friction_factor, friction_factor, friction_regime, check_model,
+                             friction_factor_derivatives)
+from time import perf_counter
+import stage_profiler
 
 
-def calculate_pressure_drop(segments, density, viscosity, flow_rate_m3hr):
+def calculate_pressure_drop(segments, density, viscosity, flow_rate_m3hr, friction_model="swamee_jain",
+                            derivatives=False):
+    # segments: segment dicts, Segments or a SegmentArray (see pipe_segment.py)
+    # friction_model selects the turbulent friction factor correlation, see friction_factor.py
+    # derivatives=True adds analytic partial derivatives of the pressure drops, see pressure_drop_derivatives
+    check_model(friction_model)
     Q_m3hr = flow_rate_m3hr
     g = 9.81
 
@@ -25,63 +35,40 @@ def calculate_pressure_drop(segments, density, viscosity, flow_rate_m3hr):
     segments_info = []
     previous_diameter = None
     previous_NPS = None
+    segment_derivatives = []
+    # Opt-in per-stage timing, see stage_profiler.py. None (no timing) unless profiling is switched on
+    prof = stage_profiler.active
 
     for i, seg in enumerate(segments, start=1):
-        # Set defaults for missing properties to prevent KeyError
-        material = seg.get("material", "Carbon Steel")
-        Nom_D = seg.get("Nom_D", 0.0)
-        pipe_length = seg.get("length", 0.0)
-        SDR = seg.get("SDR", "SDR17")
-        schedule = seg.get("schedule", "40")
-
-        # Fittings numbers - default zero
-        num_pipe_entrances = seg.get("Pipe Entrances", 0)
-        num_pipe_exits = seg.get("Pipe Exits", 0)
-        num_90_elbows = seg.get("elbows_90", 0)
-        num_45_elbows = seg.get("elbows_45", 0)
-        num_U_bends = seg.get("U-bends", 0)
-        num_tees_branch = seg.get("Tees through branch", 0)
-        num_tees_thru = seg.get("Tees run thru", 0)
-        num_globe_valve = seg.get("Std Globe Valve", 0)
-        num_Yglobe_valve = seg.get("Y type Globe Valve", 0)  # currently unused
-        num_plug_branch = seg.get("Plug Valve through branch", 0)
-        num_plug_thru = seg.get("Plug Valve run thru", 0)
-        num_gate_valve = seg.get("Gate Valve", 0)
-        num_std_ball = seg.get("Std Ball Valve-2 port", 0)
-        num_ball_3port = seg.get("Std Ball Valve-3 port", 0)
-        num_BFV_centric = seg.get("Butterfly valve centric", 0)
-        num_BFV_do = seg.get("Butterfly valve double offset", 0)
-        num_BFV_to = seg.get("Butterfly valve triple offset", 0)
-        num_check__valve_swing = seg.get("Number of Swing Type Check Valves",0)
-        num_check__valve_lift = seg.get("Number of Lift Type Check Valves",0)
-        num_check__valve_tilting = seg.get("Number of Tilting Type Check Valves",0)
-        user_K = seg.get("User supplied K", 0.0)
-
-        # Pipe internal diameter and roughness
-        if material.lower() == "hdpe":
-            props = lookup_hdpe_pipe(Nom_D, SDR)
-            ID_pipe = props["MeanID"] / 1000  # m
-            wall_thickness = props["MinWall"]/1000 # pipe wall thickness in m
-            epsilon = roughness["HDPE"]
-            do_for_red = Nom_D / 1000
-            NPS_tuple = nearest_pipe(Do=do_for_red, schedule=40)
-            NPS = NPS_tuple[0]
+        if prof is not None:
+            t_stage = perf_counter()
+        if isinstance(seg, Segment):
+            # Validated when built, see pipe_segment.py
+            material, Nom_D, pipe_length, SDR, schedule = seg.material, seg.Nom_D, seg.length, seg.SDR, seg.schedule
         else:
-            NPS, ID_pipe, Do_pipe, t = nearest_pipe(NPS=Nom_D, schedule=schedule)
-            ID_pipe = ID_pipe.magnitude if hasattr(ID_pipe, 'magnitude') else ID_pipe
-            epsilon = roughness["Carbon Steel"]
-            wall_thickness = t # Wall thickness, already in m 
+            # Set defaults for missing properties to prevent KeyError
+            material = seg.get("material", "Carbon Steel")
+            Nom_D = seg.get("Nom_D", 0.0)
+            pipe_length = seg.get("length", 0.0)
+            SDR = seg.get("SDR", "SDR17")
+            schedule = seg.get("schedule", "40")
+
+        # Pipe internal diameter and roughness, from the prebuilt pipe catalog
+        ID_pipe, wall_thickness, epsilon, NPS = pipe_geometry(material, Nom_D, SDR, schedule)
         ID_pipe_val = ID_pipe
         wall_thickness_val = wall_thickness
+        if prof is not None:
+            t_stage = prof.lap("geometry", t_stage)
         # Calculate velocity (m/s)
         area = pi / 4 * ID_pipe_val ** 2
         velocity = (Q_m3hr / 3600) / area 
-        print(ID_pipe_val)
-        print(epsilon)
         # Reynolds number
         Re = density * velocity * ID_pipe_val / (viscosity/1000) if viscosity > 0 else 0.0
         # Determine friction factor (moody_fac)
-        if Re < 2300 and Re > 0:
+        if friction_model != "swamee_jain":
+            regime = friction_regime(Re)
+            moody_fac = friction_factor(Re, epsilon / (ID_pipe_val*1000), friction_model)
+        elif Re < 2300 and Re > 0:
             regime = "Laminar"
             moody_fac = 64 / Re
         elif 2300 <= Re < 4000:
@@ -99,33 +86,15 @@ def calculate_pressure_drop(segments, density, viscosity, flow_rate_m3hr):
         # Straight pipe pressure drop (Darcy-Weisbach)
         p_drop_per_100  = moody_fac * (100 / ID_pipe_val) * (rhov2 / 2) / 1000  # kPa per 100m
         p_drop_pipe = moody_fac * (pipe_length / ID_pipe_val) * (rhov2 / 2) / 1000  # kPa
-        # Calculate fittings K values
-        k_elbows = num_90_elbows * 14 * moody_fac
-        k_45_elbows = num_45_elbows * 16 * moody_fac
-        k_u_bends = num_U_bends * 50 * moody_fac
-        k_tee_branch = num_tees_branch * 60 * moody_fac
-        k_tee_thru = num_tees_thru * 20 * moody_fac
-
-        k_std_globe = num_globe_valve * fittings.K_globe_valve_Crane(D1=ID_pipe_val, D2=ID_pipe_val, fd=moody_fac)
-        k_plug_branch_valve = num_plug_branch * fittings.K_plug_valve_Crane(D1=ID_pipe_val, D2=ID_pipe_val, angle=180, style=2)
-        k_plug_straight_valve = num_plug_thru * fittings.K_plug_valve_Crane(D1=ID_pipe_val, D2=ID_pipe_val, angle=180, style=1)
-        k_std_ball = num_std_ball * fittings.K_ball_valve_Crane(D1=ID_pipe_val, D2=ID_pipe_val, angle=180)
-        k_3_port_ball = num_ball_3port * 0.3  # Approximate max loss
-
-        k_BFV_c = num_BFV_centric * fittings.K_butterfly_valve_Crane(ID_pipe_val, fd=moody_fac, style=0)
-        k_BFV_do = num_BFV_do * fittings.K_butterfly_valve_Crane(ID_pipe_val, fd=moody_fac, style=1)
-        k_BFV_to = num_BFV_to * fittings.K_butterfly_valve_Crane(ID_pipe_val, fd=moody_fac, style=2)
-
-        k_pipe_entrance = fittings.entrance_sharp(method='Crane') * num_pipe_entrances
-        k_pipe_exit = fittings.exit_normal() * num_pipe_exits
-        k_user_sup = user_K
-
-        # Total fitting K
-        k_fittings_total = sum([
-            k_elbows, k_45_elbows, k_u_bends, k_tee_branch, k_tee_thru,
-            k_std_globe, k_plug_branch_valve, k_plug_straight_valve,
-            k_3_port_ball, k_std_ball, k_BFV_c, k_BFV_do, k_BFV_to
-        ])
+        if prof is not None:
+            t_stage = prof.lap("friction_factor", t_stage)
+        # Fittings K values: the segment's fitting counts times the Crane K basis for this diameter
+        # (see fitting_matrix.py). K_fd is multiplied by the friction factor
+        K_fd_fittings, K_const_fittings = segment_fitting_K(seg, ID_pipe_val, include_ends=False)
+        k_fittings_total = K_fd_fittings * moody_fac + K_const_fittings
+        k_pipe_entrance = fittings.entrance_sharp(method='Crane') * seg.get("Pipe Entrances", 0)
+        k_pipe_exit = fittings.exit_normal() * seg.get("Pipe Exits", 0)
+        k_user_sup = seg.get("User supplied K", 0.0)
 
         # Pressure drops for fittings, entrances, exits, user supplied K
         p_drop_fittings = k_fittings_total * rhov2 / 2 / 1000  # kPa
@@ -134,6 +103,12 @@ def calculate_pressure_drop(segments, density, viscosity, flow_rate_m3hr):
 
         # Total pressure drop for segment
         p_drop_pf = p_drop_pipe + p_drop_ent_exit + p_drop_fittings + p_drop_user_k
+        if derivatives:
+            seg_derivatives = pressure_drop_derivatives(
+                density, viscosity, Q_m3hr, ID_pipe_val, epsilon, pipe_length, K_fd_fittings,
+                K_const_fittings + k_pipe_entrance + k_pipe_exit + k_user_sup, friction_model, moody_fac)
+        if prof is not None:
+            t_stage = prof.lap("fittings", t_stage)
 
         # Add reducer loss if not first segment
         p_drop_reducer = 0.0
@@ -148,12 +123,19 @@ def calculate_pressure_drop(segments, density, viscosity, flow_rate_m3hr):
                 p_drop_reducer = K_reducer * density * velocity_max_reducer ** 2 / 2 / 1000
                 # Add reducer loss to segment and sum
                 p_drop_pf += p_drop_reducer
+                if derivatives:
+                    add_reducer_derivatives(seg_derivatives, density, Q_m3hr, previous_diameter, ID_pipe_val,
+                                            length_reducer_m)
             else:
                 # No reducer data available
                 pass
+            if prof is not None:
+                t_stage = prof.lap("reducer", t_stage)
 
         sum_of_pressure_drop += p_drop_pf
         pressure_drop_segments.append(p_drop_pf)
+        if derivatives:
+            segment_derivatives.append(seg_derivatives)
         p_drop_per_100_work.append(p_drop_per_100)
         # Store previous for next iteration
         previous_diameter = ID_pipe_val
@@ -172,13 +154,256 @@ def calculate_pressure_drop(segments, density, viscosity, flow_rate_m3hr):
             "pressure_drop_kPa": p_drop_pf,
         })
 
-    return {
+    results = {
         "segments": segments_info,
         "pressure_drop_per_segment_kPa": pressure_drop_segments,
         "total_pressure_drop_kPa": sum_of_pressure_drop,
         "segments_detailed_results": detailed_results,  # optional, more advanced info
         "Pressure Drop Per 100m": p_drop_per_100_work,
     }
+    if derivatives:
+        results["derivatives"] = {
+            "segments": segment_derivatives,
+            "total": total_derivatives(segment_derivatives),
+        }
+    return results
+
+
+#------------Analytic derivatives--------------------
+# Partial derivatives of each segment's pressure drop (kPa) with respect to its pipe ID (m), the
+# roughness (mm), the flowrate (m3/hr), the density (kg/m3) and the viscosity (cP), by the chain rule
+# through velocity, Reynolds number, relative roughness and the friction factor. Fitting K values are
+# held at their values for the segment's size (Crane K values move with ID only through the
+# tabulated steps and the slowly varying Crane ft). The reducer K is differentiated numerically in
+# its two diameters, which is one call to the closed form Crane contraction per diameter.
+
+reducer_K_step = 1e-6  # Relative diameter step for the reducer K derivative
+
+
+def pressure_drop_derivatives(density, viscosity, flow_rate_m3hr, ID_pipe, epsilon, length, K_fd, K_const,
+                              friction_model="swamee_jain", fd=None):
+    """
+    Partial derivatives of one segment's pressure drop (without the reducer loss), kPa per unit of
+    "pipe_id_m", "epsilon_mm", "flow_m3hr", "density" and "viscosity_cP". K_fd and K_const are the
+    segment's fitting K terms (total K = fd * K_fd + K_const), including entrances, exits and user K,
+    and fd the friction factor if already known.
+    "previous_pipe_id_m" (through the reducer loss) is zero until add_reducer_derivatives.
+    """
+    area = pi / 4 * ID_pipe ** 2
+    velocity = (flow_rate_m3hr / 3600) / area
+    dv_dQ = 1 / (3600 * area)
+    Re_per_density = velocity * ID_pipe / (viscosity / 1000) if viscosity > 0 else 0.0
+    Re = density * Re_per_density
+    rel_roughness = epsilon / (ID_pipe * 1000)
+    fd, dfd_dRe, dfd_drr = friction_factor_derivatives(Re, rel_roughness, friction_model, fd)
+    dyn_p = density * velocity ** 2 / 2 / 1000  # kPa
+    F = length / ID_pipe + K_fd
+    K_total = fd * F + K_const
+    dp_dfd = F * dyn_p
+    return {
+        "pipe_id_m": (-4 * K_total * dyn_p / ID_pipe - fd * length / ID_pipe ** 2 * dyn_p
+                      - dp_dfd * (dfd_dRe * Re + dfd_drr * rel_roughness) / ID_pipe),
+        "previous_pipe_id_m": 0.0,
+        "epsilon_mm": dp_dfd * dfd_drr / (ID_pipe * 1000),
+        "flow_m3hr": (K_total * density * velocity / 1000 + dp_dfd * dfd_dRe * density * ID_pipe / (viscosity / 1000)
+                      if viscosity > 0 else K_total * density * velocity / 1000) * dv_dQ,
+        "density": K_total * velocity ** 2 / 2 / 1000 + dp_dfd * dfd_dRe * Re_per_density,
+        "viscosity_cP": -dp_dfd * dfd_dRe * Re / viscosity if viscosity > 0 else 0.0,
+    }
+
+
+def add_reducer_derivatives(seg_derivatives, density, flow_rate_m3hr, previous_ID, ID_pipe, length_reducer_m):
+    """Add the derivatives of the reducer loss (between the previous segment and this one) to seg_derivatives."""
+    D_min = min(previous_ID, ID_pipe)
+    area = pi / 4 * D_min ** 2
+    velocity = (flow_rate_m3hr / 3600) / area
+    K = fittings.contraction_conical_Crane(Di1=previous_ID, Di2=ID_pipe, l=length_reducer_m)
+    dyn_p = density * velocity ** 2 / 2 / 1000
+    h1, h2 = previous_ID * reducer_K_step, ID_pipe * reducer_K_step
+    dK_dD1 = (fittings.contraction_conical_Crane(Di1=previous_ID + h1, Di2=ID_pipe, l=length_reducer_m)
+              - fittings.contraction_conical_Crane(Di1=previous_ID - h1, Di2=ID_pipe, l=length_reducer_m)) / (2 * h1)
+    dK_dD2 = (fittings.contraction_conical_Crane(Di1=previous_ID, Di2=ID_pipe + h2, l=length_reducer_m)
+              - fittings.contraction_conical_Crane(Di1=previous_ID, Di2=ID_pipe - h2, l=length_reducer_m)) / (2 * h2)
+    # The loss is based on the velocity in the smaller pipe, so only that diameter changes the velocity
+    dp_dD_min = -4 * K * dyn_p / D_min
+    seg_derivatives["previous_pipe_id_m"] += dK_dD1 * dyn_p + (dp_dD_min if previous_ID <= ID_pipe else 0.0)
+    seg_derivatives["pipe_id_m"] += dK_dD2 * dyn_p + (dp_dD_min if previous_ID > ID_pipe else 0.0)
+    seg_derivatives["flow_m3hr"] += K * density * velocity / 1000 / (3600 * area)
+    seg_derivatives["density"] += K * velocity ** 2 / 2 / 1000
+
+
+def total_derivatives(segment_derivatives):
+    """
+    Derivatives of the line total from the per-segment derivatives: "pipe_id_m" and "epsilon_mm"
+    as lists (one value per segment, as each segment's ID and roughness can change on its own), and
+    "flow_m3hr", "density" and "viscosity_cP" as floats.
+    """
+    n = len(segment_derivatives)
+    totals = {
+        "pipe_id_m": [seg["pipe_id_m"] + (segment_derivatives[j + 1]["previous_pipe_id_m"] if j + 1 < n else 0.0)
+                      for j, seg in enumerate(segment_derivatives)],
+        "epsilon_mm": [seg["epsilon_mm"] for seg in segment_derivatives],
+    }
+    for key in ("flow_m3hr", "density", "viscosity_cP"):
+        total = 0.0
+        for seg in segment_derivatives:
+            total += seg[key]
+        totals[key] = total
+    return totals
+
+#------------Vectorized flow-array mode--------------------
+# Everything that does not depend on flow (pipe geometry, roughness, fitting K values and reducer K values)
+# is resolved once per segment. Every fitting K in this module is either a constant or linear in the
+# friction factor (Crane TPM-410 gives K = c * fd), so each segment reduces to two numbers:
+# K_fd (multiplied by the friction factor) and K_const (flow independent).
+
+def pipe_geometry(material, Nom_D, SDR="SDR17", schedule="40"):
+    """
+    Internal diameter (m), wall thickness (m), roughness (mm) and NPS for a pipe size,
+    looked up in the prebuilt pipe catalog.
+    """
+    if material.lower() == "hdpe":
+        ID_pipe, wall_thickness = hdpe_pipe(Nom_D, SDR)
+        NPS = hdpe_nps(Nom_D)  # Steel equivalent NPS, used for the reducer lookup
+    else:
+        NPS, ID_pipe, Do_pipe, wall_thickness = steel_pipe(Nom_D, schedule)
+    epsilon = roughness[roughness_key(material)]
+    return ID_pipe, wall_thickness, epsilon, NPS
+
+
+def roughness_key(material):
+    """Key of pipe_data.roughness used for a segment material."""
+    return "HDPE" if material.lower() == "hdpe" else "Carbon Steel"
+
+
+def resolve_segment(seg, with_fittings=True):
+    """
+    Resolve the flow-independent data for one segment.
+
+    Args:
+        seg (dict or Segment): Segment dict, using the same keys as calculate_pressure_drop, or a Segment
+        with_fittings (bool): Also work out K_fd / K_const. Batch callers that evaluate the
+                              fitting count matrix for many segments at once skip this
+
+    Returns:
+        dict: Geometry, roughness, NPS and (with_fittings) the K_fd / K_const loss terms for the segment
+    """
+    if isinstance(seg, Segment):
+        material, Nom_D, length, SDR, schedule = seg.material, seg.Nom_D, seg.length, seg.SDR, seg.schedule
+    else:
+        material = seg.get("material", "Carbon Steel")
+        Nom_D = seg.get("Nom_D", 0.0)
+        length = seg.get("length", 0.0)
+        SDR = seg.get("SDR", "SDR17")
+        schedule = seg.get("schedule", "40")
+
+    ID_pipe, wall_thickness, epsilon, NPS = pipe_geometry(material, Nom_D, SDR, schedule)
+
+    # Fittings whose K is proportional to the friction factor (evaluated with fd = 1), and fittings,
+    # entrances, exits and user K that do not depend on flow
+    K_fd, K_const = segment_fitting_K(seg, ID_pipe) if with_fittings else (None, None)
+
+    return {
+        "material": material,
+        "Nom_D": Nom_D,
+        "schedule": schedule,
+        "length_m": length,
+        "pipe_id_m": ID_pipe,
+        "wall_thickness_m": wall_thickness,
+        "epsilon": epsilon,
+        "NPS": NPS,
+        "K_fd": K_fd,
+        "K_const": K_const,
+    }
+
+
+def friction_factor_array(Re, ID_pipe_val, epsilon, friction_model="swamee_jain"):
+    """
+    Darcy friction factor for an array of Reynolds numbers, using the same regimes as
+    calculate_pressure_drop (laminar 64/Re, 0.02 transitional placeholder, turbulent from
+    friction_model). ID_pipe_val (m) and epsilon (mm) may be scalars or arrays that broadcast against Re.
+    """
+    Re = np.asarray(Re, dtype=float)
+    rel_roughness = np.asarray(epsilon) / (np.asarray(ID_pipe_val) * 1000)
+    return darcy_friction_factor(Re, rel_roughness, friction_model)
+
+
+def reducer_K(prev_geom, geom):
+    """
+    K value of the concentric reducer between two resolved segments, or None if the
+    ASME B16.9 table has no reducer for that NPS pair.
+    """
+    larger_nps = max(prev_geom["NPS"], geom["NPS"])
+    smaller_nps = min(prev_geom["NPS"], geom["NPS"])
+    length_reducer = reducer_lengths_dict.get((larger_nps, smaller_nps), None)
+    if length_reducer is None:
+        return None
+    return fittings.contraction_conical_Crane(Di1=prev_geom["pipe_id_m"], Di2=geom["pipe_id_m"],
+                                              l=length_reducer / 1000)
+
+
+def calculate_pressure_drop_array(segments, density, viscosity, flow_rates_m3hr, friction_model="swamee_jain",
+                                  roughness_mm=None):
+    """
+    Vectorized version of calculate_pressure_drop over an array of flowrates.
+
+    Geometry and flow-independent K values are resolved once per segment; velocity, Reynolds
+    number, friction factor and losses are then computed as whole arrays.
+
+    Args:
+        segments (list or SegmentArray): Segment dicts or Segments (same format as calculate_pressure_drop)
+        density (float or array): Fluid density, kg/m3. An array gives one density per flowrate
+        viscosity (float or array): Fluid viscosity, cP. An array gives one viscosity per flowrate
+        flow_rates_m3hr (array like): Flowrates, m3/hr
+        friction_model (str): Friction factor model, see friction_factor.py
+        roughness_mm (dict): Pipe roughness in place of pipe_data.roughness, by the same keys (see
+                             roughness_key). Values may be arrays, one roughness per flowrate
+
+    Returns:
+        dict: "flow_rates" (n,), "pressure_drop_per_segment_kPa" (segments x n),
+              "total_pressure_drop_kPa" (n,) and "Pressure Drop Per 100m" (segments x n)
+    """
+    Q_m3s = np.atleast_1d(np.asarray(flow_rates_m3hr, dtype=float)) / 3600
+    geoms = [resolve_segment(seg, with_fittings=False) for seg in segments]
+    # K values for every segment at once, from the fitting count matrix and the K basis
+    K_fd_all, K_const_all = fitting_K(fitting_count_matrix(segments), [geom["pipe_id_m"] for geom in geoms])
+
+    pressure_drop_segments = np.zeros((len(geoms), Q_m3s.size))
+    p_drop_per_100_work = np.zeros((len(geoms), Q_m3s.size))
+    previous = None
+
+    for i, geom in enumerate(geoms):
+        ID_pipe_val = geom["pipe_id_m"]
+        velocity = Q_m3s / (pi / 4 * ID_pipe_val ** 2)
+        if np.ndim(viscosity) == 0:
+            Re = density * velocity * ID_pipe_val / (viscosity / 1000) if viscosity > 0 else np.zeros_like(velocity)
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                Re = np.where(viscosity > 0, density * velocity * ID_pipe_val / (viscosity / 1000), 0.0)
+        epsilon = geom["epsilon"] if roughness_mm is None else roughness_mm.get(roughness_key(geom["material"]),
+                                                                                 geom["epsilon"])
+        moody_fac = friction_factor_array(Re, ID_pipe_val, epsilon, friction_model)
+        dyn_p = density * velocity ** 2 / 2 / 1000  # kPa
+
+        p_drop_per_100_work[i] = moody_fac * (100 / ID_pipe_val) * dyn_p
+        K_total = moody_fac * (geom["length_m"] / ID_pipe_val + K_fd_all[i]) + K_const_all[i]
+        pressure_drop_segments[i] = K_total * dyn_p
+
+        # Reducer loss, based on the velocity in the smaller of the two pipes
+        if previous is not None:
+            K_reducer = reducer_K(previous, geom)
+            if K_reducer is not None:
+                velocity_max_reducer = Q_m3s / (pi / 4 * min(previous["pipe_id_m"], ID_pipe_val) ** 2)
+                pressure_drop_segments[i] += K_reducer * density * velocity_max_reducer ** 2 / 2 / 1000
+        previous = geom
+
+    return {
+        "flow_rates": Q_m3s * 3600,
+        "segments": geoms,
+        "pressure_drop_per_segment_kPa": pressure_drop_segments,
+        "total_pressure_drop_kPa": pressure_drop_segments.sum(axis=0),
+        "Pressure Drop Per 100m": p_drop_per_100_work,
+    }
 
 # Test Segment located here. User can check vs verified values using this segment
 # Simply uncomment (remove triple ''' from start and end of code block) and change required inputs to desired
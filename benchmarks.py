@@ -0,0 +1,388 @@
+# Hydraulics and Pump Benchmarks
+# Built by Louis Walker, Process Engineer, 2025
+# Fixed, seeded workloads for the main hydraulics and pump kernels. Each benchmark is timed over a
+# number of repeats after a warm up, and reported as ops/sec with percentile latencies. Results are
+# written as JSON (with the git commit and library versions) so runs can be compared across commits.
+#
+# Usage:
+#   python benchmarks.py -o bench_main.json
+#   python benchmarks.py -o bench_branch.json --compare bench_main.json
+#   python benchmarks.py --filter pressure_drop --quick
+#   python benchmarks.py --imports-only    (import times against import_budgets, exit code 1 if over)
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from importlib.metadata import version, PackageNotFoundError
+
+import numpy as np
+
+from Hydraulics_Script_Advanced_Core_Working import calculate_pressure_drop, reducer_K, resolve_segment
+from Centrifugal_Pump_Sizing_Core import pump_sizing
+from AS_4130_HDPE_Capability_Matrix import AS4130_HDPE, lookup_hdpe_pipe
+from ASME_Concentric_Reducers_table import reducer_lengths_dict
+from line_optimizer import size_segment, optimize_line
+from pipe_catalog import hdpe_pipe, standard_steel_sizes
+from friction_factor import darcy_friction_factor, friction_models
+from incremental_line import IncrementalLine
+from result_cache import ResultCache, cached_pressure_drop
+from pump_curve import PumpCurve, solve_operating_points
+from pump_catalogue import PumpCatalogue
+from vsd_sweep import vsd_sweep
+from energy_profile import duty_profile_energy
+from monte_carlo import monte_carlo_pump
+
+SEED = 2025
+DENSITY = 998.2  # kg/m3, water at 20 °C
+VISCOSITY = 1.002  # cP
+FLOW_RATE = 50.0  # m3/hr
+P_DROP_THRESHOLD = 20.0  # kPa/100m
+VELOCITY_THRESHOLD = 2.5  # m/s
+
+# Import time budgets (s), measured in a fresh interpreter. Heavy optional dependencies (thermo,
+# matplotlib) must not be loaded by these imports; they are imported when first used.
+import_budgets = {
+    "Hydraulics_Script_Advanced_Core_Working": 0.6,
+    "Centrifugal_Pump_Sizing_Core": 0.1,
+    "line_sizing_cli": 0.8,
+    "Centrifugal_Pump_Sizing_With_Curve": 0.9,
+    "Advanced_Centrifugal_Pump_Sizing_Calc": 0.9,
+}
+
+
+#------------Seeded workloads------------
+def random_fittings(rng):
+    return {
+        "elbows_90": rng.randint(0, 6),
+        "elbows_45": rng.randint(0, 2),
+        "Tees through branch": rng.randint(0, 1),
+        "Gate Valve": rng.randint(0, 2),
+        "Std Globe Valve": rng.randint(0, 1),
+        "Butterfly valve centric": rng.randint(0, 1),
+    }
+
+
+def steel_segments(n, seed=SEED):
+    rng = random.Random(seed)
+    sizes = standard_steel_sizes[4:16]
+    return [dict(random_fittings(rng), material="Carbon Steel", schedule="40", Nom_D=rng.choice(sizes),
+                 length=round(rng.uniform(5, 200), 1)) for _ in range(n)]
+
+
+def hdpe_segments(n, seed=SEED):
+    rng = random.Random(seed)
+    sizes = [DN for DN in sorted(AS4130_HDPE) if 50 <= DN <= 500]
+    return [dict(random_fittings(rng), material="HDPE", SDR="SDR11", Nom_D=rng.choice(sizes),
+                 length=round(rng.uniform(5, 200), 1)) for _ in range(n)]
+
+
+def pump_lines(seed=SEED):
+    return {
+        "segments_suction": steel_segments(2, seed),
+        "segments_discharge": steel_segments(8, seed + 1),
+        "suction_elev_diff": 2.0,
+        "total_elevation_diff": 15.0,
+        "max_dest_pressure": 50.0,
+        "efficiency": 0.75,
+        "vapor_pressure_kPa": 2.34,
+        "altitude_m": 400,
+    }
+
+
+def pump_catalogue_records(n_models, seed=SEED):
+    """Tabulated curves for n_models pump models with 4 impeller trims each (affinity law scaled)."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1.4, 8)  # Flow as a fraction of BEP flow
+    records = []
+    for model in range(n_models):
+        BEP_flow, BEP_head = 10 ** rng.uniform(0.7, 3), 10 ** rng.uniform(0.8, 2.2)
+        peak = rng.uniform(0.6, 0.85)
+        for trim in (1.0, 0.95, 0.9, 0.85):
+            records.append({
+                "name": f"P{model:03d}/{trim:.2f}",
+                "flow_m3hr": (x * BEP_flow * trim).tolist(),
+                "head_m": (BEP_head * trim ** 2 * (1.25 - 0.25 * x ** 2)).tolist(),
+                "efficiency": (peak * (2 * x - x ** 2) * (0.95 + 0.05 * trim)).tolist(),
+                "NPSHr_m": (0.02 * BEP_head * (1 + x ** 2)).tolist(),
+            })
+    return records
+
+
+#------------Timing------------
+def time_call(func, repeats, warmup, ops_per_call=1):
+    """
+    Time func() over repeats calls after warmup calls.
+
+    Returns:
+        dict: ops_per_sec, mean/min/max and p50/p90/p99 latencies (s per call), repeats and ops_per_call
+    """
+    for _ in range(warmup):
+        func()
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings[i] = time.perf_counter() - start
+    p50, p90, p99 = np.percentile(timings, [50, 90, 99])
+    return {
+        "ops_per_sec": ops_per_call * repeats / timings.sum(),
+        "mean_s": float(timings.mean()),
+        "min_s": float(timings.min()),
+        "p50_s": float(p50),
+        "p90_s": float(p90),
+        "p99_s": float(p99),
+        "max_s": float(timings.max()),
+        "repeats": repeats,
+        "ops_per_call": ops_per_call,
+    }
+
+
+#------------Benchmark definitions------------
+def benchmark_cases():
+    """
+    (name, func, ops_per_call, repeat scale) for every benchmark. The repeat scale shrinks the
+    number of repeats for the slow workloads.
+    """
+    cases = []
+    for material, build in (("steel", steel_segments), ("hdpe", hdpe_segments)):
+        for n in (1, 10, 1000):
+            segments = build(n)
+            cases.append((f"calculate_pressure_drop/{material}/{n}_segments",
+                          lambda segments=segments: calculate_pressure_drop(segments, DENSITY, VISCOSITY, FLOW_RATE),
+                          1, 1 if n < 1000 else 0.05))
+
+    derivative_segments = steel_segments(1000)
+    cases.append(("calculate_pressure_drop/steel/1000_segments/derivatives",
+                  lambda: calculate_pressure_drop(derivative_segments, DENSITY, VISCOSITY, FLOW_RATE, derivatives=True),
+                  1, 0.05))
+
+    sizing_segments = steel_segments(10) + hdpe_segments(10)
+    cases.append(("optimize_segments/20_segments",
+                  lambda: [size_segment(seg, DENSITY, VISCOSITY, FLOW_RATE, P_DROP_THRESHOLD, VELOCITY_THRESHOLD)
+                           for seg in sizing_segments],
+                  1, 0.2))
+    line_segments = steel_segments(10)
+    cases.append(("optimize_line/steel/10_segments",
+                  lambda: optimize_line(line_segments, DENSITY, VISCOSITY, FLOW_RATE, P_DROP_THRESHOLD,
+                                        VELOCITY_THRESHOLD),
+                  1, 0.2))
+
+    # One size edit on a 500 segment line and the new total, against a full recalculation
+    edit_line = IncrementalLine(steel_segments(500), DENSITY, VISCOSITY, FLOW_RATE)
+    # Edits must give the same total as a full recalculation, also for segments carrying stored results
+    edit_line.segments[0]["Velocity (m/s)"] = 1.0
+    edit_line.update_segment(0, {"elbows_90": 3}, Nom_D=4.0)
+    edit_line.check()
+    edit_sizes = [2.0, 3.0]
+    edit_counter = iter(range(10 ** 9))
+
+    def edit_and_total():
+        k = next(edit_counter)
+        edit_line.update_segment(k % 500, Nom_D=edit_sizes[k % 2])
+        return edit_line.total_pressure_drop_kPa
+
+    cases.append(("incremental_line/500_segments/edit", edit_and_total, 1, 1))
+
+    # A repeated line, answered from the result cache (key hashing plus unpickling the stored result)
+    cached_segments = steel_segments(500)
+    result_cache = ResultCache()
+    cached_pressure_drop(cached_segments, DENSITY, VISCOSITY, FLOW_RATE, cache=result_cache)
+    cases.append(("cached_pressure_drop/hit/500_segments",
+                  lambda: cached_pressure_drop(cached_segments, DENSITY, VISCOSITY, FLOW_RATE, cache=result_cache),
+                  1, 0.2))
+
+    fluid_props = {"density": DENSITY, "viscosity_cP": VISCOSITY}
+    other_inputs = pump_lines()
+    for num_points in (20, 1000, 100000):
+        cases.append((f"run_flow_curve/{num_points}_points",
+                      lambda num_points=num_points: run_flow_curve(fluid_props, 5, 150, num_points, other_inputs),
+                      1, 1 if num_points < 100000 else 0.05))
+
+    rng = random.Random(SEED)
+    hdpe_keys = [(DN, sdr) for DN in sorted(AS4130_HDPE) for sdr, props in AS4130_HDPE[DN].items()
+                 if props["MeanID"] is not None]
+    hdpe_queries = [rng.choice(hdpe_keys) for _ in range(1000)]
+    cases.append(("lookup_hdpe_pipe/1000_lookups",
+                  lambda: [lookup_hdpe_pipe(DN, sdr) for DN, sdr in hdpe_queries], 1000, 1))
+    cases.append(("hdpe_pipe/1000_lookups",
+                  lambda: [hdpe_pipe(DN, sdr) for DN, sdr in hdpe_queries], 1000, 1))
+
+    reducer_pairs = [rng.choice(list(reducer_lengths_dict)) for _ in range(1000)]
+    cases.append(("reducer_lengths_dict/1000_lookups",
+                  lambda: [reducer_lengths_dict.get(pair) for pair in reducer_pairs], 1000, 1))
+    geoms = [resolve_segment(seg) for seg in steel_segments(101)]
+    cases.append(("reducer_K/100_pairs",
+                  lambda: [reducer_K(prev, cur) for prev, cur in zip(geoms[:-1], geoms[1:])], 100, 1))
+
+    np_rng = np.random.default_rng(SEED)
+    Re = 10 ** np_rng.uniform(3.7, 8, 100000)
+    rel_roughness = 10 ** np_rng.uniform(-7, -1.5, 100000)
+    for model in friction_models:
+        cases.append((f"darcy_friction_factor/{model}/100000_points",
+                      lambda model=model: darcy_friction_factor(Re, rel_roughness, model), 100000, 0.1))
+
+    # Operating points of one pump on 10000 system curves (static head + k Q^2) of 200 points
+    pump = PumpCurve([0, 20, 40, 60, 80, 100, 120], [52, 51.5, 50, 47, 43, 37.5, 30.5],
+                     [0, 0.45, 0.65, 0.75, 0.78, 0.74, 0.62], [1.5, 1.6, 1.9, 2.4, 3.1, 4.0, 5.2])
+    system_flows = np.linspace(0, 150, 200)
+    system_heads = (np_rng.uniform(5, 40, (10000, 1))
+                    + np_rng.uniform(0.0005, 0.005, (10000, 1)) * system_flows ** 2)
+    cases.append(("solve_operating_points/10000_curves",
+                  lambda: solve_operating_points(pump, system_flows, system_heads, density=DENSITY), 10000, 0.1))
+
+    system = {"flow_rates": system_flows, "pump_head": system_heads[0], "NPSHA": np.full(system_flows.size, 8.0)}
+    cases.append(("vsd_sweep/1001_speeds_x_200_flows",
+                  lambda: vsd_sweep(pump, system, np.linspace(0.3, 1.0, 1001), density=DENSITY), 1, 0.1))
+
+    catalogue = PumpCatalogue.from_records(pump_catalogue_records(200))
+    cases.append(("PumpCatalogue.select/800_entries/duty",
+                  lambda: catalogue.select(85.0, 42.0, k=5, NPSHA_m=8.0, density=DENSITY), 1, 1))
+
+    # A year of 15 minute flows through a 10 + 10 segment line
+    profile_flows = np.clip(FLOW_RATE * (1 + 0.3 * np.sin(np.arange(35040) * 2 * np.pi / 96))
+                            + np_rng.normal(0, 5, 35040), 0, None)
+    profile_inputs = {"segments_suction": steel_segments(10), "segments_discharge": steel_segments(10),
+                      "suction_elev_diff": 2.0, "total_elevation_diff": 15.0, "max_dest_pressure": 50.0,
+                      "efficiency": 0.75, "vapor_pressure_kPa": 2.34, "altitude_m": 400}
+    cases.append(("duty_profile_energy/35040_steps",
+                  lambda: duty_profile_energy(profile_flows, {"density": DENSITY, "viscosity_cP": VISCOSITY},
+                                              profile_inputs, timestep_h=0.25, pump=pump, price_per_kWh=0.28),
+                  1, 0.1))
+
+    cases.append(("monte_carlo_pump/100000_samples",
+                  lambda: monte_carlo_pump({"density": DENSITY, "viscosity_cP": VISCOSITY}, FLOW_RATE, profile_inputs,
+                                           100000, seed=SEED),
+                  100000, 0.05))
+
+    pump_args = (12.0, 85.0, FLOW_RATE, 2.0, 15.0, 50.0, DENSITY, 0.75, 2.34, 400)
+    cases.append(("pump_sizing/scalar", lambda: pump_sizing(*pump_args), 1, 1))
+    return cases
+
+
+def run_flow_curve(*args):
+    # Imported on use, the pump curve script pulls in tkinter and matplotlib
+    from Centrifugal_Pump_Sizing_With_Curve import run_flow_curve as _run_flow_curve
+    return _run_flow_curve(*args)
+
+
+def run_benchmarks(name_filter=None, repeats=200, warmup=5):
+    results = {}
+    for name, func, ops_per_call, scale in benchmark_cases():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = time_call(func, max(3, int(repeats * scale)), warmup if scale >= 1 else 1, ops_per_call)
+        print(f"{name:45s} {results[name]['ops_per_sec']:14.1f} ops/s   p50 {results[name]['p50_s'] * 1e3:9.3f} ms",
+              file=sys.stderr)
+    return results
+
+
+#------------Import times------------
+def import_time(module, repeats=3):
+    """Best of repeats wall times (s) to import module in a fresh interpreter, less the interpreter start up."""
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return time.perf_counter() - start
+    baseline = min(run("pass") for _ in range(repeats))
+    return max(0.0, min(run(f"import {module}") for _ in range(repeats)) - baseline)
+
+
+def check_import_budgets(budgets=None):
+    """Import time of each module against its budget. Returns {module: {"import_s", "budget_s", "ok"}}."""
+    results = {}
+    for module, budget in (budgets or import_budgets).items():
+        seconds = import_time(module)
+        results[module] = {"import_s": seconds, "budget_s": budget, "ok": seconds <= budget}
+        print(f"import {module:42s} {seconds * 1e3:8.1f} ms  (budget {budget * 1e3:.0f} ms)"
+              f"{'' if seconds <= budget else '  OVER BUDGET'}", file=sys.stderr)
+    return results
+
+
+#------------Reporting------------
+def package_version(name):
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(repeats, warmup):
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": package_version("numpy"),
+        "fluids": package_version("fluids"),
+        "seed": SEED,
+        "repeats": repeats,
+        "warmup": warmup,
+    }
+
+
+def compare(results, baseline):
+    """ops/sec of this run relative to a baseline run (>1 is faster), for benchmarks in both."""
+    ratios = {}
+    for name, stats in results.items():
+        old = baseline.get("benchmarks", {}).get(name)
+        if old:
+            ratios[name] = stats["ops_per_sec"] / old["ops_per_sec"]
+    return ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hydraulics and pump kernels.")
+    parser.add_argument("-o", "--output", help="JSON results file (default: stdout)")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--repeats", type=int, default=200, help="Timed calls per benchmark (default: 200)")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed calls first (default: 5)")
+    parser.add_argument("--quick", action="store_true", help="Few repeats, for a smoke test")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    parser.add_argument("--imports-only", action="store_true", help="Only check import times against budgets")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.repeats, args.warmup = 10, 1
+    if args.imports_only:
+        imports = check_import_budgets()
+        print(json.dumps({"meta": metadata(0, 0), "imports": imports}, indent=2))
+        return 0 if all(result["ok"] for result in imports.values()) else 1
+
+    # Discard any prints from inside the kernels, they would swamp the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        benchmarks = run_benchmarks(args.filter, args.repeats, args.warmup)
+    report = {"meta": metadata(args.repeats, args.warmup), "benchmarks": benchmarks,
+              "imports": check_import_budgets() if not args.filter else {}}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report["baseline_commit"] = baseline.get("meta", {}).get("commit")
+        report["speedup"] = compare(report["benchmarks"], baseline)
+        for name, ratio in report["speedup"].items():
+            print(f"{name:45s} {ratio:6.2f}x", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
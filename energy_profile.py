@@ -0,0 +1,158 @@
+# Duty Profile Energy
+# Built by Louis Walker, Process Engineer, 2025
+# Energy and cost of pumping over a duty profile: a time series of flows (hourly, 15 minute or any
+# step) and optionally fluid temperatures, typically a year of 8760 or 35040 points. Every point is
+# evaluated at once: the suction and discharge line pressure drops through
+# calculate_pressure_drop_array (with per-point density and viscosity when temperatures are given),
+# the system head and power through pump_sizing, then energy and cost are summed over the profile.
+# The flow is taken as delivered by control (speed or throttling) at each step, with the pump
+# efficiency either fixed or read from a fitted pump_curve.PumpCurve at that flow.
+# The load-duration distribution is the brake power sorted from highest to lowest against the hours
+# it is reached or exceeded, with the hours and energy spent in each flow band.
+#
+# Usage:
+#   profile = duty_profile_energy(flows, fluid_props, other_inputs, timestep_h=0.25, price_per_kWh=0.28)
+#   profile["energy_kWh"], profile["cost"]
+#   profile["load_duration"]["hours"], profile["load_duration"]["brake_power_kW"]
+
+import numpy as np
+from Hydraulics_Script_Advanced_Core_Working import calculate_pressure_drop_array
+from Centrifugal_Pump_Sizing_Core import pump_sizing
+from fluid_properties import get_property_table
+
+num_flow_bands = 10  # Flow bands of the duty distribution
+
+
+def profile_fluid_properties(fluid_name, temperature_C):
+    """
+    Density (kg/m3), viscosity (cP) and vapour pressure (kPa) at each temperature of a profile, from
+    one property table covering the whole temperature range.
+    """
+    T = np.asarray(temperature_C, dtype=float) + 273.15
+    table = get_property_table(fluid_name, float(T.min()), float(T.max()))
+    return {
+        "density": table.rho(T),
+        "viscosity_cP": table.mu(T) * 1000,  # Pa.s to cP
+        "vapor_pressure_kPa": table.Psat(T) / 1000,
+    }
+
+
+def duty_profile_energy(flow_m3hr, fluid_props, other_inputs, timestep_h=1.0, temperature_C=None, pump=None,
+                        price_per_kWh=0.0, motor_efficiency=1.0, flow_bands=num_flow_bands,
+                        friction_model="swamee_jain"):
+    """
+    Energy use and cost of a pump over a duty profile.
+
+    Args:
+        flow_m3hr (array like): Flow at each step of the profile, m3/hr (0 when the pump is stopped)
+        fluid_props (dict): "density" (kg/m3) and "viscosity_cP", used when there are no temperatures,
+                            and "fluid_name" when there are
+        other_inputs (dict): Line and duty inputs as for run_flow_curve: "segments_suction",
+                             "segments_discharge", "suction_elev_diff", "total_elevation_diff",
+                             "max_dest_pressure" and optionally "efficiency", "vapor_pressure_kPa",
+                             "altitude_m"
+        timestep_h (float or array like): Length of each step, hours (0.25 for 15 minute data)
+        temperature_C (array like): Fluid temperature at each step, °C. Density, viscosity and vapour
+                                    pressure then follow the temperature (needs "fluid_name")
+        pump (PumpCurve): Fitted pump curve, for the efficiency at each flow instead of
+                          other_inputs["efficiency"]
+        price_per_kWh (float or array like): Energy price, a single tariff or one per step
+        motor_efficiency (float): Motor (and drive) efficiency, electrical to shaft power
+        flow_bands (int): Number of flow bands in the distribution
+        friction_model (str): Friction factor model, see friction_factor.py
+
+    Returns:
+        dict:
+            "energy_kWh", "cost", "running_hours", "total_hours", "mean_power_kW", "peak_power_kW",
+            "volume_m3" and "specific_energy_kWh_m3" for the whole profile
+            "pump_head_m", "efficiency", "brake_power_kW", "electrical_power_kW", "NPSHA" at each step
+            "load_duration": "brake_power_kW" sorted high to low and "hours" at or above each power
+            "flow_bands": "edges_m3hr" (bands + 1,), "hours", "energy_kWh" and "cost" in each band
+    """
+    flows = np.asarray(flow_m3hr, dtype=float)
+    if flows.ndim != 1 or flows.size == 0:
+        raise ValueError("Flow profile must be a non-empty 1D series")
+    if np.any(flows < 0):
+        raise ValueError("Flow profile cannot have negative flows")
+    if motor_efficiency <= 0 or motor_efficiency > 1:
+        raise ValueError("Motor efficiency should be between 0 and 1")
+    hours = np.broadcast_to(np.asarray(timestep_h, dtype=float), flows.shape)
+    price = np.broadcast_to(np.asarray(price_per_kWh, dtype=float), flows.shape)
+
+    if temperature_C is not None:
+        if np.shape(temperature_C) != flows.shape:
+            raise ValueError("Temperature profile must have one value per flow")
+        props = profile_fluid_properties(fluid_props["fluid_name"], temperature_C)
+        density, viscosity = props["density"], props["viscosity_cP"]
+        vapor_pressure_kPa = props["vapor_pressure_kPa"]
+    else:
+        density, viscosity = fluid_props["density"], fluid_props["viscosity_cP"]
+        vapor_pressure_kPa = other_inputs.get("vapor_pressure_kPa", 0)
+
+    results_suction = calculate_pressure_drop_array(other_inputs["segments_suction"], density, viscosity, flows,
+                                                    friction_model)
+    results_discharge = calculate_pressure_drop_array(other_inputs["segments_discharge"], density, viscosity,
+                                                      flows, friction_model)
+    # Hydraulic power only here, the efficiency can vary per step
+    sizing = pump_sizing(
+        results_suction["total_pressure_drop_kPa"],
+        results_discharge["total_pressure_drop_kPa"],
+        flows,
+        other_inputs["suction_elev_diff"],
+        other_inputs["total_elevation_diff"],
+        max_dest_pressure=other_inputs["max_dest_pressure"],
+        density=density,
+        efficiency=1.0,
+        vapor_pressure_kPa=vapor_pressure_kPa,
+        altitude_m=other_inputs.get("altitude_m", 0)
+    )
+
+    running = flows > 0
+    if pump is not None:
+        efficiency = np.where(running, pump.efficiency(flows), np.nan)
+        if np.any(efficiency[running] <= 0):
+            raise ValueError("Pump curve has no efficiency at some flows of the profile")
+    else:
+        efficiency = np.where(running, other_inputs.get("efficiency", 0.75), np.nan)
+        if np.any(efficiency[running] <= 0) or np.any(efficiency[running] > 1):
+            raise ValueError("Pump efficiency should be between 0 and 1")
+    brake_power_kW = np.zeros(flows.shape)
+    brake_power_kW[running] = sizing["hydraulic_power_kW"][running] / efficiency[running]
+    electrical_power_kW = brake_power_kW / motor_efficiency
+
+    step_energy = electrical_power_kW * hours
+    energy_kWh = float(step_energy.sum())
+    volume_m3 = float((flows * hours).sum())
+    total_hours = float(hours.sum())
+
+    # Load duration: hours at or above each power level
+    order = np.argsort(-brake_power_kW, kind="stable")
+    edges = np.linspace(0.0, flows.max(), flow_bands + 1)
+    band = np.clip(np.searchsorted(edges, flows, side="right") - 1, 0, flow_bands - 1)
+
+    return {
+        "energy_kWh": energy_kWh,
+        "cost": float((step_energy * price).sum()),
+        "running_hours": float(hours[running].sum()),
+        "total_hours": total_hours,
+        "mean_power_kW": energy_kWh / total_hours,
+        "peak_power_kW": float(electrical_power_kW.max()),
+        "volume_m3": volume_m3,
+        "specific_energy_kWh_m3": energy_kWh / volume_m3 if volume_m3 > 0 else np.nan,
+        "flow_rates": flows,
+        "pump_head_m": sizing["pump_head_m"],
+        "efficiency": efficiency,
+        "brake_power_kW": brake_power_kW,
+        "electrical_power_kW": electrical_power_kW,
+        "NPSHA": sizing["NPSHA"],
+        "load_duration": {
+            "brake_power_kW": brake_power_kW[order],
+            "hours": np.cumsum(hours[order]),
+        },
+        "flow_bands": {
+            "edges_m3hr": edges,
+            "hours": np.bincount(band, weights=hours, minlength=flow_bands),
+            "energy_kWh": np.bincount(band, weights=step_energy, minlength=flow_bands),
+            "cost": np.bincount(band, weights=step_energy * price, minlength=flow_bands),
+        },
+    }
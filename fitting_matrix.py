@@ -0,0 +1,183 @@
+# Fitting Count Matrix
+# Built by Louis Walker, Process Engineer, 2025
+# Fittings losses as linear algebra. Each segment is a row of fitting counts (one column per fitting
+# type) and each pipe diameter has a K basis, the K of one of each fitting type from the Crane
+# TPM-410 (2009) correlations, computed once per diameter and cached. Every Crane fitting K is either
+# a constant for a given diameter or proportional to the friction factor (K = c * fd), so the basis
+# is split into an fd part (evaluated with fd = 1) and a constant part, and for a segment
+#     K total = fd * (counts . basis_fd) + counts . basis_const
+# For thousands of segments the K values are a single NumPy product of the count matrix with the
+# basis rows for each segment's diameter.
+# Segments may be dicts or pipe_segment.Segment / SegmentArray, whose counts are already stored in
+# fitting_keys order, so they skip the per-key lookups. Old key names in segment dicts are read as
+# the current ones (key_aliases), the same as when a Segment is built.
+
+from functools import lru_cache
+from operator import mul, itemgetter
+import numpy as np
+from fluids import fittings
+
+# (segment key, "fd" if K is proportional to the friction factor else "const", K of one fitting at
+# internal diameter D (m), with fd = 1 for the "fd" types)
+fitting_types = (
+    ("elbows_90", "fd", lambda D: 14.0),  # Crane A-30, long radius elbow r/D = 1.5
+    ("elbows_45", "fd", lambda D: 16.0),  # Crane A-30, standard 45 deg elbow
+    ("U-bends", "fd", lambda D: 50.0),  # Crane A-30
+    ("Tees through branch", "fd", lambda D: 60.0),  # Crane A-30
+    ("Tees run thru", "fd", lambda D: 20.0),  # Crane A-30
+    ("Std Globe Valve", "fd", lambda D: fittings.K_globe_valve_Crane(D1=D, D2=D, fd=1.0)),
+    ("Butterfly valve centric", "fd", lambda D: fittings.K_butterfly_valve_Crane(D, fd=1.0, style=0)),
+    ("Butterfly valve double offset", "fd", lambda D: fittings.K_butterfly_valve_Crane(D, fd=1.0, style=1)),
+    ("Butterfly valve triple offset", "fd", lambda D: fittings.K_butterfly_valve_Crane(D, fd=1.0, style=2)),
+    ("Plug Valve through branch", "const", lambda D: fittings.K_plug_valve_Crane(D1=D, D2=D, angle=180, style=2)),
+    ("Plug Valve run thru", "const", lambda D: fittings.K_plug_valve_Crane(D1=D, D2=D, angle=180, style=1)),
+    ("Std Ball Valve-2 port", "const", lambda D: fittings.K_ball_valve_Crane(D1=D, D2=D, angle=180)),
+    ("Std Ball Valve-3 port", "const", lambda D: 0.3),  # Approximate max loss
+    ("Check Valve Swing", "const", lambda D: fittings.K_swing_check_valve_Crane(D)),
+    # Crane A-28, assumes the seat of a lift check valve is about half the pipe bore
+    ("Check Valve Lift", "const", lambda D: fittings.K_lift_check_valve_Crane(D1=D * 0.5, D2=D)),
+    ("Check Valve Tilting", "const", lambda D: fittings.K_tilting_disk_check_valve_Crane(D, 15)),
+    ("Pipe Entrances", "const", lambda D: fittings.entrance_sharp(method='Crane')),
+    ("Pipe Exits", "const", lambda D: fittings.exit_normal()),
+    ("User supplied K", "const", lambda D: 1.0),  # The "count" is the user's K value
+)
+
+fitting_keys = tuple(key for key, _, _ in fitting_types)
+# Old key names, read as the current ones
+key_aliases = {
+    "Number of Swing Type Check Valves": "Check Valve Swing",
+    "Number of Lift Type Check Valves": "Check Valve Lift",
+    "Number of Tilting Type Check Valves": "Check Valve Tilting",
+}
+_alias_keys = frozenset(key_aliases)
+# Entrances, exits and user K are reported separately from the valves and fittings in the results
+end_keys = ("Pipe Entrances", "Pipe Exits", "User supplied K")
+# Check valves can be left out (check_valves=False), for callers that do not count them
+check_valve_keys = ("Check Valve Swing", "Check Valve Lift", "Check Valve Tilting")
+is_fd = np.array([kind == "fd" for _, kind, _ in fitting_types])
+is_end = np.array([key in end_keys for key in fitting_keys])
+is_check_valve = np.array([key in check_valve_keys for key in fitting_keys])
+fd_keys = tuple(key for key, kind, _ in fitting_types if kind == "fd")
+const_keys = tuple(key for key, kind, _ in fitting_types if kind != "fd")
+# Constant K keys for each (include_ends, check_valves) choice
+_const_key_sets = {(ends, checks): tuple(key for key in const_keys if (ends or key not in end_keys)
+                                         and (checks or key not in check_valve_keys))
+                   for ends in (True, False) for checks in (True, False)}
+_zeros = (0,) * len(fitting_keys)  # Defaults for map(seg.get, keys, _zeros)
+# Positions of the fd / const keys in a counts tuple in fitting_keys order (pipe_segment.Segment.counts)
+_fd_counts = itemgetter(*(fitting_keys.index(key) for key in fd_keys))
+_const_counts = {flags: itemgetter(*(fitting_keys.index(key) for key in keys)) for flags, keys in _const_key_sets.items()}
+
+
+#------------K basis------------
+@lru_cache(maxsize=4096)
+def _K_basis_row(D):
+    row = np.array([K(D) for _, _, K in fitting_types])
+    row.flags.writeable = False  # Shared by every caller through the cache
+    return row
+
+
+@lru_cache(maxsize=4096)
+def _K_basis_split(D):
+    # (fd K values, {(include_ends, check_valves): constant K values}) as tuples, for the single
+    # segment path
+    row = _K_basis_row(D)
+    K_by_key = dict(zip(fitting_keys, row.tolist()))
+    return (tuple(K_by_key[key] for key in fd_keys),
+            {flags: tuple(K_by_key[key] for key in keys) for flags, keys in _const_key_sets.items()})
+
+
+def K_basis(diameters):
+    """
+    K basis for each diameter, one row per diameter and one column per fitting type.
+
+    Args:
+        diameters (array like): Internal diameters, m
+
+    Returns:
+        array: (diameters x fitting types) K values for one fitting, with fd = 1 for the fd types
+    """
+    diameters = np.atleast_1d(np.asarray(diameters, dtype=float))
+    unique, inverse = np.unique(diameters, return_inverse=True)
+    basis = np.array([_K_basis_row(float(D)) for D in unique]).reshape(unique.size, len(fitting_types))
+    return basis[inverse.ravel()]
+
+
+#------------Count matrix------------
+def current_keys(seg):
+    """A segment dict with old key names (key_aliases) renamed to the current ones; seg itself if it has none."""
+    if _alias_keys.isdisjoint(seg):
+        return seg
+    return {key_aliases.get(key, key): val for key, val in seg.items()}
+
+
+def _count_row(seg):
+    if isinstance(seg, dict):
+        seg = current_keys(seg)
+        return [seg.get(key, 0) for key in fitting_keys]
+    return seg.counts[:len(fitting_keys)]  # pipe_segment.Segment
+
+
+def fitting_counts(seg):
+    """Fitting count vector for one segment (dict or Segment), in fitting_keys order."""
+    return np.array(_count_row(seg), dtype=float)
+
+
+def fitting_count_matrix(segments):
+    """Fitting count matrix, one row per segment and one column per fitting type."""
+    if hasattr(segments, "count_matrix"):
+        return segments.count_matrix()  # pipe_segment.SegmentArray, no per-segment work
+    return np.array([_count_row(seg) for seg in segments],
+                    dtype=float).reshape(len(segments), len(fitting_keys))
+
+
+#------------K totals------------
+def fitting_K(counts, diameters, include_ends=True, check_valves=True):
+    """
+    K_fd and K_const for every segment, from the count matrix and each segment's K basis row.
+
+    Args:
+        counts (array): (segments x fitting types) count matrix
+        diameters (array like): Internal diameter of each segment, m
+        include_ends (bool): Include entrances, exits and user K
+        check_valves (bool): Include check valves
+
+    Returns:
+        tuple: (K_fd, K_const) arrays, one value per segment. Total K = fd * K_fd + K_const
+    """
+    basis = K_basis(diameters)
+    if not include_ends:
+        basis = basis * ~is_end
+    if not check_valves:
+        basis = basis * ~is_check_valve
+    weighted = counts * basis
+    return weighted[:, is_fd].sum(axis=1), weighted[:, ~is_fd].sum(axis=1)
+
+
+def segment_fitting_K(seg, D, include_ends=True, check_valves=True):
+    """
+    K_fd and K_const (floats) for one segment (dict or Segment) at internal diameter D (m). Plain
+    Python dot products, which beat NumPy for a single short count vector.
+    """
+    basis_fd, basis_const = _K_basis_split(float(D))
+    flags = (include_ends, check_valves)
+    if not isinstance(seg, dict):
+        counts = seg.counts  # pipe_segment.Segment
+        K_fd = sum(map(mul, _fd_counts(counts), basis_fd))
+        return K_fd, sum(map(mul, _const_counts[flags](counts), basis_const[flags]))
+    seg = current_keys(seg)
+    K_fd = sum(map(mul, map(seg.get, fd_keys, _zeros), basis_fd))
+    K_const = sum(map(mul, map(seg.get, _const_key_sets[flags], _zeros), basis_const[flags]))
+    return K_fd, K_const
+
+
+def size_fitting_K(seg, diameters, check_valves=True):
+    """
+    K_fd and K_const of one segment's fittings at each of several diameters (e.g. candidate sizes),
+    as a basis matrix times count vector product.
+    """
+    counts = fitting_counts(seg)
+    if not check_valves:
+        counts = counts * ~is_check_valve
+    basis = K_basis(diameters)
+    return basis[:, is_fd] @ counts[is_fd], basis[:, ~is_fd] @ counts[~is_fd]
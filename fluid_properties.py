@@ -0,0 +1,219 @@
+# Fluid Property Service
+# Built by Louis Walker, Process Engineer, 2025
+# Building a thermo Chemical is one of the slowest steps in the hydraulics and pump scripts.
+# This module builds each Chemical once, caches property lookups per (fluid, T, P) with LRU
+# eviction, and can tabulate rho(T), mu(T) and Psat(T) over a temperature range so that later
+# queries are answered by interpolation, with an estimated error bound.
+# Tabulated curves are also saved to a local on-disk store (one .npz file per table), so a new
+# process can warm-start from disk without importing thermo or building a Chemical at all.
+
+import os
+import re
+import hashlib
+from functools import lru_cache
+from collections import OrderedDict
+from importlib.metadata import version, PackageNotFoundError
+import numpy as np
+
+P_ATM = 101325  # Pa
+
+# Bump when the layout of the cache files changes
+CACHE_FORMAT_VERSION = 1
+# Folder for the on-disk property store, can be moved with the LINE_SIZING_CACHE_DIR environment variable
+CACHE_DIR = os.environ.get("LINE_SIZING_CACHE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".line_sizing_cache", "fluid_properties"))
+
+
+def thermo_version():
+    """Installed thermo version, read from package metadata so thermo itself is not imported."""
+    try:
+        return version("thermo")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+@lru_cache(maxsize=32)
+def get_chemical(fluid_name):
+    """Build (once) the thermo Chemical for a fluid. The object is re-used for every temperature."""
+    from thermo.chemical import Chemical  # Imported here, thermo takes a noticeable time to load
+    return Chemical(fluid_name)
+
+
+@lru_cache(maxsize=1024)
+def _fluid_state(fluid_name, T, P):
+    chem = get_chemical(fluid_name)
+    chem.calculate(T=T, P=P)
+    return chem.rho, chem.mu, chem.Psat, chem.Tb, chem.phase
+
+
+def fluid_state(fluid_name, T, P=P_ATM):
+    """
+    Fluid properties at a single state, cached per (fluid, T, P).
+
+    Args:
+        fluid_name (str): Fluid name or CAS number recognised by thermo, e.g. "water"
+        T (float): Temperature, K
+        P (float): Pressure, Pa
+
+    Returns:
+        dict: "rho" (kg/m3), "mu" (Pa.s), "Psat" (Pa), "Tb" (K) and "phase"
+    """
+    rho, mu, Psat, Tb, phase = _fluid_state(fluid_name, float(T), float(P))
+    return {"rho": rho, "mu": mu, "Psat": Psat, "Tb": Tb, "phase": phase}
+
+
+#------------On-disk store for tabulated properties------------
+def _cache_path(fluid_name, P, T_min, T_max, num_points):
+    key = repr((fluid_name, float(P), float(T_min), float(T_max), int(num_points),
+                thermo_version(), CACHE_FORMAT_VERSION))
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", fluid_name)
+    return os.path.join(CACHE_DIR, f"{safe_name}_{digest}.npz")
+
+
+def load_table_arrays(fluid_name, P, T_min, T_max, num_points):
+    """Tabulated arrays from the on-disk store, or None if missing, stale or unreadable."""
+    path = _cache_path(fluid_name, P, T_min, T_max, num_points)
+    try:
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+    except (OSError, ValueError):
+        return None
+    # The version is part of the file name; also check the stored copy in case of a hash collision
+    if (str(arrays.get("thermo_version")) != thermo_version()
+            or int(arrays.get("format_version", -1)) != CACHE_FORMAT_VERSION
+            or str(arrays.get("fluid_name")) != fluid_name):
+        return None
+    return arrays
+
+
+def save_table_arrays(fluid_name, P, T_min, T_max, num_points, arrays):
+    """Write tabulated arrays to the on-disk store. Failures are ignored, the store is only a cache."""
+    path = _cache_path(fluid_name, P, T_min, T_max, num_points)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        np.savez(tmp_path, fluid_name=fluid_name, thermo_version=thermo_version(),
+                 format_version=CACHE_FORMAT_VERSION, **arrays)
+        os.replace(tmp_path, path)  # Atomic, so concurrent processes never see a half written file
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def clear_disk_cache():
+    """Delete every file in the on-disk property store."""
+    if os.path.isdir(CACHE_DIR):
+        for name in os.listdir(CACHE_DIR):
+            if name.endswith(".npz"):
+                os.remove(os.path.join(CACHE_DIR, name))
+
+
+#------------Tabulated properties with interpolation------------
+class FluidPropertyTable:
+    """
+    rho(T), mu(T) and Psat(T) for one fluid, tabulated over [T_min, T_max] and interpolated.
+    Density is interpolated linearly; viscosity and vapour pressure (close to exponential in T)
+    are interpolated in log space. The grid end points are exact tabulated values.
+
+    error_bound holds the maximum relative interpolation error for each property, estimated
+    against exact values at the midpoint of every interval (where linear interpolation error
+    is largest).
+
+    With persistent=True the tabulated values are read from, or written to, the on-disk store.
+    """
+    properties = ("rho", "mu", "Psat")
+
+    def __init__(self, fluid_name, T_min, T_max, num_points=50, P=P_ATM, persistent=True):
+        if T_max < T_min:
+            raise ValueError("T_max must not be less than T_min")
+        if num_points < 2:
+            raise ValueError("Need at least 2 points")
+        self.fluid_name = fluid_name
+        self.P = P
+        self.T_min = T_min
+        self.T_max = T_max
+
+        # Evaluate on a grid twice as fine; the odd points are only used for the error estimate
+        arrays = load_table_arrays(fluid_name, P, T_min, T_max, num_points) if persistent else None
+        self.from_disk = arrays is not None
+        if arrays is None:
+            arrays = self._tabulate(fluid_name, np.linspace(T_min, T_max, 2 * num_points - 1), P)
+            if persistent:
+                save_table_arrays(fluid_name, P, T_min, T_max, num_points, arrays)
+        T_fine = arrays["T"]
+        values = {prop: arrays[prop] for prop in self.properties}
+        self.Tb = float(arrays["Tb"])
+
+        self.T = T_fine[::2]
+        self.log_space = {prop: prop != "rho" and bool(np.all(values[prop] > 0)) for prop in self.properties}
+        self.table = {prop: values[prop][::2] for prop in self.properties}
+        self._y = {prop: np.log(self.table[prop]) if self.log_space[prop] else self.table[prop]
+                   for prop in self.properties}
+        self.error_bound = {}
+        for prop in self.properties:
+            exact = values[prop][1::2]
+            approx = self.interpolate(prop, T_fine[1::2])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rel_error = np.abs(approx - exact) / np.abs(exact)
+            rel_error = rel_error[np.isfinite(rel_error)]
+            self.error_bound[prop] = float(rel_error.max()) if rel_error.size else 0.0
+
+    @staticmethod
+    def _tabulate(fluid_name, T_fine, P):
+        arrays = {"T": T_fine}
+        for prop in FluidPropertyTable.properties:
+            arrays[prop] = np.empty(T_fine.size)
+        for i, T in enumerate(T_fine):
+            state = fluid_state(fluid_name, T, P)
+            for prop in FluidPropertyTable.properties:
+                arrays[prop][i] = np.nan if state[prop] is None else state[prop]
+        arrays["Tb"] = np.nan if state["Tb"] is None else state["Tb"]
+        return arrays
+
+    def covers(self, T_min, T_max):
+        return self.T_min <= T_min and T_max <= self.T_max
+
+    def interpolate(self, prop, T):
+        """Interpolated property at temperature(s) T (K). Accepts scalars or arrays."""
+        T_arr = np.asarray(T, dtype=float)
+        if np.any(T_arr < self.T_min) or np.any(T_arr > self.T_max):
+            raise ValueError(f"Temperature outside tabulated range {self.T_min:.2f}-{self.T_max:.2f} K")
+        y = np.interp(T_arr, self.T, self._y[prop])
+        y = np.exp(y) if self.log_space[prop] else y
+        return float(y) if y.ndim == 0 else y
+
+    def rho(self, T):
+        return self.interpolate("rho", T)
+
+    def mu(self, T):
+        return self.interpolate("mu", T)
+
+    def Psat(self, T):
+        return self.interpolate("Psat", T)
+
+
+_property_tables = OrderedDict()
+max_property_tables = 32
+
+
+def get_property_table(fluid_name, T_min, T_max, num_points=50, P=P_ATM, persistent=True):
+    """
+    Property table for a fluid covering [T_min, T_max] (K). The table is loaded from the on-disk
+    store or built on first use, and re-used for any later request that falls inside it; least
+    recently used tables are evicted from memory.
+    """
+    key = (fluid_name, float(P), num_points)
+    table = _property_tables.get(key)
+    if table is not None and table.covers(T_min, T_max):
+        _property_tables.move_to_end(key)
+        return table
+    if table is not None:
+        # Widen the existing range rather than building a second, overlapping table
+        T_min, T_max = min(T_min, table.T_min), max(T_max, table.T_max)
+    table = FluidPropertyTable(fluid_name, T_min, T_max, num_points, P, persistent)
+    _property_tables[key] = table
+    _property_tables.move_to_end(key)
+    while len(_property_tables) > max_property_tables:
+        _property_tables.popitem(last=False)
+    return table
@@ -0,0 +1,187 @@
+# Incremental Line Evaluation
+# Built by Louis Walker, Process Engineer, 2025
+# Holds the results of calculate_pressure_drop for a line and keeps them up to date as segments are
+# edited, recomputing only what an edit can change. The dependencies are
+#     segment i  ->  reducers i (to segment i-1) and i+1 (to segment i+1)  ->  line totals
+# Editing a segment marks that segment dirty. When it is recomputed, its reducers are only marked
+# dirty if its pipe ID or NPS changed (a length or fitting count edit leaves them alone). Totals are
+# summed again on the next read. Changing the fluid or flow marks everything dirty.
+# Work is done lazily, when results are read, so several edits in a row share one recalculation.
+#
+# Usage:
+#   line = IncrementalLine(segments, density, viscosity, flow_rate_m3hr)
+#   line.update_segment(12, Nom_D=6.0)
+#   line.update_segment(40, {"Check Valve Swing": 1})
+#   line.total_pressure_drop_kPa
+
+from math import pi
+from Hydraulics_Script_Advanced_Core_Working import calculate_pressure_drop, pipe_geometry, reducer_K
+from friction_factor import check_model
+from pipe_segment import Segment, geometry_keys, count_keys
+
+
+class IncrementalLine:
+    """
+    One line (a list of segments at one fluid condition and flowrate) with per-segment and
+    per-reducer results that are recomputed only when an edit makes them dirty. Results are the
+    same as calculate_pressure_drop on the whole line.
+
+    recomputed counts the segment and reducer evaluations done so far, to check the dependency
+    tracking is doing its job.
+    """
+
+    def __init__(self, segments, density, viscosity, flow_rate_m3hr, friction_model="swamee_jain"):
+        check_model(friction_model)
+        self.segments = [Segment.coerce(seg) for seg in segments]
+        self.density = density
+        self.viscosity = viscosity  # cP
+        self.flow_rate_m3hr = flow_rate_m3hr
+        self.friction_model = friction_model
+        n = len(self.segments)
+        self._info = [None] * n  # calculate_pressure_drop segment info, without the reducer loss
+        self._p_drop_100 = [0.0] * n
+        self._geometry = [None] * n  # {"pipe_id_m", "NPS"}, for the reducers
+        self._reducer = [0.0] * n  # Reducer loss between segment i - 1 and i, kPa (0 for the first)
+        self._dirty_segments = set(range(n))
+        self._dirty_reducers = set(range(1, n))
+        self._totals = None
+        self.recomputed = {"segments": 0, "reducers": 0}
+
+    def __len__(self):
+        return len(self.segments)
+
+    #------------Edits------------
+    def update_segment(self, index, changes=None, **fields):
+        """
+        Change fields of one segment, e.g. update_segment(3, Nom_D=6.0) or
+        update_segment(3, {"Check Valve Swing": 1}). The edited segment is validated against the
+        segment schema (see pipe_segment.py). Only the geometry and fitting counts are carried over,
+        not any results stored on the segment.
+        """
+        seg = self.segments[index]
+        inputs = {key: getattr(seg, key) for key in geometry_keys}
+        inputs.update(zip(count_keys, seg.counts))
+        self.segments[index] = Segment.from_dict({**inputs, **(changes or {}), **fields})
+        self._mark_segment(index)
+
+    def set_segment(self, index, seg):
+        """Replace one segment (dict or Segment)."""
+        self.segments[index] = Segment.coerce(seg)
+        self._mark_segment(index)
+
+    def set_conditions(self, density=None, viscosity=None, flow_rate_m3hr=None, friction_model=None):
+        """Change the fluid, flowrate or friction model. Every segment and reducer depends on these."""
+        if friction_model is not None:
+            check_model(friction_model)
+            self.friction_model = friction_model
+        if density is not None:
+            self.density = density
+        if viscosity is not None:
+            self.viscosity = viscosity
+        if flow_rate_m3hr is not None:
+            self.flow_rate_m3hr = flow_rate_m3hr
+        self._dirty_segments = set(range(len(self.segments)))
+        self._dirty_reducers = set(range(1, len(self.segments)))
+        self._totals = None
+
+    def _mark_segment(self, index):
+        self._dirty_segments.add(index % len(self.segments))
+        self._totals = None
+
+    #------------Recalculation------------
+    def recalculate(self):
+        """Recompute the dirty segments, then the dirty reducers. Returns the number of nodes recomputed."""
+        count = 0
+        last = len(self.segments) - 1
+        for i in sorted(self._dirty_segments):
+            if self._evaluate_segment(i):
+                # Pipe ID or NPS changed, so both reducers touching this segment change too
+                if i > 0:
+                    self._dirty_reducers.add(i)
+                if i < last:
+                    self._dirty_reducers.add(i + 1)
+            count += 1
+        self._dirty_segments.clear()
+        for i in sorted(self._dirty_reducers):
+            self._evaluate_reducer(i)
+            count += 1
+        self._dirty_reducers.clear()
+        return count
+
+    def _evaluate_segment(self, i):
+        # Returns True if the segment's pipe ID or NPS changed
+        seg = self.segments[i]
+        result = calculate_pressure_drop([seg], self.density, self.viscosity, self.flow_rate_m3hr,
+                                         self.friction_model)
+        info = result["segments"][0]
+        info["segment_index"] = i + 1
+        self._info[i] = info
+        self._p_drop_100[i] = result["Pressure Drop Per 100m"][0]
+        _, _, _, NPS = pipe_geometry(seg.material, seg.Nom_D, seg.SDR, seg.schedule)
+        geometry = {"pipe_id_m": info["pipe_id_m"], "NPS": NPS}
+        changed = geometry != self._geometry[i]
+        self._geometry[i] = geometry
+        self.recomputed["segments"] += 1
+        return changed
+
+    def _evaluate_reducer(self, i):
+        # Same reducer loss as calculate_pressure_drop, based on the velocity in the smaller pipe
+        prev, cur = self._geometry[i - 1], self._geometry[i]
+        K = reducer_K(prev, cur)
+        if K is None:
+            self._reducer[i] = 0.0
+        else:
+            velocity_max = (self.flow_rate_m3hr / 3600) / (pi / 4 * min(prev["pipe_id_m"], cur["pipe_id_m"]) ** 2)
+            self._reducer[i] = K * self.density * velocity_max ** 2 / 2 / 1000
+        self.recomputed["reducers"] += 1
+
+    def _current(self):
+        if self._dirty_segments or self._dirty_reducers:
+            self.recalculate()
+        if self._totals is None:
+            per_segment = [info["pressure_drop_kPa"] + reducer for info, reducer in zip(self._info, self._reducer)]
+            total = 0.0
+            for p_drop in per_segment:  # Summed in order, as calculate_pressure_drop does
+                total += p_drop
+            self._totals = (per_segment, total)
+        return self._totals
+
+    #------------Results------------
+    @property
+    def total_pressure_drop_kPa(self):
+        return self._current()[1]
+
+    def segment_pressure_drop(self, index):
+        """Pressure drop of one segment, including the reducer from the previous segment, kPa."""
+        return self._current()[0][index]
+
+    def reducer_pressure_drops(self):
+        """Reducer loss between each segment and the previous one, kPa (0 for the first segment)."""
+        self._current()
+        return list(self._reducer)
+
+    def check(self, rtol=1e-9):
+        """
+        Compare the line total with calculate_pressure_drop on the whole line.
+
+        Raises:
+            ValueError: if the totals differ by more than rtol
+        """
+        full = calculate_pressure_drop(self.segments, self.density, self.viscosity, self.flow_rate_m3hr,
+                                       self.friction_model)["total_pressure_drop_kPa"]
+        total = self.total_pressure_drop_kPa
+        if abs(total - full) > rtol * max(abs(full), 1e-12):
+            raise ValueError(f"Incremental total {total} kPa does not match the full calculation {full} kPa")
+        return total
+
+    def results(self):
+        """The same dict as calculate_pressure_drop for the whole line."""
+        per_segment, total = self._current()
+        segments_info = [dict(info, pressure_drop_kPa=p_drop) for info, p_drop in zip(self._info, per_segment)]
+        return {
+            "segments": segments_info,
+            "pressure_drop_per_segment_kPa": list(per_segment),
+            "total_pressure_drop_kPa": total,
+            "segments_detailed_results": [],
+            "Pressure Drop Per 100m": list(self._p_drop_100),
+        }
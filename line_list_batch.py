@@ -0,0 +1,116 @@
+# Line List Batch Evaluation
+# Built by Louis Walker, Process Engineer, 2025
+# Evaluates many independent lines (cases) together in columnar form, rather than one
+# calculate_pressure_drop call per line. All segments of all cases are flattened into
+# NumPy columns, so the hydraulics are done in a handful of array operations.
+
+import numpy as np
+from math import pi
+from Hydraulics_Script_Advanced_Core_Working import resolve_segment, reducer_K, friction_factor_array
+from fitting_matrix import fitting_count_matrix, fitting_K
+
+
+def build_segment_columns(cases):
+    """
+    Flatten the segments of every case into NumPy columns.
+
+    Args:
+        cases (list): List of case dicts with keys "segments", "density", "viscosity" (cP),
+                      "flow_rate_m3hr" and optionally "case_id"
+
+    Returns:
+        dict: One NumPy array per column, one row per segment across all cases
+    """
+    columns = {
+        "case_index": [], "segment_index": [], "length_m": [], "pipe_id_m": [], "epsilon": [],
+        "K_reducer": [], "reducer_id_m": [],
+    }
+    all_segments = []
+    for case_index, case in enumerate(cases):
+        previous = None
+        all_segments.extend(case["segments"])
+        for i, seg in enumerate(case["segments"], start=1):
+            geom = resolve_segment(seg, with_fittings=False)
+            K_red = reducer_K(previous, geom) if previous is not None else None
+            columns["case_index"].append(case_index)
+            columns["segment_index"].append(i)
+            columns["length_m"].append(geom["length_m"])
+            columns["pipe_id_m"].append(geom["pipe_id_m"])
+            columns["epsilon"].append(geom["epsilon"])
+            columns["K_reducer"].append(0.0 if K_red is None else K_red)
+            columns["reducer_id_m"].append(geom["pipe_id_m"] if previous is None
+                                           else min(previous["pipe_id_m"], geom["pipe_id_m"]))
+            previous = geom
+    columns = {key: np.asarray(val, dtype=int if key.endswith("index") else float)
+               for key, val in columns.items()}
+    # Fittings K for every segment of every case: the segments x fitting types count matrix
+    # against the K basis row for each segment's diameter
+    columns["K_fd"], columns["K_const"] = fitting_K(fitting_count_matrix(all_segments), columns["pipe_id_m"])
+    return columns
+
+
+def evaluate_cases(cases, friction_model="swamee_jain"):
+    """
+    Evaluate N independent lines together.
+
+    Args:
+        cases (list): List of case dicts with keys "segments", "density", "viscosity" (cP),
+                      "flow_rate_m3hr" and optionally "case_id"
+        friction_model (str): Friction factor model, see friction_factor.py
+
+    Returns:
+        dict: {"cases": case table, "segments": segment table}, each a dict of equal length
+              NumPy columns
+    """
+    n_cases = len(cases)
+    case_density = np.array([case["density"] for case in cases], dtype=float)
+    case_viscosity = np.array([case["viscosity"] for case in cases], dtype=float)
+    case_Q = np.array([case["flow_rate_m3hr"] for case in cases], dtype=float)
+
+    cols = build_segment_columns(cases)
+    idx = cols["case_index"]
+    density = case_density[idx]
+    viscosity = case_viscosity[idx]
+    Q_m3s = case_Q[idx] / 3600
+    ID_pipe = cols["pipe_id_m"]
+
+    velocity = Q_m3s / (pi / 4 * ID_pipe ** 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Re = np.where(viscosity > 0, density * velocity * ID_pipe / (viscosity / 1000), 0.0)
+    moody_fac = friction_factor_array(Re, ID_pipe, cols["epsilon"], friction_model)
+    dyn_p = density * velocity ** 2 / 2 / 1000  # kPa
+
+    p_drop_per_100 = moody_fac * (100 / ID_pipe) * dyn_p
+    p_drop_segment = (moody_fac * (cols["length_m"] / ID_pipe + cols["K_fd"]) + cols["K_const"]) * dyn_p
+    velocity_reducer = Q_m3s / (pi / 4 * cols["reducer_id_m"] ** 2)
+    p_drop_reducer = cols["K_reducer"] * density * velocity_reducer ** 2 / 2 / 1000
+    p_drop_total = p_drop_segment + p_drop_reducer
+
+    max_velocity = np.zeros(n_cases)
+    max_p_drop_100 = np.zeros(n_cases)
+    np.maximum.at(max_velocity, idx, velocity)
+    np.maximum.at(max_p_drop_100, idx, p_drop_per_100)
+
+    return {
+        "cases": {
+            "case_id": np.array([case.get("case_id", i) for i, case in enumerate(cases)], dtype=object),
+            "flow_rate_m3hr": case_Q,
+            "density": case_density,
+            "viscosity_cP": case_viscosity,
+            "num_segments": np.bincount(idx, minlength=n_cases),
+            "total_pressure_drop_kPa": np.bincount(idx, weights=p_drop_total, minlength=n_cases),
+            "max_velocity_m_s": max_velocity,
+            "max_p_drop_per_100m_kPa": max_p_drop_100,
+        },
+        "segments": {
+            "case_index": idx,
+            "segment_index": cols["segment_index"],
+            "pipe_id_m": ID_pipe,
+            "velocity_m_s": velocity,
+            "Re": Re,
+            "friction_factor": moody_fac,
+            "p_drop_per_100m_kPa": p_drop_per_100,
+            "reducer_pressure_drop_kPa": p_drop_reducer,
+            "pressure_drop_kPa": p_drop_total,
+        },
+    }
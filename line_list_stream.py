@@ -0,0 +1,160 @@
+# Line List Streaming Pipeline
+# Built by Louis Walker, Process Engineer, 2025
+# Line list exports can run to hundreds of thousands of rows, too many to hold as segments dicts.
+# This pipeline is built from generators: rows are parsed lazily from JSONL, grouped into lines,
+# evaluated with calculate_pressure_drop and written out record by record, so memory use stays
+# flat however large the input is. Evaluation can be handed to the parallel executor, which only
+# reads ahead a bounded number of lines.
+#
+# Input, one JSON object per line of the file, either
+#   - a segment row: {"line_id": "L1", "flow_rate_m3hr": 50, "density": 998, "viscosity": 1.0,
+#                     "material": "Steel", "Nom_D": 4, "length": 10, ...}
+#     Rows of the same line must be next to each other; line values can be on any of its rows.
+#   - a whole line: {"line_id": "L1", "flow_rate_m3hr": 50, ..., "segments": [{...}, ...]}
+#
+# Usage:
+#   python line_list_stream.py line_list.jsonl results.jsonl --workers 4
+#   cat line_list.jsonl | python line_list_stream.py - - > results.jsonl
+
+import argparse
+import contextlib
+import json
+import sys
+from functools import partial
+
+from Hydraulics_Script_Advanced_Core_Working import calculate_pressure_drop
+from parallel_executor import imap_parallel, error_result
+
+# Row fields that belong to the line rather than the segment
+line_keys = ("flow_rate_m3hr", "density", "viscosity")
+
+
+#------------Reading------------
+@contextlib.contextmanager
+def _open(source, mode):
+    if source == "-":
+        yield sys.stdin if "r" in mode else sys.stdout
+    elif hasattr(source, "read") or hasattr(source, "write"):
+        yield source
+    else:
+        with open(source, mode) as f:
+            yield f
+
+
+def read_jsonl(source):
+    """Yield one dict per non-blank line of a JSONL file (path, open file, or "-" for stdin)."""
+    with _open(source, "r") as f:
+        for line_number, text in enumerate(f, start=1):
+            text = text.strip()
+            if not text:
+                continue
+            try:
+                yield json.loads(text)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number}: {e}") from None
+
+
+def group_lines(rows, line_keys=line_keys):
+    """
+    Group consecutive rows with the same "line_id" into line dicts, yielding each line as soon as
+    the next one starts. Only one line is held in memory at a time.
+    """
+    line = None
+    for row_number, row in enumerate(rows, start=1):
+        line_id = row.get("line_id", f"line-{row_number}")
+        if "segments" in row:
+            if line is not None:
+                yield line
+                line = None
+            yield dict(row, line_id=line_id)
+            continue
+        if line is None or line["line_id"] != line_id:
+            if line is not None:
+                yield line
+            line = {"line_id": line_id, "segments": []}
+        segment = {}
+        for key, val in row.items():
+            if key == "line_id":
+                continue
+            if key in line_keys:
+                line[key] = val
+            else:
+                segment[key] = val
+        line["segments"].append(segment)
+    if line is not None:
+        yield line
+
+
+#------------Evaluating------------
+def evaluate_line(line):
+    """Pressure drop for one line dict with "segments", "density", "viscosity" (cP) and "flow_rate_m3hr"."""
+    results = calculate_pressure_drop(line["segments"], line["density"], line["viscosity"], line["flow_rate_m3hr"])
+    return {
+        "line_id": line["line_id"],
+        "flow_rate_m3hr": line["flow_rate_m3hr"],
+        "total_pressure_drop_kPa": results["total_pressure_drop_kPa"],
+        "segments": [dict(info, p_drop_per_100m_kPa=p_100)
+                     for info, p_100 in zip(results["segments"], results["Pressure Drop Per 100m"])],
+    }
+
+
+def _evaluate_safely(func, line):
+    try:
+        return func(line)
+    except Exception as e:
+        return dict(error_result(e), line_id=line.get("line_id"))
+
+
+def evaluate_lines(lines, func=evaluate_line, max_workers=1, chunk_size=None, fluid_specs=()):
+    """
+    Lazily evaluate lines, yielding one result record per line in input order. Errors are captured in
+    the record of the failing line. With max_workers > 1 lines are sent to the parallel executor,
+    which pulls from the input only as fast as workers free up.
+    """
+    if chunk_size is None:
+        chunk_size = 1 if max_workers == 1 else 100
+    return imap_parallel(partial(_evaluate_safely, func), lines, max_workers=max_workers,
+                         chunk_size=chunk_size, fluid_specs=fluid_specs, quiet=True)
+
+
+#------------Writing------------
+def write_jsonl(records, target):
+    """
+    Write records one per line as they arrive (path, open file, or "-" for stdout).
+
+    Returns:
+        dict: "records" written and "errors" (records with an "error" field)
+    """
+    counts = {"records": 0, "errors": 0}
+    with _open(target, "w") as f:
+        for record in records:
+            f.write(json.dumps(record, default=float) + "\n")
+            counts["records"] += 1
+            counts["errors"] += "error" in record
+    return counts
+
+
+def run_pipeline(source, target, max_workers=1, chunk_size=None):
+    """read -> group -> evaluate -> write, one line at a time. Returns the counts from write_jsonl."""
+    # Results may be going to stdout, so hold on to the real stdout before stray prints are redirected
+    if target == "-":
+        target = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        lines = group_lines(read_jsonl(source))
+        return write_jsonl(evaluate_lines(lines, max_workers=max_workers, chunk_size=chunk_size), target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a JSONL line list through the pressure drop calculation.")
+    parser.add_argument("input", help="JSONL line list, - for stdin")
+    parser.add_argument("output", help="JSONL results, - for stdout")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1)")
+    parser.add_argument("--chunk-size", type=int, help="Lines sent to a worker at a time")
+    args = parser.parse_args(argv)
+    counts = run_pipeline(args.input, args.output, args.workers, args.chunk_size)
+    print(f"{counts['records']} lines, {counts['errors']} failed", file=sys.stderr)
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
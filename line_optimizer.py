@@ -0,0 +1,333 @@
+# Whole Line Size Optimizer
+# Built by Louis Walker, Process Engineer, 2025
+# Sizes every segment of a line together. Every catalog size is evaluated for every segment in
+# one vectorized pass, then dynamic programming chooses the size sequence. Unlike sizing each
+# segment on its own, this accounts for the reducer losses that couple neighbouring segments.
+# Run time is O(segments x sizes^2) and it always terminates.
+# Also holds inverse sizing (size_segment): the minimum continuous ID that meets the limits is
+# found by bisection within each friction regime (kPa/100m is not monotonic in ID across the step
+# from the transitional placeholder to 64/Re), and the smallest catalog size that meets the limits
+# is found by checking every catalog size at once.
+
+import numpy as np
+from math import pi, sqrt
+from Hydraulics_Script_Advanced_Core_Working import resolve_segment, friction_factor_array
+from friction_factor import laminar_Re, turbulent_Re
+from pipe_catalog import standard_steel_sizes, steel_sizes, hdpe_sizes, HDPE_INDEX, HDPE_NPS
+from ASME_Concentric_Reducers_table import reducer_lengths_dict
+from fitting_matrix import size_fitting_K
+from pipe_segment import with_size
+
+# Minimum pressure drop (kPa/100m) that sizing aims for, the same as optimize_segments
+threshold_min_P = 10
+# Bounds and iteration cap for the inverse sizing bisection on ID (m)
+ID_search_min = 0.001
+ID_search_max = 5.0
+max_bisection_iterations = 100
+
+
+def check_limits(p_drop_threshold, velocity_threshold):
+    if not p_drop_threshold > 0:
+        raise ValueError(f"Pressure drop limit must be positive, got {p_drop_threshold!r}")
+    if not velocity_threshold > 0:
+        raise ValueError(f"Velocity limit must be positive, got {velocity_threshold!r}")
+
+
+def candidate_sizes(seg):
+    """Catalog sizes a segment can take, ascending."""
+    if seg.get("material", "Carbon Steel").lower() == "hdpe":
+        SDR = seg.get("SDR", "SDR17")
+        # Only sizes with data for this SDR and a steel equivalent NPS (needed for reducers)
+        return [DN for DN in hdpe_sizes() if (DN, SDR) in HDPE_INDEX and HDPE_NPS[DN] is not None]
+    available = set(steel_sizes(seg.get("schedule", "40")))
+    return [NPS for NPS in standard_steel_sizes if NPS in available]
+
+
+def pipe_wall_volume(geom):
+    """Default cost proxy: pipe wall volume per metre (m3/m), proportional to pipe mass."""
+    t = geom["wall_thickness_m"]
+    return pi * (geom["pipe_id_m"] + t) * t
+
+
+def evaluate_sizes(seg, sizes, density, viscosity, flow_rate_m3hr, friction_model="swamee_jain"):
+    """
+    Hydraulics of one segment at every candidate size, as arrays over the sizes.
+
+    Returns:
+        dict: geometry ("pipe_id_m", "NPS", "geoms") and "velocity", "p_drop_100" and
+              "pressure_drop_kPa" (pipe, fittings, entrances, exits and user K) arrays
+    """
+    geoms = [resolve_segment(with_size(seg, size), with_fittings=False) for size in sizes]
+    ID_pipe = np.array([g["pipe_id_m"] for g in geoms])
+    epsilon = np.array([g["epsilon"] for g in geoms])
+    # K basis for every candidate diameter times the segment's fitting count vector
+    K_fd, K_const = size_fitting_K(seg, ID_pipe)
+
+    velocity = (flow_rate_m3hr / 3600) / (pi / 4 * ID_pipe ** 2)
+    Re = density * velocity * ID_pipe / (viscosity / 1000) if viscosity > 0 else np.zeros_like(velocity)
+    moody_fac = friction_factor_array(Re, ID_pipe, epsilon, friction_model)
+    dyn_p = density * velocity ** 2 / 2 / 1000  # kPa
+
+    return {
+        "sizes": np.array(sizes, dtype=float),
+        "geoms": geoms,
+        "pipe_id_m": ID_pipe,
+        "NPS": np.array([g["NPS"] for g in geoms], dtype=float),
+        "velocity": velocity,
+        "p_drop_100": moody_fac * (100 / ID_pipe) * dyn_p,
+        "pressure_drop_kPa": (moody_fac * (seg.get("length", 0.0) / ID_pipe + K_fd) + K_const) * dyn_p,
+    }
+
+
+def reducer_loss_matrix(prev, cur, density, flow_rate_m3hr):
+    """
+    Reducer pressure drop (kPa) for every (previous size, current size) pair, shape
+    (len(prev sizes), len(cur sizes)). Uses the same ASME B16.9 lengths and Crane conical
+    contraction K as calculate_pressure_drop; pairs without reducer data have no loss.
+    """
+    Di1 = prev["pipe_id_m"][:, None]
+    Di2 = cur["pipe_id_m"][None, :]
+    larger = np.maximum(prev["NPS"][:, None], cur["NPS"][None, :])
+    smaller = np.minimum(prev["NPS"][:, None], cur["NPS"][None, :])
+    length = np.array([[reducer_lengths_dict.get((float(a), float(b)), np.nan) for a, b in zip(row_l, row_s)]
+                       for row_l, row_s in zip(larger, smaller)]) / 1000
+
+    # fittings.contraction_conical_Crane, vectorized
+    with np.errstate(divide="ignore", invalid="ignore"):
+        angle = np.where(length == 0.0, pi, 2.0 * np.arctan((Di1 - Di2) / (2.0 * length)))
+    beta2 = (Di2 / Di1) ** 2
+    K = np.where(angle < 0.25 * pi,
+                 0.8 * np.sin(0.5 * angle) * (1.0 - beta2),
+                 0.5 * np.sqrt(np.abs(np.sin(0.5 * angle))) * (1.0 - beta2))
+    K = np.where(np.isnan(length), 0.0, K)
+
+    velocity_max = (flow_rate_m3hr / 3600) / (pi / 4 * np.minimum(Di1, Di2) ** 2)
+    return K * density * velocity_max ** 2 / 2 / 1000
+
+
+def optimize_line(segments, density, viscosity, flow_rate_m3hr, p_drop_threshold, velocity_threshold,
+                  objective="pressure_drop", p_drop_min=threshold_min_P, cost_per_m=pipe_wall_volume,
+                  cost_per_kPa=0.0, friction_model="swamee_jain"):
+    """
+    Choose the size of every segment of a line together, by dynamic programming.
+
+    Sizes that break the velocity or kPa/100m limits are never chosen (if a segment has no size
+    within the limits, its largest size is used and the segment is reported as infeasible).
+
+    objective="pressure_drop": minimise total line pressure drop, including reducers, using
+        only sizes at or above p_drop_min kPa/100m where the segment has any (the same band
+        optimize_segments aims for), so the line is not simply oversized.
+    objective="cost": minimise sum(cost_per_m(geom) * length) + cost_per_kPa * total pressure drop.
+        cost_per_m defaults to pipe wall volume per metre; cost_per_kPa puts a price on the
+        pressure drop (e.g. lifetime pumping cost) and couples segments through reducer losses.
+
+    Args:
+        segments (list or SegmentArray): Segment dicts or Segments (same format as calculate_pressure_drop)
+        density (float): kg/m3
+        viscosity (float): cP
+        flow_rate_m3hr (float): m3/hr
+        p_drop_threshold (float): Maximum pressure drop, kPa/100m
+        velocity_threshold (float): Maximum velocity, m/s
+        friction_model (str): Friction factor model, see friction_factor.py
+
+    Returns:
+        dict: chosen "Nom_D" list, per-segment results, reducer losses, totals and "objective"
+    """
+    if objective not in ("pressure_drop", "cost"):
+        raise ValueError("objective must be 'pressure_drop' or 'cost'")
+    check_limits(p_drop_threshold, velocity_threshold)
+    if not segments:
+        return {"Nom_D": [], "segments": [], "reducer_pressure_drop_kPa": [],
+                "total_pressure_drop_kPa": 0.0, "objective": 0.0}
+
+    evals = []
+    node_costs = []
+    feasible_any = []
+    for seg in segments:
+        ev = evaluate_sizes(seg, candidate_sizes(seg), density, viscosity, flow_rate_m3hr, friction_model)
+        feasible = (ev["velocity"] <= velocity_threshold) & (ev["p_drop_100"] <= p_drop_threshold)
+        if objective == "pressure_drop":
+            allowed = feasible & (ev["p_drop_100"] >= p_drop_min)
+            if not allowed.any() and feasible.any():
+                # Nothing within the limits reaches p_drop_min, so use the smallest size within the limits
+                allowed[np.argmax(feasible)] = True
+            cost = ev["pressure_drop_kPa"]
+        else:
+            allowed = feasible
+            length = seg.get("length", 0.0)
+            cost = np.array([cost_per_m(g) * length for g in ev["geoms"]]) + cost_per_kPa * ev["pressure_drop_kPa"]
+        if not allowed.any():
+            allowed = np.zeros_like(feasible)
+            allowed[-1] = True
+        evals.append(ev)
+        node_costs.append(np.where(allowed, cost, np.inf))
+        feasible_any.append(bool(feasible.any()))
+
+    edge_weight = 1.0 if objective == "pressure_drop" else cost_per_kPa
+
+    # Forward pass: best[j] is the least total cost of any size sequence ending at size j
+    best = node_costs[0]
+    back_pointers = []
+    for i in range(1, len(segments)):
+        transition = np.broadcast_to(best[:, None], (best.size, node_costs[i].size))
+        if edge_weight:
+            transition = transition + edge_weight * reducer_loss_matrix(evals[i - 1], evals[i], density, flow_rate_m3hr)
+        prev_choice = np.argmin(transition, axis=0)
+        best = transition[prev_choice, np.arange(transition.shape[1])] + node_costs[i]
+        back_pointers.append(prev_choice)
+
+    # Backward pass
+    choice = [int(np.argmin(best))]
+    for prev_choice in reversed(back_pointers):
+        choice.append(int(prev_choice[choice[-1]]))
+    choice.reverse()
+
+    segments_info = []
+    reducer_drops = []
+    for i, (ev, j) in enumerate(zip(evals, choice)):
+        if i > 0:
+            prev_ev, k = evals[i - 1], choice[i - 1]
+            reducer_drops.append(float(reducer_loss_matrix(
+                {"pipe_id_m": prev_ev["pipe_id_m"][k:k + 1], "NPS": prev_ev["NPS"][k:k + 1]},
+                {"pipe_id_m": ev["pipe_id_m"][j:j + 1], "NPS": ev["NPS"][j:j + 1]},
+                density, flow_rate_m3hr)[0, 0]))
+        segments_info.append({
+            "segment_index": i + 1,
+            "Nom_D": ev["geoms"][j]["Nom_D"],
+            "pipe_id_m": float(ev["pipe_id_m"][j]),
+            "velocity": float(ev["velocity"][j]),
+            "p_drop_100": float(ev["p_drop_100"][j]),
+            "pressure_drop_kPa": float(ev["pressure_drop_kPa"][j]),
+            "feasible": feasible_any[i],
+        })
+
+    return {
+        "Nom_D": [s["Nom_D"] for s in segments_info],
+        "segments": segments_info,
+        "reducer_pressure_drop_kPa": reducer_drops,
+        "total_pressure_drop_kPa": sum(s["pressure_drop_kPa"] for s in segments_info) + sum(reducer_drops),
+        "objective": float(np.min(best)),
+    }
+
+
+#------------Inverse sizing by bisection------------
+def p_drop_100_at_id(ID_pipe, epsilon, density, viscosity, flow_rate_m3hr, friction_model="swamee_jain"):
+    """Straight pipe pressure drop (kPa/100m) for a continuous internal diameter (m)."""
+    velocity = (flow_rate_m3hr / 3600) / (pi / 4 * ID_pipe ** 2)
+    Re = density * velocity * ID_pipe / (viscosity / 1000) if viscosity > 0 else 0.0
+    moody_fac = friction_factor_array(Re, ID_pipe, epsilon, friction_model)
+    return float(moody_fac * (100 / ID_pipe) * density * velocity ** 2 / 2 / 1000)
+
+
+def regime_boundary_ids(density, viscosity, flow_rate_m3hr, friction_model="swamee_jain"):
+    """
+    Internal diameters (m), ascending, where Re crosses turbulent_Re and laminar_Re. Between them
+    kPa/100m falls steadily with ID, but it steps up where the transitional placeholder gives way to
+    64/Re. Empty for churchill, which is continuous across the regimes.
+    """
+    if friction_model == "churchill" or viscosity <= 0 or flow_rate_m3hr <= 0:
+        return []
+    Re_times_ID = 4 * density * (flow_rate_m3hr / 3600) / (pi * viscosity / 1000)
+    return [Re_times_ID / turbulent_Re, Re_times_ID / laminar_Re]
+
+
+def minimum_id(epsilon, density, viscosity, flow_rate_m3hr, p_drop_threshold, velocity_threshold, tol=1e-6,
+               friction_model="swamee_jain"):
+    """
+    Minimum continuous internal diameter (m) meeting both limits.
+
+    The velocity limit is solved directly. Pressure drop per 100 m falls with ID within each friction
+    regime, so the pressure drop limit is solved by bisection in each regime's range of ID in turn,
+    smallest first, capped at max_bisection_iterations per regime. Larger IDs are not guaranteed to
+    meet the limit (see regime_boundary_ids), so catalog sizes are checked directly by size_segment.
+
+    Returns:
+        tuple: (required ID in m, limiting criterion "velocity" or "pressure_drop", bisection iterations)
+    """
+    check_limits(p_drop_threshold, velocity_threshold)
+    Q_m3s = flow_rate_m3hr / 3600
+    ID_velocity = sqrt(4 * Q_m3s / (pi * velocity_threshold))
+
+    def meets(ID_pipe):
+        return p_drop_100_at_id(ID_pipe, epsilon, density, viscosity, flow_rate_m3hr,
+                                friction_model) <= p_drop_threshold
+
+    edges = [ID_search_min] + [ID for ID in regime_boundary_ids(density, viscosity, flow_rate_m3hr, friction_model)
+                               if ID_search_min < ID < ID_search_max] + [ID_search_max]
+    iterations = 0
+    ID_pressure = ID_search_max
+    for k, (lo, hi) in enumerate(zip(edges[:-1], edges[1:])):
+        # Points just inside the regime, away from the step at each boundary
+        lo = lo if k == 0 else lo * (1 + 1e-9)
+        hi = hi if k == len(edges) - 2 else hi * (1 - 1e-9)
+        if meets(lo):
+            ID_pressure = lo
+            break
+        if not meets(hi):
+            continue
+        for _ in range(max_bisection_iterations):
+            if hi - lo <= tol:
+                break
+            mid = 0.5 * (lo + hi)
+            if meets(mid):
+                hi = mid
+            else:
+                lo = mid
+            iterations += 1
+        ID_pressure = hi
+        break
+
+    if ID_velocity >= ID_pressure:
+        return ID_velocity, "velocity", iterations
+    return ID_pressure, "pressure_drop", iterations
+
+
+def size_segment(seg, density, viscosity, flow_rate_m3hr, p_drop_threshold, velocity_threshold,
+                 friction_model="swamee_jain"):
+    """
+    Smallest catalog size for a segment that meets the velocity and kPa/100m limits.
+
+    Every catalog size is evaluated in one vectorized pass (evaluate_sizes) and the smallest within
+    both limits is taken, so a size is never skipped where the friction regime changes. The minimum
+    continuous ID (minimum_id) is reported alongside.
+
+    Args:
+        seg (dict or Segment): Segment (material, SDR or schedule are used)
+        density (float): kg/m3
+        viscosity (float): cP
+        flow_rate_m3hr (float): m3/hr
+        p_drop_threshold (float): Maximum pressure drop, kPa/100m
+        velocity_threshold (float): Maximum velocity, m/s
+        friction_model (str): Friction factor model, see friction_factor.py
+
+    Returns:
+        dict: "Nom_D", "pipe_id_m", "required_id_m", "limiting" criterion, "velocity", "p_drop_100",
+              "iterations" and "feasible" (False if even the largest size breaks a limit)
+    """
+    check_limits(p_drop_threshold, velocity_threshold)
+    sizes = candidate_sizes(seg)
+    if not sizes:
+        raise ValueError(f"No catalog sizes for material {seg.get('material', 'Carbon Steel')}")
+    ev = evaluate_sizes(seg, sizes, density, viscosity, flow_rate_m3hr, friction_model)
+
+    required_id, limiting, iterations = minimum_id(ev["geoms"][0]["epsilon"], density, viscosity, flow_rate_m3hr,
+                                                   p_drop_threshold, velocity_threshold,
+                                                   friction_model=friction_model)
+    within = (ev["velocity"] <= velocity_threshold) & (ev["p_drop_100"] <= p_drop_threshold)
+    feasible = bool(within.any())
+    if feasible:
+        i = int(np.argmax(within))
+    else:
+        i = len(sizes) - 1
+        limiting = f"{limiting} (larger than the largest catalog size)"
+
+    return {
+        "Nom_D": sizes[i],
+        "pipe_id_m": float(ev["pipe_id_m"][i]),
+        "required_id_m": required_id,
+        "limiting": limiting,
+        "velocity": float(ev["velocity"][i]),
+        "p_drop_100": float(ev["p_drop_100"][i]),
+        "iterations": iterations,
+        "feasible": feasible,
+    }
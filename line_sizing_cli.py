@@ -0,0 +1,375 @@
+# Line Sizing Command Line Batch Runner
+# Built by Louis Walker, Process Engineer, 2025
+# Headless batch runner around calculate_pressure_drop, the line sizing routines and pump_sizing,
+# so line lists can be sized unattended (compute servers, nightly jobs) without any tkinter dialogs.
+#
+# Usage examples:
+#   python line_sizing_cli.py pressure-drop lines.csv --fluid water --temperature 20 -o results.csv
+#   python line_sizing_cli.py size lines.json --density 998 --viscosity 1.0 --p-drop-threshold 20 --velocity-threshold 2.5
+#   python line_sizing_cli.py size lines.csv --whole-line --fluid water --temperature 20 -o sized.json
+#   python line_sizing_cli.py pump pumps.csv --fluid water --temperature 20 --max-temperature 60
+#
+# Input files (.csv, .json or .jsonl):
+#   CSV  - one row per segment. "line_id" groups rows into lines (in file order). Segment columns use the
+#          same keys as calculate_pressure_drop ("length", "material", "Nom_D", "SDR", "schedule",
+#          "elbows_90", ...). Line columns (see line_fields) may be given on any row of the line.
+#          For pump runs a "side" column marks each segment as "suction" or "discharge".
+#          A cell that should be a number but is not fails only its own line, reported in its record.
+#   JSON - a list of lines, or {"lines": [...]} with optional top level defaults. Each line is a dict
+#          of line fields plus "segments" (or "segments_suction" / "segments_discharge" for pump runs).
+#   JSONL - one segment row (or whole line) per line of the file, see line_list_stream.py. Read lazily;
+#          with a .jsonl output results are written as they are calculated, for very large line lists.
+# Line values in the file take precedence over command line arguments.
+# Results are written as JSON (default, to stdout), CSV or JSONL, chosen by the output file extension.
+# With --cache-dir, pressure-drop and pump runs keep line results in an on-disk result cache (see
+# result_cache.py), so unchanged lines in a re-run are not calculated again.
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+from functools import partial
+
+from Hydraulics_Script_Advanced_Core_Working import calculate_pressure_drop
+from Centrifugal_Pump_Sizing_Core import pump_sizing
+from line_optimizer import size_segment, optimize_line
+from friction_factor import friction_models, default_friction_model
+from parallel_executor import imap_parallel, default_workers
+from line_list_stream import read_jsonl, group_lines, write_jsonl
+from result_cache import cached_pressure_drop, get_result_cache
+
+# Fields that belong to a whole line rather than a single segment
+line_fields = (
+    "flow_rate_m3hr", "density", "viscosity", "fluid", "temperature_C", "max_temperature_C",
+    "p_drop_threshold", "velocity_threshold", "suction_elev_diff", "total_elevation_diff",
+    "max_dest_pressure", "efficiency", "vapor_pressure_kPa", "altitude_m",
+)
+# Fields kept as text; everything else is read as a number
+text_fields = {"line_id", "material", "SDR", "schedule", "fluid", "side"}
+
+
+#------------Reading line lists------------
+def parse_value(key, val):
+    if val is None:
+        return None
+    val = val.strip()
+    if val == "":
+        return None
+    if key in text_fields:
+        return val
+    number = float(val)
+    return int(number) if number.is_integer() and "." not in val else number
+
+
+def group_rows(rows):
+    """Group flat segment rows (dicts) into lines by "line_id", keeping file order."""
+    lines = {}
+    for row_number, row in enumerate(rows, start=1):
+        line_id = row.get("line_id") or f"line-{row_number}"
+        line = lines.setdefault(line_id, {"line_id": line_id, "segments": []})
+        segment = {}
+        for key, val in row.items():
+            if val is None or key == "line_id":
+                continue
+            if key == "error":
+                line["error"] = f"{line['error']}; {val}" if "error" in line else val
+            elif key in line_fields:
+                line[key] = val
+            else:
+                segment[key] = val
+        line["segments"].append(segment)
+    return list(lines.values())
+
+
+def read_csv_rows(path):
+    """
+    Parsed CSV rows. A cell that is not a valid number is left out of its row and reported under
+    "error", so that line fails on its own instead of stopping the batch.
+    """
+    with open(path, newline="") as f:
+        for row_number, row in enumerate(csv.DictReader(f), start=2):
+            parsed, errors = {}, []
+            for key, val in row.items():
+                if not key:
+                    continue
+                key = key.strip()
+                try:
+                    parsed[key] = parse_value(key, val)
+                except ValueError:
+                    errors.append(f"row {row_number}, column '{key}': not a number ({val.strip()!r})")
+            if errors:
+                parsed["error"] = "; ".join(errors)
+            yield parsed
+
+
+def read_line_list(path):
+    """
+    Read a line list from a .csv, .json or .jsonl file.
+
+    Returns:
+        list: Line dicts, each with "line_id", any line fields and "segments" (a generator for .jsonl)
+    """
+    if path.lower().endswith(".jsonl"):
+        return group_lines(read_jsonl(path), line_fields)
+    if path.lower().endswith(".csv"):
+        return group_rows(read_csv_rows(path))
+    with open(path) as f:
+        data = json.load(f)
+    defaults = {}
+    if isinstance(data, dict):
+        defaults = {key: val for key, val in data.items() if key != "lines"}
+        data = data.get("lines", [])
+    lines = []
+    for i, line in enumerate(data, start=1):
+        merged = dict(defaults, **line)
+        merged.setdefault("line_id", f"line-{i}")
+        lines.append(merged)
+    return lines
+
+
+#------------Resolving line parameters------------
+def line_param(line, args, key, default=None):
+    """Value from the line, else from the command line, else the default."""
+    if line.get(key) is not None:
+        return line[key]
+    val = getattr(args, key, None)
+    return default if val is None else val
+
+
+def fluid_properties_for_line(line, args):
+    """
+    Density (kg/m3), viscosity (cP) and vapour pressure (kPa) for a line. Explicit density/viscosity
+    win; otherwise they come from the fluid name and temperature via the fluid property service.
+    """
+    density = line_param(line, args, "density")
+    viscosity = line_param(line, args, "viscosity")
+    vapor_pressure_kPa = line_param(line, args, "vapor_pressure_kPa")
+    fluid = line_param(line, args, "fluid")
+    if fluid is not None and (density is None or viscosity is None or vapor_pressure_kPa is None):
+        from fluid_properties import get_property_table
+        T_K = line_param(line, args, "temperature_C", 20.0) + 273.15
+        T_max_K = line_param(line, args, "max_temperature_C", T_K - 273.15) + 273.15
+        table = get_property_table(fluid, min(T_K, T_max_K), max(T_K, T_max_K))
+        if density is None:
+            density = table.rho(T_K)
+        if viscosity is None:
+            viscosity = table.mu(T_K) * 1000  # Pa.s to cP
+        if vapor_pressure_kPa is None:
+            vapor_pressure_kPa = table.Psat(T_max_K) / 1000
+    if density is None or viscosity is None:
+        raise ValueError("Fluid properties missing: give density and viscosity, or a fluid name")
+    return density, viscosity, vapor_pressure_kPa
+
+
+def require(line, args, key):
+    val = line_param(line, args, key)
+    if val is None:
+        raise ValueError(f"Missing required value '{key}'")
+    return val
+
+
+#------------Runners, one result record per line------------
+def line_pressure_drop(segments, density, viscosity, flow_rate, args):
+    """calculate_pressure_drop, through the result cache when --cache-dir is given."""
+    if getattr(args, "cache_dir", None) is None:
+        return calculate_pressure_drop(segments, density, viscosity, flow_rate, args.friction_model)
+    return cached_pressure_drop(segments, density, viscosity, flow_rate, args.friction_model,
+                                cache=get_result_cache(args.cache_dir))
+
+
+def run_pressure_drop(line, args):
+    density, viscosity, _ = fluid_properties_for_line(line, args)
+    flow_rate = require(line, args, "flow_rate_m3hr")
+    results = line_pressure_drop(line["segments"], density, viscosity, flow_rate, args)
+    segments = []
+    for info, p_100 in zip(results["segments"], results["Pressure Drop Per 100m"]):
+        segments.append(dict(info, p_drop_per_100m_kPa=p_100))
+    return {
+        "line_id": line["line_id"],
+        "flow_rate_m3hr": flow_rate,
+        "density": density,
+        "viscosity_cP": viscosity,
+        "total_pressure_drop_kPa": results["total_pressure_drop_kPa"],
+        "segments": segments,
+    }
+
+
+def run_size(line, args):
+    density, viscosity, _ = fluid_properties_for_line(line, args)
+    flow_rate = require(line, args, "flow_rate_m3hr")
+    p_drop_threshold = require(line, args, "p_drop_threshold")
+    velocity_threshold = require(line, args, "velocity_threshold")
+    record = {
+        "line_id": line["line_id"],
+        "flow_rate_m3hr": flow_rate,
+        "density": density,
+        "viscosity_cP": viscosity,
+    }
+    if args.whole_line:
+        results = optimize_line(line["segments"], density, viscosity, flow_rate, p_drop_threshold,
+                                velocity_threshold, objective=args.objective,
+                                friction_model=args.friction_model)
+        record["total_pressure_drop_kPa"] = results["total_pressure_drop_kPa"]
+        record["segments"] = results["segments"]
+    else:
+        record["segments"] = [
+            dict(size_segment(seg, density, viscosity, flow_rate, p_drop_threshold, velocity_threshold,
+                              args.friction_model),
+                 segment_index=i)
+            for i, seg in enumerate(line["segments"], start=1)
+        ]
+    return record
+
+
+def run_pump(line, args):
+    density, viscosity, vapor_pressure_kPa = fluid_properties_for_line(line, args)
+    flow_rate = require(line, args, "flow_rate_m3hr")
+    suction = line.get("segments_suction")
+    discharge = line.get("segments_discharge")
+    if suction is None or discharge is None:
+        suction = [seg for seg in line.get("segments", []) if seg.get("side", "").lower() == "suction"]
+        discharge = [seg for seg in line.get("segments", []) if seg.get("side", "").lower() == "discharge"]
+    suction_drop = line_pressure_drop(suction, density, viscosity, flow_rate, args)["total_pressure_drop_kPa"]
+    discharge_drop = line_pressure_drop(discharge, density, viscosity, flow_rate, args)["total_pressure_drop_kPa"]
+    sizing_results = pump_sizing(
+        suction_drop, discharge_drop, flow_rate,
+        require(line, args, "suction_elev_diff"),
+        require(line, args, "total_elevation_diff"),
+        max_dest_pressure=line_param(line, args, "max_dest_pressure", 0.0),
+        density=density,
+        efficiency=line_param(line, args, "efficiency", 0.75),
+        vapor_pressure_kPa=6 if vapor_pressure_kPa is None else vapor_pressure_kPa,
+        altitude_m=line_param(line, args, "altitude_m", 400),
+    )
+    return dict({
+        "line_id": line["line_id"],
+        "flow_rate_m3hr": flow_rate,
+        "density": density,
+        "viscosity_cP": viscosity,
+        "suction_pressure_drop_kPa": suction_drop,
+        "discharge_pressure_drop_kPa": discharge_drop,
+    }, **sizing_results)
+
+
+runners = {
+    "pressure-drop": run_pressure_drop,
+    "size": run_size,
+    "pump": run_pump,
+}
+
+
+def run_line(runner, line, args):
+    """Run one line, capturing any error in the record so the rest of the batch carries on."""
+    if line.get("error") is not None:
+        return {"line_id": line.get("line_id"), "error": f"ValueError: {line['error']}"}
+    try:
+        return runner(line, args)
+    except Exception as e:
+        return {"line_id": line.get("line_id"), "error": f"{type(e).__name__}: {e}"}
+
+
+#------------Writing results------------
+def flatten_records(records):
+    """One CSV row per segment (line values repeated), or one row per line when there are no segments."""
+    for record in records:
+        line_values = {key: val for key, val in record.items() if key != "segments"}
+        segments = record.get("segments")
+        if not segments:
+            yield line_values
+            continue
+        for seg in segments:
+            yield dict(line_values, **{f"segment_{key}" if key in line_values else key: val
+                                       for key, val in seg.items()})
+
+
+def write_results(records, path=None):
+    if path is not None and path.lower().endswith(".csv"):
+        rows = list(flatten_records(records))
+        fieldnames = []
+        for row in rows:
+            fieldnames.extend(key for key in row if key not in fieldnames)
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+    text = json.dumps(records, indent=2, default=float)
+    if path is None:
+        print(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+
+
+#------------Command line------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless batch line sizing (pressure drop, sizing, pump sizing).")
+    parser.add_argument("mode", choices=sorted(runners), help="Calculation to run for every line")
+    parser.add_argument("input", help="Line list, .csv or .json")
+    parser.add_argument("-o", "--output", help="Results file, .csv or .json (default: JSON to stdout)")
+    parser.add_argument("--fluid", help="Fluid name for thermo, e.g. water")
+    parser.add_argument("--temperature", dest="temperature_C", type=float, help="Fluid temperature, °C")
+    parser.add_argument("--max-temperature", dest="max_temperature_C", type=float,
+                        help="Max temperature for vapour pressure, °C (default: --temperature)")
+    parser.add_argument("--density", type=float, help="Density, kg/m3")
+    parser.add_argument("--viscosity", type=float, help="Viscosity, cP")
+    parser.add_argument("--flow-rate", dest="flow_rate_m3hr", type=float, help="Flowrate, m3/hr")
+    parser.add_argument("--p-drop-threshold", type=float, help="Max pressure drop, kPa/100m")
+    parser.add_argument("--velocity-threshold", type=float, help="Max velocity, m/s")
+    parser.add_argument("--whole-line", action="store_true", help="size: optimize all segments of a line together")
+    parser.add_argument("--objective", choices=("pressure_drop", "cost"), default="pressure_drop",
+                        help="size --whole-line objective")
+    parser.add_argument("--suction-elev-diff", type=float, help="pump: suction source minus pump centreline, m")
+    parser.add_argument("--total-elevation-diff", type=float, help="pump: discharge minus suction source, m")
+    parser.add_argument("--max-dest-pressure", type=float, help="pump: destination pressure, kPa")
+    parser.add_argument("--efficiency", type=float, help="pump: efficiency (0-1), default 0.75")
+    parser.add_argument("--vapor-pressure", dest="vapor_pressure_kPa", type=float, help="pump: vapour pressure, kPa")
+    parser.add_argument("--altitude", dest="altitude_m", type=float, help="pump: altitude, m")
+    parser.add_argument("--friction-model", choices=friction_models, default=default_friction_model,
+                        help=f"Friction factor model (default: {default_friction_model})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for large line lists, 0 for one per CPU (default: 1)")
+    parser.add_argument("--chunk-size", type=int, help="Lines sent to a worker at a time")
+    parser.add_argument("--cache-dir", help="pressure-drop / pump: on-disk result cache folder, re-used across runs")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.exists(args.input):
+        print(f"Input file not found: {args.input}", file=sys.stderr)
+        return 2
+    lines = read_line_list(args.input)
+    runner = runners[args.mode]
+    workers = args.workers or default_workers()
+    fluid_specs = ()
+    if args.fluid is not None and args.temperature_C is not None:
+        T_K = args.temperature_C + 273.15
+        T_max_K = (args.temperature_C if args.max_temperature_C is None else args.max_temperature_C) + 273.15
+        fluid_specs = ((args.fluid, min(T_K, T_max_K), max(T_K, T_max_K)),)
+    # Any diagnostic prints from the calculations go to stderr, keeping stdout for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        records = imap_parallel(partial(run_line, runner, args=args), lines, max_workers=workers,
+                                chunk_size=args.chunk_size, fluid_specs=fluid_specs, quiet=True)
+        if args.output is not None and args.output.lower().endswith(".jsonl"):
+            counts = write_jsonl(records, args.output)
+            if counts["errors"]:
+                print(f"{counts['errors']} of {counts['records']} lines failed", file=sys.stderr)
+                return 1
+            return 0
+        records = list(records)
+    write_results(records, args.output)
+    if args.cache_dir is not None and workers == 1:
+        stats = get_result_cache(args.cache_dir).stats()
+        print(f"Result cache: {stats['hits']} hits, {stats['misses']} misses", file=sys.stderr)
+    failed = [record["line_id"] for record in records if "error" in record]
+    if failed:
+        print(f"{len(failed)} of {len(records)} lines failed: {failed}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
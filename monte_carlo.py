@@ -0,0 +1,136 @@
+# Monte Carlo Uncertainty
+# Built by Louis Walker, Process Engineer, 2025
+# Propagates input uncertainty through a suction + discharge line and pump_sizing. Samples are drawn
+# for:
+#   - pipe roughness, one lognormal factor per pipe_data.roughness entry and sample (all pipe of
+#     one material shares the same condition)
+#   - viscosity, a lognormal factor on the nominal value
+#   - flow, normal about the nominal flow (relative spread, clipped at zero)
+#   - suction and total elevation differences, normal about the nominal values (spread in m)
+# Each block of samples is evaluated as arrays, one calculate_pressure_drop_array call per line
+# with per-sample viscosity, flow and roughness, then pump_sizing on the arrays. Blocks are fixed in
+# size and each has its own random stream spawned from the seed, so results for a seed are the same
+# whatever the number of workers. Blocks can be spread over processes with parallel_executor.
+#
+# Usage:
+#   mc = monte_carlo_pump(fluid_props, 85.0, other_inputs, num_samples=100000, seed=1)
+#   mc["percentiles"]["pump_head_m"]    ({"P10": ..., "P50": ..., "P90": ...})
+
+from functools import partial
+import numpy as np
+from Hydraulics_Script_Advanced_Core_Working import calculate_pressure_drop_array
+from Centrifugal_Pump_Sizing_Core import pump_sizing
+from parallel_executor import run_parallel
+from pipe_data import roughness
+
+default_uncertainty = {
+    "roughness": 0.5,  # Lognormal sigma of the roughness factor (about x0.6 to x1.6 at one sigma)
+    "viscosity": 0.1,  # Lognormal sigma of the viscosity factor
+    "flow": 0.05,  # Relative standard deviation of the flow
+    "suction_elev_diff": 0.2,  # Standard deviation, m
+    "total_elevation_diff": 0.5,  # Standard deviation, m
+}
+percentile_levels = (10, 50, 90)
+block_size = 25000  # Samples per block (one random stream and one task each)
+result_keys = ("suction_pressure_drop_kPa", "discharge_pressure_drop_kPa", "total_pressure_drop_kPa",
+               "pump_head_m", "brake_power_kW", "NPSHA")
+
+
+#------------Sampling------------
+def sample_inputs(rng, n, fluid_props, flow_rate_m3hr, other_inputs, uncertainty):
+    """Draw n samples of the uncertain inputs (dict of arrays) from a numpy Generator."""
+    samples = {
+        "roughness_mm": {key: value * rng.lognormal(0.0, uncertainty["roughness"], n)
+                         for key, value in roughness.items()},
+        "viscosity_cP": fluid_props["viscosity_cP"] * rng.lognormal(0.0, uncertainty["viscosity"], n),
+        "flow_m3hr": np.clip(flow_rate_m3hr * (1 + uncertainty["flow"] * rng.standard_normal(n)), 0, None),
+    }
+    for key in ("suction_elev_diff", "total_elevation_diff"):
+        samples[key] = other_inputs[key] + uncertainty[key] * rng.standard_normal(n)
+    return samples
+
+
+def evaluate_samples(samples, fluid_props, other_inputs, friction_model="swamee_jain"):
+    """Line pressure drops and pump_sizing results for a dict of sampled inputs, as arrays."""
+    density = fluid_props["density"]
+    results = {}
+    for line in ("suction", "discharge"):
+        results[f"{line}_pressure_drop_kPa"] = calculate_pressure_drop_array(
+            other_inputs[f"segments_{line}"], density, samples["viscosity_cP"], samples["flow_m3hr"],
+            friction_model, samples["roughness_mm"])["total_pressure_drop_kPa"]
+    sizing = pump_sizing(
+        results["suction_pressure_drop_kPa"],
+        results["discharge_pressure_drop_kPa"],
+        samples["flow_m3hr"],
+        samples["suction_elev_diff"],
+        samples["total_elevation_diff"],
+        max_dest_pressure=other_inputs["max_dest_pressure"],
+        density=density,
+        efficiency=other_inputs.get("efficiency", 0.75),
+        vapor_pressure_kPa=other_inputs.get("vapor_pressure_kPa", 0),
+        altitude_m=other_inputs.get("altitude_m", 0)
+    )
+    results["total_pressure_drop_kPa"] = results["suction_pressure_drop_kPa"] + results["discharge_pressure_drop_kPa"]
+    results["pump_head_m"] = sizing["pump_head_m"]
+    results["brake_power_kW"] = sizing["brake_power_kW"]
+    results["NPSHA"] = sizing["NPSHA"]
+    return results
+
+
+def _run_block(fluid_props, flow_rate_m3hr, other_inputs, uncertainty, friction_model, block):
+    seed_sequence, n = block
+    rng = np.random.default_rng(seed_sequence)
+    samples = sample_inputs(rng, n, fluid_props, flow_rate_m3hr, other_inputs, uncertainty)
+    return evaluate_samples(samples, fluid_props, other_inputs, friction_model)
+
+
+#------------Monte Carlo------------
+def monte_carlo_pump(fluid_props, flow_rate_m3hr, other_inputs, num_samples=10000, uncertainty=None, seed=None,
+                     max_workers=1, friction_model="swamee_jain", return_samples=False):
+    """
+    Percentiles of line pressure drop, pump head, brake power and NPSHa under input uncertainty.
+
+    Args:
+        fluid_props (dict): "density" (kg/m3) and "viscosity_cP" (nominal)
+        flow_rate_m3hr (float): Nominal flow, m3/hr
+        other_inputs (dict): Line and duty inputs as for run_flow_curve: "segments_suction",
+                             "segments_discharge", "suction_elev_diff", "total_elevation_diff",
+                             "max_dest_pressure" and optionally "efficiency", "vapor_pressure_kPa",
+                             "altitude_m"
+        num_samples (int): Number of samples
+        uncertainty (dict): Spreads replacing those in default_uncertainty (0 fixes an input)
+        seed (int): Random seed, for repeatable results
+        max_workers (int): Worker processes for the sample blocks, see parallel_executor
+        friction_model (str): Friction factor model, see friction_factor.py
+        return_samples (bool): Also return every sampled result
+
+    Returns:
+        dict: "num_samples", "seed", "uncertainty", and "percentiles", "mean", "std" for each of
+              result_keys ("percentiles" maps "P10", "P50", "P90" to values). With return_samples,
+              "samples" holds the result arrays
+    """
+    if num_samples < 1:
+        raise ValueError("Number of samples must be at least 1")
+    unknown = set(uncertainty or {}) - set(default_uncertainty)
+    if unknown:
+        raise ValueError(f"Unknown uncertain inputs: {', '.join(sorted(unknown))}")
+    uncertainty = {**default_uncertainty, **(uncertainty or {})}
+
+    sizes = [block_size] * (num_samples // block_size)
+    if num_samples % block_size:
+        sizes.append(num_samples % block_size)
+    blocks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    run_block = partial(_run_block, fluid_props, flow_rate_m3hr, other_inputs, uncertainty, friction_model)
+    block_results = run_parallel(run_block, blocks, max_workers=max_workers, chunk_size=1, capture_errors=False)
+    samples = {key: np.concatenate([block[key] for block in block_results]) for key in result_keys}
+
+    results = {"num_samples": num_samples, "seed": seed, "uncertainty": uncertainty, "percentiles": {}, "mean": {},
+               "std": {}}
+    for key, values in samples.items():
+        results["percentiles"][key] = dict(zip((f"P{p}" for p in percentile_levels),
+                                               np.percentile(values, percentile_levels).tolist()))
+        results["mean"][key] = float(values.mean())
+        results["std"][key] = float(values.std())
+    if return_samples:
+        results["samples"] = samples
+    return results
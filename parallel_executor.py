@@ -0,0 +1,142 @@
+# Parallel Executor
+# Built by Louis Walker, Process Engineer, 2025
+# calculate_pressure_drop and the sizing loop are pure Python and CPU bound, so large line lists
+# and parameter sweeps are sharded across a ProcessPoolExecutor.
+#   - Results come back in input order, whatever order the workers finish in
+#   - Work is sent in chunks (one pickling round trip per chunk, not per case); the chunk size
+#     can be tuned, by default it gives each worker about 4 chunks
+#   - Each worker warms its caches once when it starts (pipe catalog, fluid property tables)
+#   - An exception in one case is captured in that case's result and the batch carries on
+#   - Items are read lazily with a bounded number of chunks in flight, so the input can be a
+#     generator of any length
+
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, product
+
+chunks_per_worker = 4  # Used for the default chunk size when the number of items is known
+max_chunk_size = 1000
+chunks_in_flight_per_worker = 2  # Limits read-ahead when consuming a generator
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def default_chunk_size(num_items, workers):
+    """About chunks_per_worker chunks per worker, at least 1 and at most max_chunk_size items."""
+    if num_items is None:
+        return 100
+    return max(1, min(max_chunk_size, -(-num_items // (workers * chunks_per_worker))))
+
+
+#------------Worker set up------------
+def warm_caches(fluid_specs=()):
+    """
+    Load the module level caches used by the calculations, so the first case in a worker is not slow.
+
+    Args:
+        fluid_specs (iterable): (fluid_name, T_min, T_max) tuples (K) of property tables to load
+    """
+    import Hydraulics_Script_Advanced_Core_Working  # noqa: F401, builds the pipe catalog on import
+    if fluid_specs:
+        from fluid_properties import get_property_table
+        for fluid_name, T_min, T_max in fluid_specs:
+            get_property_table(fluid_name, T_min, T_max)
+
+
+def _init_worker(fluid_specs, quiet):
+    if quiet:
+        sys.stdout = sys.stderr  # Keep stray prints out of a results stream on stdout
+    warm_caches(fluid_specs)
+
+
+#------------Running cases------------
+def error_result(exc):
+    return {"error": f"{type(exc).__name__}: {exc}"}
+
+
+def call_safely(func, item):
+    """func(item), or an {"error": ...} dict if it raises."""
+    try:
+        return func(item)
+    except Exception as e:
+        return error_result(e)
+
+
+def _run_chunk(func, chunk, capture_errors):
+    if capture_errors:
+        return [call_safely(func, item) for item in chunk]
+    return [func(item) for item in chunk]
+
+
+def _chunks(items, chunk_size):
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imap_parallel(func, items, max_workers=None, chunk_size=None, fluid_specs=(), capture_errors=True,
+                  quiet=False):
+    """
+    Lazily apply func to every item across worker processes, yielding results in input order.
+
+    Args:
+        func (callable): Module level function (or functools.partial of one) taking one item
+        items (iterable): Cases, e.g. line dicts. Can be a generator; it is read as workers free up
+        max_workers (int): Worker processes, default os.cpu_count(). 1 runs in this process
+        chunk_size (int): Items per task, default from default_chunk_size
+        fluid_specs (iterable): (fluid_name, T_min, T_max) property tables to pre-load in each worker
+        capture_errors (bool): Return {"error": ...} for a failing case instead of raising
+        quiet (bool): Send worker stdout to stderr
+
+    Yields:
+        The result of func(item) for each item, in the same order as items
+    """
+    workers = max_workers or default_workers()
+    if chunk_size is None:
+        num_items = len(items) if hasattr(items, "__len__") else None
+        chunk_size = default_chunk_size(num_items, workers)
+    chunk_size = max(1, int(chunk_size))
+
+    if workers == 1:
+        warm_caches(fluid_specs)
+        for chunk in _chunks(items, chunk_size):
+            yield from _run_chunk(func, chunk, capture_errors)
+        return
+
+    max_in_flight = workers * chunks_in_flight_per_worker
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(tuple(fluid_specs), quiet)) as executor:
+        pending = deque()
+        for chunk in _chunks(items, chunk_size):
+            pending.append(executor.submit(_run_chunk, func, chunk, capture_errors))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def run_parallel(func, items, max_workers=None, chunk_size=None, fluid_specs=(), capture_errors=True,
+                 quiet=False):
+    """imap_parallel collected into a list, in input order."""
+    return list(imap_parallel(func, items, max_workers, chunk_size, fluid_specs, capture_errors, quiet))
+
+
+#------------Parameter sweeps------------
+def parameter_grid(**axes):
+    """
+    Every combination of the given parameter values, as dicts, in a fixed order (last axis fastest).
+
+    Example:
+        parameter_grid(flow_rate_m3hr=[10, 20], Nom_D=[2, 3]) ->
+        {"flow_rate_m3hr": 10, "Nom_D": 2}, {"flow_rate_m3hr": 10, "Nom_D": 3}, ...
+    """
+    names = list(axes)
+    for values in product(*(axes[name] for name in names)):
+        yield dict(zip(names, values))
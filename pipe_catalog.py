@@ -0,0 +1,150 @@
+# Pipe Geometry Catalog
+# Built by Louis Walker, Process Engineer, 2025
+# Prebuilt, array backed catalog of pipe geometry, loaded once at import.
+#   - Steel (and other fluids library schedules): NPS x schedule -> (ID, OD, wall), all in m
+#   - HDPE to AS/NZS 4130: DN x SDR -> (MeanID, MinWall), in m
+#   - HDPE -> NPS equivalence (nearest Sch 40 OD), used for reducer lookups
+# Exact sizes are found by dictionary index (O(1)); nearest-size queries use bisect on the
+# ascending OD/ID columns, giving the same answers as fluids.nearest_pipe without the linear scan.
+
+from bisect import bisect_left
+import numpy as np
+from fluids.piping import schedule_lookup
+from AS_4130_HDPE_Capability_Matrix import AS4130_HDPE
+
+pipe_too_large_msg = "Pipe input is larger than max of selected schedule"
+
+
+#------------Build the steel schedule tables------------
+def _build_schedule(NPSes, Dis, Dos, ts):
+    return {
+        "NPS": np.array(NPSes, dtype=float),
+        "ID": np.array(Dis, dtype=float) * 1e-3,
+        "OD": np.array(Dos, dtype=float) * 1e-3,
+        "wall": np.array(ts, dtype=float) * 1e-3,
+        # Plain lists for fast scalar bisect and indexing
+        "ID_list": [d * 1e-3 for d in Dis],
+        "OD_list": [d * 1e-3 for d in Dos],
+        "index": {float(nps): i for i, nps in enumerate(NPSes)},
+    }
+
+
+STEEL_SCHEDULES = {schedule: _build_schedule(*data) for schedule, data in schedule_lookup.items()}
+
+
+def _schedule_table(schedule):
+    # Numerical schedules (e.g. 40) are accepted the same way as fluids.nearest_pipe
+    if isinstance(schedule, (int, float)):
+        schedule = str(int(schedule))
+    try:
+        return STEEL_SCHEDULES[schedule]
+    except KeyError:
+        raise ValueError("Schedule not recognized")
+
+
+def _row(table, i):
+    return float(table["NPS"][i]), table["ID_list"][i], table["OD_list"][i], float(table["wall"][i])
+
+
+def steel_pipe(NPS, schedule="40"):
+    """
+    Exact lookup of a pipe by NPS and schedule.
+
+    Returns:
+        tuple: (NPS, ID, OD, wall), dimensions in m
+
+    Raises:
+        ValueError: if the schedule or NPS is not in the catalog
+    """
+    table = _schedule_table(schedule)
+    try:
+        i = table["index"][float(NPS)]
+    except KeyError:
+        raise ValueError("NPS not in list")
+    return _row(table, i)
+
+
+def steel_pipe_by_Do(Do, schedule="40"):
+    """Smallest pipe in the schedule with OD >= Do (m). Returns (NPS, ID, OD, wall)."""
+    table = _schedule_table(schedule)
+    i = bisect_left(table["OD_list"], Do)
+    if i == len(table["OD_list"]):
+        raise ValueError(pipe_too_large_msg)
+    return _row(table, i)
+
+
+def steel_pipe_by_Di(Di, schedule="40"):
+    """Smallest pipe in the schedule with ID >= Di (m). Returns (NPS, ID, OD, wall)."""
+    table = _schedule_table(schedule)
+    i = bisect_left(table["ID_list"], Di)
+    if i == len(table["ID_list"]):
+        raise ValueError(pipe_too_large_msg)
+    return _row(table, i)
+
+
+# Steel NPS sizes offered when sizing lines (the common commercial sizes)
+standard_steel_sizes = [0.25, 0.5, 0.75, 1, 1.25, 1.5, 2, 2.5, 3, 3.5, 4.0, 5.0, 6.0, 8.0, 10.0, 12.0, 14.0,
+                        16.0, 18.0, 20.0, 24.0, 30.0]
+
+
+def steel_sizes(schedule="40"):
+    """Ascending list of the NPS sizes available in a schedule."""
+    return list(_schedule_table(schedule)["index"])
+
+
+#------------Build the HDPE (AS/NZS 4130) tables------------
+HDPE_DN = np.array(sorted(AS4130_HDPE), dtype=float)
+HDPE_SDR = sorted({sdr for sizes in AS4130_HDPE.values() for sdr in sizes},
+                  key=lambda sdr: -float(sdr[3:]))
+HDPE_ID = np.full((len(HDPE_DN), len(HDPE_SDR)), np.nan)
+HDPE_WALL = np.full((len(HDPE_DN), len(HDPE_SDR)), np.nan)
+HDPE_INDEX = {}
+
+for i, DN in enumerate(sorted(AS4130_HDPE)):
+    for sdr, props in AS4130_HDPE[DN].items():
+        if props["MeanID"] is None:
+            continue
+        j = HDPE_SDR.index(sdr)
+        HDPE_ID[i, j] = props["MeanID"] / 1000
+        HDPE_WALL[i, j] = props["MinWall"] / 1000
+        HDPE_INDEX[(DN, sdr)] = (props["MeanID"] / 1000, props["MinWall"] / 1000)
+
+
+def _hdpe_equivalent_nps(DN):
+    try:
+        return steel_pipe_by_Do(DN / 1000, schedule="40")[0]
+    except ValueError:
+        return None
+
+
+# HDPE -> NPS equivalence, the nearest Sch 40 size with OD >= the HDPE OD (DN is the OD for HDPE)
+HDPE_NPS = {DN: _hdpe_equivalent_nps(DN) for DN in sorted(AS4130_HDPE)}
+
+
+def hdpe_pipe(DN, SDR="SDR17"):
+    """
+    Lookup of an HDPE pipe by DN and SDR.
+
+    Returns:
+        tuple: (MeanID, MinWall), in m
+
+    Raises:
+        KeyError: if the DN / SDR combination is not in AS4130_HDPE
+    """
+    try:
+        return HDPE_INDEX[(DN, SDR)]
+    except KeyError:
+        raise KeyError(f"No HDPE pipe data for DN {DN}, SDR {SDR}")
+
+
+def hdpe_nps(DN):
+    """Steel NPS equivalent of an HDPE DN, used to look up reducer lengths."""
+    NPS = HDPE_NPS.get(DN)
+    if NPS is None:
+        NPS = steel_pipe_by_Do(DN / 1000, schedule="40")[0]
+    return NPS
+
+
+def hdpe_sizes():
+    """Ascending list of the HDPE DN sizes in AS4130_HDPE."""
+    return sorted(AS4130_HDPE)
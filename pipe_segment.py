@@ -0,0 +1,263 @@
+# Pipe Segment Types
+# Built by Louis Walker, Process Engineer, 2025
+# Compact, validated segment representations, as an alternative to 25-key segment dicts.
+#   Segment      - one segment, a __slots__ class. Geometry is held in attributes and the fitting
+#                  counts in one tuple (count_keys order), so there is no per-key dict storage
+#   SegmentArray - many segments in a NumPy structured array, for bulk line lists; the fitting
+#                  count matrix is a view of the array with no per-segment work
+# The schema is checked once, when a segment is built: unknown keys, non-numeric or negative
+# counts and the old check valve key names are caught there rather than silently ignored.
+# Both types can be passed to calculate_pressure_drop (and the sizing routines) in place of a list
+# of dicts. Segment also supports seg["key"], seg.get() and seg.keys(), so code written for dicts
+# keeps working, and results written to it (e.g. seg["Velocity"]) are kept in a side dict.
+
+import numpy as np
+from fitting_matrix import fitting_keys, key_aliases  # Old key names, mapped to the current ones when a segment is built
+
+# (key, type, default) for the geometry fields
+geometry_fields = (
+    ("length", float, 0.0),
+    ("material", str, "Carbon Steel"),
+    ("Nom_D", float, 0.0),
+    ("SDR", str, "SDR17"),
+    ("schedule", str, "40"),
+)
+geometry_keys = tuple(key for key, _, _ in geometry_fields)
+
+# Fitting counts: every fitting with a K value (fitting_matrix.fitting_keys, in that order so the
+# first len(fitting_keys) counts line up with the K basis), then counted fittings with no K value yet
+count_keys = fitting_keys + ("Gate Valve", "Y type Globe Valve")
+_count_index = {key: i for i, key in enumerate(count_keys)}
+
+schema_keys = geometry_keys + count_keys
+
+
+#------------Validation------------
+def _number(key, val):
+    if isinstance(val, bool) or not isinstance(val, (int, float, np.integer, np.floating)):
+        try:
+            val = float(val)
+        except (TypeError, ValueError):
+            raise ValueError(f"Segment field '{key}' must be a number, got {val!r}")
+    if not np.isfinite(val):
+        raise ValueError(f"Segment field '{key}' must be finite, got {val!r}")
+    return val
+
+
+def validate_segment_dict(seg, strict=True):
+    """
+    Check a segment dict against the schema.
+
+    Args:
+        seg (dict): Segment dict
+        strict (bool): Raise on keys outside the schema (otherwise they are ignored)
+
+    Returns:
+        tuple: (geometry values in geometry_keys order, counts tuple in count_keys order)
+
+    Raises:
+        ValueError: for unknown keys (strict), or values of the wrong type or sign
+    """
+    geometry = {key: default for key, _, default in geometry_fields}
+    counts = [0.0] * len(count_keys)
+    for key, val in seg.items():
+        key = key_aliases.get(key, key)
+        if key in geometry:
+            if val is None:
+                continue
+            if key in ("material", "SDR"):
+                if not isinstance(val, str) or not val:
+                    raise ValueError(f"Segment field '{key}' must be a non-empty string, got {val!r}")
+            elif key == "schedule":
+                # Numerical schedules (e.g. 40) are accepted, as in the pipe catalog
+                val = str(int(val)) if isinstance(val, (int, float)) and not isinstance(val, bool) else val
+                if not isinstance(val, str) or not val:
+                    raise ValueError(f"Segment field 'schedule' must be a string, got {val!r}")
+            else:
+                val = _number(key, val)
+                if val < 0:
+                    raise ValueError(f"Segment field '{key}' must not be negative, got {val!r}")
+            geometry[key] = val
+        elif key in _count_index:
+            val = 0.0 if val is None else _number(key, val)
+            if val < 0:
+                raise ValueError(f"Segment field '{key}' must not be negative, got {val!r}")
+            counts[_count_index[key]] = float(val)
+        elif strict:
+            raise ValueError(f"Unknown segment field '{key}'")
+    return tuple(geometry[key] for key in geometry_keys), tuple(counts)
+
+
+#------------Single segment------------
+class Segment:
+    """One pipe segment: geometry attributes plus a tuple of fitting counts in count_keys order."""
+    __slots__ = ("length", "material", "Nom_D", "SDR", "schedule", "counts", "results")
+
+    def __init__(self, length=0.0, material="Carbon Steel", Nom_D=0.0, SDR="SDR17", schedule="40", counts=None):
+        geometry, count_values = validate_segment_dict({
+            "length": length, "material": material, "Nom_D": Nom_D, "SDR": SDR, "schedule": schedule,
+            **(counts or {}),
+        })
+        self.length, self.material, self.Nom_D, self.SDR, self.schedule = geometry
+        self.counts = count_values
+        self.results = None
+
+    @classmethod
+    def from_dict(cls, seg, strict=True):
+        """Build a Segment from a segment dict, validating it against the schema."""
+        geometry, count_values = validate_segment_dict(seg, strict)
+        self = cls.__new__(cls)
+        self.length, self.material, self.Nom_D, self.SDR, self.schedule = geometry
+        self.counts = count_values
+        self.results = None
+        return self
+
+    @classmethod
+    def coerce(cls, seg):
+        """seg if it is already a Segment, otherwise Segment.from_dict(seg)."""
+        return seg if isinstance(seg, cls) else cls.from_dict(seg)
+
+    def to_dict(self):
+        seg = {key: getattr(self, key) for key in geometry_keys}
+        seg.update(zip(count_keys, self.counts))
+        if self.results:
+            seg.update(self.results)
+        return seg
+
+    def replace(self, **changes):
+        """Copy with geometry fields changed, e.g. seg.replace(Nom_D=6.0)."""
+        new = Segment.__new__(Segment)
+        new.length, new.material, new.Nom_D, new.SDR, new.schedule = (
+            changes.get(key, getattr(self, key)) for key in geometry_keys)
+        new.counts = self.counts
+        new.results = None
+        return new
+
+    # Mapping style access, so code written for segment dicts works unchanged
+    def __getitem__(self, key):
+        key = key_aliases.get(key, key)
+        if key in _count_index:
+            return self.counts[_count_index[key]]
+        if key in geometry_keys:
+            return getattr(self, key)
+        if self.results is not None and key in self.results:
+            return self.results[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, val):
+        key = key_aliases.get(key, key)
+        if key in schema_keys:
+            geometry, count_values = validate_segment_dict({**self.to_dict(), key: val}, strict=False)
+            self.length, self.material, self.Nom_D, self.SDR, self.schedule = geometry
+            self.counts = count_values
+        else:
+            # Calculated results (velocity, pressure drops, ...) are kept alongside the inputs
+            if self.results is None:
+                self.results = {}
+            self.results[key] = val
+
+    def __contains__(self, key):
+        key = key_aliases.get(key, key)
+        return key in schema_keys or (self.results is not None and key in self.results)
+
+    def keys(self):
+        return list(schema_keys) + (list(self.results) if self.results else [])
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        if not isinstance(other, Segment):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in geometry_keys) and self.counts == other.counts
+
+    def __repr__(self):
+        fittings = {key: count for key, count in zip(count_keys, self.counts) if count}
+        return (f"Segment(length={self.length!r}, material={self.material!r}, Nom_D={self.Nom_D!r}, "
+                f"SDR={self.SDR!r}, schedule={self.schedule!r}, counts={fittings!r})")
+
+
+def with_size(seg, Nom_D):
+    """Copy of a segment (dict or Segment) at another nominal size."""
+    return seg.replace(Nom_D=Nom_D) if isinstance(seg, Segment) else dict(seg, Nom_D=Nom_D)
+
+
+#------------Many segments------------
+def segment_dtype(material_width=16, SDR_width=8, schedule_width=8):
+    return np.dtype([
+        ("length", "f8"),
+        ("material", f"U{material_width}"),
+        ("Nom_D", "f8"),
+        ("SDR", f"U{SDR_width}"),
+        ("schedule", f"U{schedule_width}"),
+        ("counts", "f8", (len(count_keys),)),
+    ])
+
+
+class SegmentArray:
+    """
+    A line list as one NumPy structured array (fields: length, material, Nom_D, SDR, schedule and
+    counts, a sub-array in count_keys order). Indexing gives a Segment; iterating gives Segments.
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, segments=()):
+        rows = [Segment.coerce(seg) for seg in segments]
+        width = {key: max([len(getattr(seg, key)) for seg in rows] + [1]) for key in ("material", "SDR", "schedule")}
+        dtype = segment_dtype(width["material"], width["SDR"], width["schedule"])
+        self.data = np.array([(seg.length, seg.material, seg.Nom_D, seg.SDR, seg.schedule, seg.counts)
+                              for seg in rows], dtype=dtype)
+
+    @classmethod
+    def from_records(cls, data):
+        """Wrap an existing structured array with the segment_dtype fields (no copy)."""
+        missing = set(segment_dtype().names) - set(data.dtype.names or ())
+        if missing:
+            raise ValueError(f"Structured array is missing fields: {sorted(missing)}")
+        if data["counts"].shape[1:] != (len(count_keys),):
+            raise ValueError(f"counts must have {len(count_keys)} columns")
+        if np.any(data["counts"] < 0) or np.any(data["length"] < 0):
+            raise ValueError("Lengths and fitting counts must not be negative")
+        self = cls.__new__(cls)
+        self.data = data
+        return self
+
+    def __len__(self):
+        return len(self.data)
+
+    def _segment(self, row):
+        seg = Segment.__new__(Segment)
+        seg.length = float(row["length"])
+        seg.material = str(row["material"])
+        seg.Nom_D = float(row["Nom_D"])
+        seg.SDR = str(row["SDR"])
+        seg.schedule = str(row["schedule"])
+        seg.counts = tuple(row["counts"].tolist())
+        seg.results = None
+        return seg
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self._segment(self.data[index])
+        return SegmentArray.from_records(self.data[index])
+
+    def __iter__(self):
+        for row in self.data:
+            yield self._segment(row)
+
+    def count_matrix(self):
+        """(segments x fitting types) count matrix for the fitting types with a K value, a view."""
+        return self.data["counts"][:, :len(fitting_keys)]
+
+    def to_dicts(self):
+        return [seg.to_dict() for seg in self]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
@@ -0,0 +1,177 @@
+# Pump Catalogue
+# Built by Louis Walker, Process Engineer, 2025
+# A local catalogue of pump models and impeller trims (each trim is its own entry), stored as the
+# fitted curve coefficients of pump_curve.PumpCurve in one .npz file, with a spatial index over
+# each entry's best efficiency point (BEP).
+# The index is a grid over log10(BEP flow) x log10(BEP head). For a duty point only the cells that
+# can hold a suitable BEP are visited: BEP flow such that the duty falls in the preferred operating
+# region (70-120% of BEP flow), and BEP head within head_window of the duty head. The candidates
+# are then evaluated together as a PumpCurveSet and ranked by efficiency at the operating point,
+# then by NPSH margin.
+#
+# Usage:
+#   catalogue = PumpCatalogue.from_records(json.load(open("pumps.json")))
+#   catalogue.save("pumps.npz")
+#   best = PumpCatalogue.load("pumps.npz").select(85.0, 42.0, k=5, NPSHA_m=6.5)
+
+import json
+from math import floor, log10
+import numpy as np
+from pump_curve import PumpCurve, PumpCurveSet, solve_operating_points, g
+
+preferred_operating_region = (0.7, 1.2)  # Duty flow as a fraction of BEP flow (API 610 preferred region)
+head_window = (0.75, 1.5)  # BEP head as a multiple of the duty head
+NPSH_margin_min = 1.0  # m, NPSHa - NPSHr required at the operating point, as in pump_sizing
+index_cell = 0.05  # BEP index grid cell, decades of flow and of head
+
+
+class PumpCatalogue:
+    """
+    Pump curves with a BEP index, see the module header.
+
+    Args:
+        curves (PumpCurveSet or iterable of PumpCurve): Catalogue entries
+    """
+
+    def __init__(self, curves):
+        self.curves = curves if isinstance(curves, PumpCurveSet) else PumpCurveSet.from_curves(curves)
+        self.names = self.curves.names
+        self.BEP_flow, self.BEP_head, self.BEP_efficiency = self.curves.best_efficiency_points()
+        self._build_index()
+
+    def __len__(self):
+        return len(self.curves)
+
+    #------------Store------------
+    @classmethod
+    def from_records(cls, records):
+        """
+        Fit a catalogue from tabulated curves: a list of dicts with "name", "flow_m3hr", "head_m",
+        "efficiency" and optionally "NPSHr_m" and "speed_rpm" (lists of equal length).
+        """
+        return cls([PumpCurve(r["flow_m3hr"], r["head_m"], r.get("efficiency"), r.get("NPSHr_m"),
+                              name=r.get("name"), speed_rpm=r.get("speed_rpm")) for r in records])
+
+    @classmethod
+    def load_json(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls.from_records(data["pumps"] if isinstance(data, dict) else data)
+
+    def save(self, path):
+        """Write the fitted curves to a .npz file."""
+        c = self.curves
+        np.savez(path, names=np.array([name or "" for name in c.names]), head_coef=c.head_coef,
+                 efficiency_coef=c.efficiency_coef, NPSHr_coef=c.NPSHr_coef, flow_max=c.flow_max,
+                 speed_rpm=c.speed_rpm)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(PumpCurveSet(data["head_coef"], data["efficiency_coef"], data["NPSHr_coef"],
+                                    data["flow_max"], [str(name) or None for name in data["names"]],
+                                    data["speed_rpm"]))
+
+    #------------BEP index------------
+    def _build_index(self):
+        self._cells = {}
+        indexed = np.flatnonzero((self.BEP_flow > 0) & (self.BEP_head > 0))  # Entries with efficiency data
+        ix = np.floor(np.log10(self.BEP_flow[indexed]) / index_cell).astype(int)
+        iy = np.floor(np.log10(self.BEP_head[indexed]) / index_cell).astype(int)
+        for i, cell in zip(indexed.tolist(), zip(ix.tolist(), iy.tolist())):
+            self._cells.setdefault(cell, []).append(i)
+
+    def candidates(self, flow_m3hr, head_m, region=preferred_operating_region, window=head_window):
+        """Indices of the entries whose BEP suits the duty (see the module header), from the index."""
+        if not flow_m3hr > 0 or not head_m > 0:
+            raise ValueError("Duty flow and head must be greater than zero")
+        Q_lo, Q_hi = flow_m3hr / region[1], flow_m3hr / region[0]
+        H_lo, H_hi = head_m * window[0], head_m * window[1]
+        found = []
+        for ix in range(floor(log10(Q_lo) / index_cell), floor(log10(Q_hi) / index_cell) + 1):
+            for iy in range(floor(log10(H_lo) / index_cell), floor(log10(H_hi) / index_cell) + 1):
+                found.extend(self._cells.get((ix, iy), ()))
+        found = np.array(sorted(found), dtype=int)
+        keep = ((self.BEP_flow[found] >= Q_lo) & (self.BEP_flow[found] <= Q_hi)
+                & (self.BEP_head[found] >= H_lo) & (self.BEP_head[found] <= H_hi))
+        return found[keep]
+
+    #------------Selection------------
+    def select(self, flow_m3hr, head_m=None, k=5, system=None, NPSHA_m=None, density=1000,
+               min_NPSH_margin=NPSH_margin_min):
+        """
+        Best catalogue entries for a duty.
+
+        Args:
+            flow_m3hr (float): Required flow, m3/hr
+            head_m (float): Required head at that flow, m. Read from the system curve if not given
+            k (int): Number of candidates to return
+            system (dict): A run_flow_curve result ("flow_rates", "pump_head", "NPSHA"). When given,
+                           each pump is evaluated where it meets the system curve, and must deliver
+                           at least flow_m3hr there
+            NPSHA_m (float): NPSH available at the duty, m, when there is no system curve
+            density (float): kg/m3
+            min_NPSH_margin (float): Least NPSHa - NPSHr, m, where both are known
+
+        Returns:
+            list: Up to k dicts ("index", "name", "flow_m3hr", "head_m", "efficiency", "brake_power_kW",
+                  "NPSHr_m", "NPSH_margin_m", "BEP_flow_m3hr", "flow_to_BEP"), best first. Entries with
+                  no positive efficiency at the operating point are left out
+
+        Raises:
+            ValueError: if the duty flow or head is not greater than zero
+        """
+        if system is not None and head_m is None:
+            head_m = float(np.interp(flow_m3hr, system["flow_rates"], system["pump_head"]))
+        if head_m is None:
+            raise ValueError("Give the duty head, or a system curve to read it from")
+        index = self.candidates(flow_m3hr, head_m)
+        if index.size == 0:
+            return []
+        pumps = self.curves.subset(index)
+
+        if system is not None:
+            # Brake power is infinite or negative where a fitted efficiency is not positive, those are dropped below
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ops = solve_operating_points(pumps, system["flow_rates"], system["pump_head"], system.get("NPSHA"),
+                                             density)
+            feasible = ops["within_curve"] & (ops["flow_m3hr"] >= flow_m3hr * (1 - 1e-9))
+        else:
+            Q = np.full(index.size, float(flow_m3hr))
+            head = pumps.head(Q)
+            efficiency = pumps.efficiency(Q)
+            NPSHr = pumps.NPSHr(Q)
+            NPSHA = np.full(index.size, np.nan if NPSHA_m is None else float(NPSHA_m))
+            ops = {
+                "flow_m3hr": Q,
+                "head_m": head,
+                "efficiency": efficiency,
+                "brake_power_kW": density * g * (Q / 3600) * head / np.where(efficiency > 0, efficiency, np.nan) / 1000,
+                "NPSHr_m": NPSHr,
+                "NPSH_margin_m": NPSHA - NPSHr,
+            }
+            # Impellers are trimmed down to the duty, so the curve must reach the duty head
+            feasible = (head >= head_m) & (Q <= pumps.flow_max)
+        margin = ops["NPSH_margin_m"]
+        feasible &= np.isnan(margin) | (margin >= min_NPSH_margin)
+        feasible &= ops["efficiency"] > 0  # Also drops unknown (NaN) efficiencies
+
+        rows = np.flatnonzero(feasible)
+        # Highest efficiency first, then largest NPSH margin (unknown margins last)
+        order = np.lexsort((-np.nan_to_num(margin[rows], nan=-np.inf), -ops["efficiency"][rows]))
+        selected = []
+        for r in rows[order][:k]:
+            i = int(index[r])
+            selected.append({
+                "index": i,
+                "name": self.names[i],
+                "flow_m3hr": float(ops["flow_m3hr"][r]),
+                "head_m": float(ops["head_m"][r]),
+                "efficiency": float(ops["efficiency"][r]),
+                "brake_power_kW": float(ops["brake_power_kW"][r]),
+                "NPSHr_m": float(ops["NPSHr_m"][r]),
+                "NPSH_margin_m": float(margin[r]),
+                "BEP_flow_m3hr": float(self.BEP_flow[i]),
+                "flow_to_BEP": float(ops["flow_m3hr"][r] / self.BEP_flow[i]),
+            })
+        return selected
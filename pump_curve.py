@@ -0,0 +1,330 @@
+# Pump Curves and Operating Points
+# Built by Louis Walker, Process Engineer, 2025
+# Manufacturer pump curves (tabulated head, efficiency and NPSHr against flow) fitted once to smooth
+# models, and the operating point where a system curve from run_flow_curve meets the pump curve.
+#   head       H(Q) = a0 - a1 Q - a2 Q^2, with a1, a2 >= 0, so head never rises with flow
+#   NPSHr      N(Q) = b0 + b1 Q + b2 Q^2, with b1, b2 >= 0, so NPSHr never falls with flow
+#   efficiency eta(Q) = c1 Q + c2 Q^2 + c3 Q^3, zero at shut off, peaking at the best efficiency
+#              point (BEP). c3 is only fitted with 4 or more points
+# The sign constrained fits are exact least squares with the sign constraints (every active set of
+# a 3 coefficient fit is tried, which is cheap at this size). PumpCurveSet holds the coefficients of
+# many fitted curves as arrays, so a whole catalogue is evaluated in one NumPy expression.
+# The operating point solver works on whole batches of system curves at once: it finds the first
+# flow interval where the pump head drops below the system head, then refines every root together
+# by Illinois (modified regula falsi) iteration, with the system curve linear between its points.
+
+import numpy as np
+from itertools import combinations
+
+g = 9.81
+root_tol = 1e-9  # Relative flow tolerance for the operating point
+root_max_iter = 60
+
+
+#------------Curve fitting------------
+def _sign_constrained_fit(columns, y, constrained):
+    """
+    Least squares y ~ columns @ coef with coef[i] >= 0 for each i in constrained. Tries every active
+    set (constrained coefficients fixed at zero) and keeps the best feasible solution.
+    """
+    best = None
+    free = [i for i in range(columns.shape[1]) if i not in constrained]
+    for k in range(len(constrained) + 1):
+        for active in combinations(constrained, k):
+            use = free + [i for i in constrained if i not in active]
+            coef = np.zeros(columns.shape[1])
+            if use:
+                coef[use] = np.linalg.lstsq(columns[:, use], y, rcond=None)[0]
+            if any(coef[i] < 0 for i in constrained):
+                continue
+            residual = float(np.sum((columns @ coef - y) ** 2))
+            if best is None or residual < best[0]:
+                best = (residual, coef)
+    return best[1]
+
+
+class PumpCurve:
+    """
+    A pump curve fitted from tabulated manufacturer points.
+
+    Args:
+        flow_m3hr (array like): Flows of the tabulated points, m3/hr
+        head_m (array like): Head at each flow, m
+        efficiency (array like): Pump efficiency (0-1) at each flow, optional
+        NPSHr_m (array like): NPSH required at each flow, m, optional
+        name (str): Model name, for reports
+        speed_rpm (float): Speed the curves were measured at, optional
+
+    Attributes:
+        head_coef, efficiency_coef, NPSHr_coef: fitted model coefficients (see module header)
+        flow_max: largest tabulated flow; the fits are not trusted beyond it
+        fit_error: largest absolute fit residual of each fitted curve, {"head_m", "efficiency", "NPSHr_m"}
+    """
+
+    def __init__(self, flow_m3hr, head_m, efficiency=None, NPSHr_m=None, name=None, speed_rpm=None):
+        Q = np.asarray(flow_m3hr, dtype=float)
+        H = np.asarray(head_m, dtype=float)
+        if Q.ndim != 1 or Q.shape != H.shape or Q.size < 3:
+            raise ValueError("Need at least 3 matching flow and head points")
+        if np.any(Q < 0) or np.any(np.diff(Q) <= 0):
+            raise ValueError("Pump curve flows must be non-negative and increasing")
+        self.name = name
+        self.speed_rpm = speed_rpm
+        self.flow_max = float(Q[-1])
+        self.fit_error = {}
+        ones = np.ones_like(Q)
+
+        coef = _sign_constrained_fit(np.column_stack((ones, -Q, -Q ** 2)), H, (1, 2))
+        self.head_coef = coef
+        self.fit_error["head_m"] = float(np.max(np.abs(self.head(Q) - H)))
+
+        self.efficiency_coef = None
+        if efficiency is not None:
+            eta = np.asarray(efficiency, dtype=float)
+            if eta.shape != Q.shape:
+                raise ValueError("efficiency must have one value per flow point")
+            if np.any(eta < 0) or np.any(eta > 1):
+                raise ValueError("Pump efficiency should be between 0 and 1")
+            powers = (Q, Q ** 2, Q ** 3) if Q.size >= 4 else (Q, Q ** 2)
+            self.efficiency_coef = np.zeros(3)
+            self.efficiency_coef[:len(powers)] = np.linalg.lstsq(np.column_stack(powers), eta, rcond=None)[0]
+            self.fit_error["efficiency"] = float(np.max(np.abs(self.efficiency(Q) - eta)))
+
+        self.NPSHr_coef = None
+        if NPSHr_m is not None:
+            N = np.asarray(NPSHr_m, dtype=float)
+            if N.shape != Q.shape:
+                raise ValueError("NPSHr_m must have one value per flow point")
+            self.NPSHr_coef = _sign_constrained_fit(np.column_stack((ones, Q, Q ** 2)), N, (1, 2))
+            self.fit_error["NPSHr_m"] = float(np.max(np.abs(self.NPSHr(Q) - N)))
+
+    def head(self, Q):
+        a0, a1, a2 = self.head_coef
+        return a0 - a1 * Q - a2 * Q ** 2
+
+    def head_slope(self, Q):
+        _, a1, a2 = self.head_coef
+        return -a1 - 2 * a2 * Q
+
+    def efficiency(self, Q):
+        """Efficiency (0-1) at flow Q, or NaN if the curve has no efficiency data."""
+        if self.efficiency_coef is None:
+            return np.full(np.shape(Q), np.nan)
+        c1, c2, c3 = self.efficiency_coef
+        return np.clip(Q * (c1 + Q * (c2 + Q * c3)), 0.0, 1.0)
+
+    def NPSHr(self, Q):
+        """NPSH required (m) at flow Q, or NaN if the curve has no NPSHr data."""
+        if self.NPSHr_coef is None:
+            return np.full(np.shape(Q), np.nan)
+        b0, b1, b2 = self.NPSHr_coef
+        return b0 + b1 * Q + b2 * Q ** 2
+
+    def best_efficiency_point(self):
+        """(flow m3/hr, head m, efficiency) at the peak of the efficiency fit, within 0 to flow_max."""
+        if self.efficiency_coef is None:
+            raise ValueError(f"Pump curve {self.name or ''} has no efficiency data")
+        # Peak on a fine grid over the tabulated range
+        flows = np.linspace(0.0, self.flow_max, 2001)
+        Q = float(flows[np.argmax(self.efficiency(flows))])
+        return Q, float(self.head(Q)), float(self.efficiency(Q))
+
+
+class PumpCurveSet:
+    """
+    Many fitted pump curves, evaluated together. Row i of each coefficient array is pump i (NaN rows
+    where a pump has no efficiency or NPSHr data). Flows passed to head / efficiency / NPSHr have
+    the pumps along their first axis: shape (pumps,) or (pumps, points).
+    """
+
+    def __init__(self, head_coef, efficiency_coef, NPSHr_coef, flow_max, names=None, speed_rpm=None):
+        self.head_coef = np.asarray(head_coef, dtype=float).reshape(-1, 3)
+        n = len(self.head_coef)
+        self.efficiency_coef = np.asarray(efficiency_coef, dtype=float).reshape(n, 3)
+        self.NPSHr_coef = np.asarray(NPSHr_coef, dtype=float).reshape(n, 3)
+        self.flow_max = np.asarray(flow_max, dtype=float).reshape(n)
+        self.names = list(names) if names is not None else [None] * n
+        self.speed_rpm = (np.full(n, np.nan) if speed_rpm is None
+                          else np.asarray(speed_rpm, dtype=float).reshape(n))
+
+    @classmethod
+    def from_curves(cls, curves):
+        curves = list(curves)
+        missing = np.full(3, np.nan)
+        return cls([c.head_coef for c in curves],
+                   [missing if c.efficiency_coef is None else c.efficiency_coef for c in curves],
+                   [missing if c.NPSHr_coef is None else c.NPSHr_coef for c in curves],
+                   [c.flow_max for c in curves], [c.name for c in curves],
+                   [np.nan if c.speed_rpm is None else c.speed_rpm for c in curves])
+
+    @classmethod
+    def affinity(cls, pump, speed_ratios):
+        """
+        One PumpCurve at each speed ratio N/N0, by the affinity laws: Q ~ N, H ~ N^2 and NPSHr ~ N^2
+        at corresponding points, with the efficiency carried over unchanged.
+        """
+        n = np.asarray(speed_ratios, dtype=float).reshape(-1, 1)
+        if np.any(n <= 0):
+            raise ValueError("Speed ratios must be positive")
+        powers = np.array([0, 1, 2])
+        missing = np.full(3, np.nan)
+        efficiency_coef = missing if pump.efficiency_coef is None else pump.efficiency_coef
+        NPSHr_coef = missing if pump.NPSHr_coef is None else pump.NPSHr_coef
+        # H(Q) = n^2 H0(Q/n): the Q^k coefficient scales by n^(2-k). eta(Q) = eta0(Q/n): Q^k scales by n^-k
+        return cls(pump.head_coef * n ** (2 - powers), efficiency_coef * n ** -(powers + 1),
+                   NPSHr_coef * n ** (2 - powers), pump.flow_max * n[:, 0], [pump.name] * len(n),
+                   None if pump.speed_rpm is None else pump.speed_rpm * n[:, 0])
+
+    def __len__(self):
+        return len(self.head_coef)
+
+    def subset(self, index):
+        """The curves at index (an index array or boolean mask), as a new PumpCurveSet."""
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        return PumpCurveSet(self.head_coef[index], self.efficiency_coef[index], self.NPSHr_coef[index],
+                            self.flow_max[index], [self.names[i] for i in index], self.speed_rpm[index])
+
+    @staticmethod
+    def _columns(coef, Q):
+        # Coefficient columns shaped to broadcast along Q's first (pump) axis
+        shape = (-1,) + (1,) * (np.ndim(Q) - 1)
+        return [coef[:, k].reshape(shape) for k in range(3)]
+
+    def head(self, Q):
+        a0, a1, a2 = self._columns(self.head_coef, Q)
+        return a0 - a1 * Q - a2 * Q ** 2
+
+    def efficiency(self, Q):
+        c1, c2, c3 = self._columns(self.efficiency_coef, Q)
+        return np.clip(Q * (c1 + Q * (c2 + Q * c3)), 0.0, 1.0)
+
+    def NPSHr(self, Q):
+        b0, b1, b2 = self._columns(self.NPSHr_coef, Q)
+        return b0 + b1 * Q + b2 * Q ** 2
+
+    def best_efficiency_points(self, num_points=2001):
+        """(flow m3/hr, head m, efficiency) arrays at the peak of each efficiency fit (NaN without data)."""
+        flows = np.linspace(0.0, 1.0, num_points) * self.flow_max[:, None]
+        eta = self.efficiency(flows)
+        has_data = ~np.isnan(eta).all(axis=1)
+        peak = np.argmax(np.nan_to_num(eta, nan=-1.0), axis=1)
+        Q = np.where(has_data, flows[np.arange(len(self)), peak], np.nan)
+        return Q, self.head(Q), self.efficiency(Q)
+
+
+#------------Operating points------------
+def solve_operating_points(pump, flow_rates, system_head, NPSHA=None, density=1000, tol=root_tol,
+                           max_iter=root_max_iter):
+    """
+    Operating points of a pump on a batch of tabulated system curves, or of many pumps on one
+    system curve (or one system curve each).
+
+    Args:
+        pump (PumpCurve or PumpCurveSet): Fitted pump curve(s)
+        flow_rates (array like): Flows of the system curve points, m3/hr, increasing. Shape (points,)
+                                 shared by every system curve, or (systems, points)
+        system_head (array like): Required head at each point, m, shape (points,) or (systems, points)
+        NPSHA (array like): NPSH available at each point, m, same shape as system_head, optional
+        density (float): kg/m3, for the power
+        tol (float): Relative flow tolerance
+        max_iter (int): Iteration limit for the root refinement
+
+    Returns:
+        dict of arrays, one value per system curve (or pump): "flow_m3hr", "head_m", "efficiency",
+        "brake_power_kW", "NPSHr_m", "NPSHA_m", "NPSH_margin_m", "found" (False where the curves do
+        not cross inside the system curve's flow range; values are NaN there) and "within_curve"
+        (False where the operating flow is beyond the last tabulated pump point)
+    """
+    H_sys = np.atleast_2d(np.asarray(system_head, dtype=float))
+    if isinstance(pump, PumpCurveSet):
+        # One system curve per pump, or a single system curve shared by every pump
+        H_sys = np.broadcast_to(H_sys, (len(pump), H_sys.shape[1]))
+    Q_sys = np.broadcast_to(np.asarray(flow_rates, dtype=float), H_sys.shape)
+    n = H_sys.shape[0]
+    rows = np.arange(n)
+
+    # First interval where pump head minus system head goes from >= 0 to < 0
+    f = pump.head(Q_sys) - H_sys
+    crossing = (f[:, :-1] >= 0) & (f[:, 1:] < 0)
+    found = crossing.any(axis=1)
+    j = np.where(found, np.argmax(crossing, axis=1), 0)
+    Q_lo, Q_hi = Q_sys[rows, j], Q_sys[rows, j + 1]
+    H_lo, H_hi = H_sys[rows, j], H_sys[rows, j + 1]
+    slope = (H_hi - H_lo) / (Q_hi - Q_lo)
+
+    def residual(Q):
+        return pump.head(Q) - (H_lo + slope * (Q - Q_lo))
+
+    # Illinois iteration on [a, b] with f(a) >= 0 > f(b), all curves together
+    a, b = Q_lo.copy(), Q_hi.copy()
+    fa, fb = residual(a), residual(b)
+    Q = a.copy()
+    side = np.zeros(n, dtype=int)
+    active = found.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        Q_new = np.where(active, (a * fb - b * fa) / np.where(fb != fa, fb - fa, 1.0), Q)
+        f_new = residual(Q_new)
+        converged = np.abs(Q_new - Q) <= tol * np.maximum(np.abs(Q_new), 1.0)
+        Q = Q_new
+        left = active & (f_new >= 0)  # Root in [Q, b]
+        right = active & (f_new < 0)  # Root in [a, Q]
+        a = np.where(left, Q, a)
+        fa = np.where(left, f_new, fa)
+        fb = np.where(left & (side == 1), fb / 2, fb)  # Halve the stale end point
+        b = np.where(right, Q, b)
+        fb = np.where(right, f_new, fb)
+        fa = np.where(right & (side == -1), fa / 2, fa)
+        side = np.where(left, 1, np.where(right, -1, side))
+        active &= ~(converged | (f_new == 0))
+
+    Q = np.where(found, Q, np.nan)
+    head = pump.head(Q)
+    efficiency = pump.efficiency(Q)
+    brake_power_kW = density * g * (Q / 3600) * head / efficiency / 1000
+    NPSHr = pump.NPSHr(Q)
+    if NPSHA is not None:
+        NPSHA_sys = np.broadcast_to(np.atleast_2d(np.asarray(NPSHA, dtype=float)), H_sys.shape)
+        N_lo, N_hi = NPSHA_sys[rows, j], NPSHA_sys[rows, j + 1]
+        NPSHA_op = np.where(found, N_lo + (N_hi - N_lo) * (Q - Q_lo) / (Q_hi - Q_lo), np.nan)
+    else:
+        NPSHA_op = np.full(n, np.nan)
+    return {
+        "flow_m3hr": Q,
+        "head_m": head,
+        "efficiency": efficiency,
+        "brake_power_kW": brake_power_kW,
+        "NPSHr_m": NPSHr,
+        "NPSHA_m": NPSHA_op,
+        "NPSH_margin_m": NPSHA_op - NPSHr,
+        "found": found,
+        "within_curve": found & (Q <= pump.flow_max),
+    }
+
+
+def operating_point(pump, curve_results, density=1000):
+    """
+    Operating point of a pump on the system curve(s) from run_flow_curve.
+
+    Args:
+        pump (PumpCurve): Fitted pump curve
+        curve_results (dict or list): One run_flow_curve result, or a list of them (one per system)
+        density (float): kg/m3
+
+    Returns:
+        dict: For one result, the operating point values as floats (see solve_operating_points);
+              for a list, arrays with one value per result
+    """
+    single = isinstance(curve_results, dict)
+    batch = [curve_results] if single else list(curve_results)
+    flows = [np.asarray(r["flow_rates"], dtype=float) for r in batch]
+    if any(q.shape != flows[0].shape for q in flows):
+        raise ValueError("Every system curve in a batch needs the same number of flow points")
+    points = solve_operating_points(pump, np.array(flows), np.array([r["pump_head"] for r in batch]),
+                                    np.array([r["NPSHA"] for r in batch]), density)
+    if single:
+        return {key: val[0].item() for key, val in points.items()}
+    return points
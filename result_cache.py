@@ -0,0 +1,287 @@
+# Result Cache
+# Built by Louis Walker, Process Engineer, 2025
+# Content-addressed cache for line and pump curve results. The key is a SHA-256 hash of the
+# normalised inputs:
+#   - segments are normalised through the segment schema (pipe_segment.py). Missing fittings count
+#     as zero, old key names map to the current ones (as calculate_pressure_drop reads them, see
+#     fitting_matrix.key_aliases), and numbers are stored as floats, so {"elbows_90": 0} and {}
+#     give the same key
+#   - fluid properties, flows and options are plain floats or strings, and arrays are hashed by
+#     their bytes
+#   - the calculation name and RESULT_CACHE_VERSION are part of every key
+# Results are kept in memory with LRU eviction and, optionally, in an on-disk store (one JSON file
+# per key, arrays as base64 encoded bytes) so re-runs of the same line list in a new process are
+# answered from disk. Files in the store are only ever parsed as JSON, never unpickled, so a file
+# planted in a shared cache folder cannot run code.
+# A hit still hashes every input and copies the stored result: for a single line that is about
+# half the time of calculating it again, so the cache pays off for repeated lines in re-runs and
+# for expensive calls such as pump flow curves, not for one-off cheap lines.
+# Bump RESULT_CACHE_VERSION whenever a change to the calculations changes their results.
+#
+# Usage:
+#   results = cached_pressure_drop(segments, density, viscosity, flow_rate_m3hr)
+#   get_result_cache().stats()
+
+import os
+import json
+import base64
+import pickle
+import hashlib
+from array import array
+from collections import OrderedDict
+import numpy as np
+from Hydraulics_Script_Advanced_Core_Working import calculate_pressure_drop
+from pipe_segment import Segment, SegmentArray, count_keys, key_aliases
+
+RESULT_CACHE_VERSION = 4  # 4: check valve losses counted by the core calculation
+# Folder for the on-disk store, can be moved with the LINE_SIZING_RESULT_CACHE_DIR environment variable
+RESULT_CACHE_DIR = os.environ.get("LINE_SIZING_RESULT_CACHE_DIR",
+                                  os.path.join(os.path.expanduser("~"), ".line_sizing_cache", "results"))
+
+
+#------------Keys------------
+# Numbers of each segment, in this order, are hashed as float64 bytes; material, SDR and schedule as text
+_numeric_keys = ("length", "Nom_D") + count_keys
+_zeros = (0.0,) * len(_numeric_keys)
+_alias_keys = frozenset(key_aliases)
+
+
+def _segment_numbers_and_text(seg, numbers):
+    # Appends the segment's numbers to numbers (a list) and returns its text fields
+    if not isinstance(seg, Segment):
+        get = seg.get
+        schedule = get("schedule", "40")
+        if _alias_keys.isdisjoint(seg) and isinstance(schedule, str) and None not in seg.values():
+            numbers.extend(map(get, _numeric_keys, _zeros))
+            return get("material", "Carbon Steel"), get("SDR", "SDR17"), schedule
+        # Old key names or None values: normalise through the segment schema
+        seg = Segment.from_dict(seg, strict=False)
+    numbers.append(seg.length)
+    numbers.append(seg.Nom_D)
+    numbers.extend(seg.counts)
+    return seg.material, seg.SDR, seg.schedule
+
+
+def normalize_segments(segments):
+    """
+    Canonical form of a list of segments (dicts, Segments or a SegmentArray): ("segments", count,
+    SHA-256 of the normalised fields). Missing fields take the schema defaults, old key names map
+    to the current ones, and keys outside the schema are ignored.
+    """
+    if isinstance(segments, SegmentArray):
+        data = segments.data
+        numbers = np.column_stack((data["length"], data["Nom_D"], data["counts"])).astype(float).tobytes()
+        text = list(zip(data["material"].tolist(), data["SDR"].tolist(), data["schedule"].tolist()))
+    else:
+        numbers = []
+        text = [_segment_numbers_and_text(seg, numbers) for seg in segments]
+        try:
+            numbers = array("d", numbers).tobytes()
+        except TypeError:
+            # Text numbers: normalise every segment through the segment schema
+            numbers = []
+            text = [_segment_numbers_and_text(seg if isinstance(seg, Segment) else Segment.from_dict(seg, strict=False),
+                                              numbers)
+                    for seg in segments]
+            numbers = array("d", numbers).tobytes()
+    digest = hashlib.sha256(numbers)
+    digest.update(repr(text).encode())
+    return ("segments", len(text), digest.hexdigest())
+
+
+def normalize(value):
+    """
+    Canonical, hashable form of an input value (numbers, strings, arrays, dicts, lists). Dict values
+    under keys starting with "segments" (e.g. "segments_suction") are normalised as segment lists.
+    """
+    if isinstance(value, SegmentArray):
+        return normalize_segments(value)
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted(
+            (str(key), normalize_segments(val) if str(key).startswith("segments") else normalize(val))
+            for key, val in value.items())))
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value, dtype=float)
+        return ("array", value.shape, hashlib.sha256(value.tobytes()).hexdigest())
+    if isinstance(value, (list, tuple)):
+        return ("list", tuple(normalize(val) for val in value))
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    raise TypeError(f"Cannot build a cache key from {type(value).__name__}")
+
+
+def cache_key(name, *inputs):
+    """SHA-256 hex digest of the calculation name and its normalised inputs."""
+    return hashlib.sha256(repr((RESULT_CACHE_VERSION, name, normalize(inputs))).encode()).hexdigest()
+
+
+#------------On-disk format------------
+def _encode(value):
+    # json.dumps default: arrays and numpy scalars, which JSON cannot hold directly
+    if isinstance(value, np.ndarray) and value.dtype.kind in "biuf":
+        value = np.ascontiguousarray(value)
+        return {"__ndarray__": value.dtype.str, "shape": list(value.shape),
+                "data": base64.b64encode(value.tobytes()).decode("ascii")}
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    raise TypeError(f"Cannot store {type(value).__name__} in the on-disk result cache")
+
+
+def _decode(obj):
+    # json.loads object_hook: arrays back from their dtype, shape and base64 bytes
+    if "__ndarray__" in obj:
+        dtype = np.dtype(obj["__ndarray__"])
+        if dtype.kind not in "biuf":
+            raise ValueError(f"Unexpected array type {dtype} in the on-disk result cache")
+        return np.frombuffer(base64.b64decode(obj["data"]), dtype=dtype).reshape(obj["shape"]).copy()
+    return obj
+
+
+def dump_result(value):
+    """Result (dicts, lists, numbers, strings and numeric arrays) as JSON bytes for the on-disk store."""
+    return json.dumps(value, default=_encode).encode()
+
+
+def load_result(data):
+    """Result from dump_result bytes. Only JSON is parsed, nothing is unpickled."""
+    return json.loads(data, object_hook=_decode)
+
+
+#------------Cache------------
+class ResultCache:
+    """
+    LRU cache of results by key, with an optional on-disk store (directory, one .json file per key).
+    Values are held pickled in memory (only ever values this process put there), so every get
+    returns a fresh copy that callers can change freely. Tuples in a result come back from the
+    on-disk store as lists.
+
+    stats() gives hits (memory or disk), misses, evictions and the hit rate.
+    """
+
+    def __init__(self, maxsize=1024, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        """Cached value for key (a copy), or None on a miss."""
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pickle.loads(data)
+        if self.directory is not None:
+            try:
+                with open(self._path(key), "rb") as f:
+                    value = load_result(f.read())
+            except (OSError, ValueError, TypeError, KeyError):
+                value = None  # Missing, damaged or not a result written by this cache
+            if value is not None:
+                self._remember(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._remember(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if self.directory is not None:
+            try:
+                data = dump_result(value)
+            except (TypeError, ValueError):
+                return  # Not storable as JSON, kept in memory only
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)  # Atomic, so concurrent processes never see a half written file
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def get_or_compute(self, key, compute):
+        """Cached value for key, or compute() (stored before it is returned) on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self, disk=False):
+        """Empty the memory cache and reset the statistics; with disk=True also delete the on-disk store."""
+        self._entries.clear()
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+        if disk and self.directory is not None and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith((".json", ".pkl")):  # .pkl from older versions
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_result_caches = {}
+
+
+def get_result_cache(directory=None, persistent=False):
+    """
+    Shared ResultCache for this process: memory only by default, or backed by directory (or
+    RESULT_CACHE_DIR with persistent=True).
+    """
+    if directory is None and persistent:
+        directory = RESULT_CACHE_DIR
+    cache = _result_caches.get(directory)
+    if cache is None:
+        cache = _result_caches[directory] = ResultCache(directory=directory)
+    return cache
+
+
+#------------Cached calculations------------
+def cached_pressure_drop(segments, density, viscosity, flow_rate_m3hr, friction_model="swamee_jain", cache=None):
+    """calculate_pressure_drop, answered from the result cache (get_result_cache() if cache is None) when it can be."""
+    cache = get_result_cache() if cache is None else cache
+    segments = list(segments) if not isinstance(segments, (list, SegmentArray)) else segments
+    key = cache_key("calculate_pressure_drop", normalize_segments(segments), density, viscosity, flow_rate_m3hr,
+                    friction_model)
+    return cache.get_or_compute(
+        key, lambda: calculate_pressure_drop(segments, density, viscosity, flow_rate_m3hr, friction_model))
+
+
+def cached_flow_curve(fluid_props, flow_min, flow_max, num_points, other_inputs, cache=None):
+    """run_flow_curve (the pump curve generator), answered from the result cache when it can be."""
+    # Imported on use, the pump curve script pulls in tkinter
+    from Centrifugal_Pump_Sizing_With_Curve import run_flow_curve
+    cache = get_result_cache() if cache is None else cache
+    key = cache_key("run_flow_curve", fluid_props, flow_min, flow_max, int(num_points), other_inputs)
+    return cache.get_or_compute(
+        key, lambda: run_flow_curve(fluid_props, flow_min, flow_max, num_points, other_inputs))
@@ -0,0 +1,95 @@
+# Stage Profiler
+# Built by Louis Walker, Process Engineer, 2025
+# Opt-in instrumentation for calculate_pressure_drop. When a profiler is active the calculation records
+# cumulative time and call counts for each stage of the segment loop:
+#   geometry        - pipe catalog lookup (ID, wall, roughness, NPS)
+#   friction_factor - velocity, Reynolds number and Darcy friction factor
+#   fittings        - the Crane fitting K functions and fitting / entrance / exit losses
+#   reducer         - reducer length lookup and contraction K between segments
+# When no profiler is active the only cost is one attribute read per calculate_pressure_drop call and
+# a None check per stage.
+#
+# Usage:
+#   with profile_stages() as prof:
+#       calculate_pressure_drop(segments, density, viscosity, flow_rate_m3hr)
+#   print(prof.report())
+
+from contextlib import contextmanager
+from time import perf_counter
+
+# The profiler calculate_pressure_drop reports to, None when profiling is off
+active = None
+
+
+class StageProfiler:
+    """Cumulative time (s) and call count per named stage."""
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+
+    def add(self, stage, seconds):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def lap(self, stage, start):
+        """Charge the time since start to stage and return the current time, for the next stage."""
+        now = perf_counter()
+        self.add(stage, now - start)
+        return now
+
+    def reset(self):
+        self.totals.clear()
+        self.counts.clear()
+
+    def summary(self):
+        """
+        Returns:
+            dict: "total_s" and "stages", {stage: {"calls", "total_s", "mean_s", "share"}}, slowest first
+        """
+        total = sum(self.totals.values())
+        stages = {}
+        for stage in sorted(self.totals, key=self.totals.get, reverse=True):
+            seconds = self.totals[stage]
+            calls = self.counts[stage]
+            stages[stage] = {
+                "calls": calls,
+                "total_s": seconds,
+                "mean_s": seconds / calls,
+                "share": seconds / total if total > 0 else 0.0,
+            }
+        return {"total_s": total, "stages": stages}
+
+    def report(self):
+        """Summary as a text table."""
+        summary = self.summary()
+        lines = [f"{'Stage':18s}{'Calls':>10s}{'Total (ms)':>14s}{'Mean (us)':>12s}{'Share':>8s}"]
+        for stage, stats in summary["stages"].items():
+            lines.append(f"{stage:18s}{stats['calls']:10d}{stats['total_s'] * 1e3:14.3f}"
+                         f"{stats['mean_s'] * 1e6:12.2f}{stats['share']:8.1%}")
+        lines.append(f"{'Total':18s}{'':10s}{summary['total_s'] * 1e3:14.3f}")
+        return "\n".join(lines)
+
+
+def enable(profiler=None):
+    """Start profiling into profiler (a new StageProfiler if not given) and return it."""
+    global active
+    active = StageProfiler() if profiler is None else profiler
+    return active
+
+
+def disable():
+    global active
+    active = None
+
+
+@contextmanager
+def profile_stages(profiler=None):
+    """Profile calculate_pressure_drop inside the with block; yields the StageProfiler."""
+    global active
+    previous = active
+    prof = enable(profiler)
+    try:
+        yield prof
+    finally:
+        active = previous
@@ -0,0 +1,95 @@
+# Variable Speed Drive Sweep
+# Built by Louis Walker, Process Engineer, 2025
+# Pump performance over a grid of speeds, by the affinity laws (Q ~ N, H ~ N^2, NPSHr ~ N^2 and the
+# efficiency carried over at corresponding points). The pump curve at every speed is a
+# pump_curve.PumpCurveSet row, so the whole speed x flow grid is evaluated as NumPy arrays, and the
+# operating point on the system curve at every speed is solved in one batch.
+#
+# Usage:
+#   system = run_flow_curve(fluid_props, 5, 150, 200, other_inputs)
+#   sweep = vsd_sweep(pump, system, density=998, required_flow_m3hr=85)
+#   sweep["brake_power_kW"]    (speeds x flows surface)
+#   sweep["operating"]["brake_power_kW"]    (at the operating point, one value per speed)
+
+import numpy as np
+from pump_curve import PumpCurveSet, solve_operating_points, g
+
+speed_ratio_range = (0.3, 1.0)  # Default sweep, fraction of the speed the pump curve was measured at
+num_speeds = 71
+
+
+def vsd_sweep(pump, system, speed_ratios=None, speeds_rpm=None, density=1000, required_flow_m3hr=None,
+              min_NPSH_margin=1.0):
+    """
+    Pump head, efficiency, power and NPSH margin over a speed x flow grid, and the operating point on
+    the system curve at each speed.
+
+    Args:
+        pump (PumpCurve): Pump curve at its rated speed
+        system (dict): A run_flow_curve result ("flow_rates", "pump_head", "NPSHA"); its flows are
+                       the flow axis of the grid
+        speed_ratios (array like): Speeds as a fraction of the rated speed. Default: num_speeds
+                                   points over speed_ratio_range
+        speeds_rpm (array like): Speeds in rpm instead of ratios (needs pump.speed_rpm)
+        density (float): kg/m3
+        required_flow_m3hr (float): Flow the drive must deliver, for "min_speed_for_flow"
+        min_NPSH_margin (float): Least NPSHa - NPSHr at the operating point, m
+
+    Returns:
+        dict:
+            "speed_ratio", "speed_rpm" (speeds,) and "flow_rates" (flows,)
+            "head_m", "efficiency", "brake_power_kW", "NPSHr_m", "NPSH_margin_m" (speeds x flows),
+                NaN beyond the end of the pump curve at that speed or where the head is not positive
+            "operating": solve_operating_points results, one value per speed
+            "min_speed_ratio": lowest speed with an operating point inside the pump curve (the pump
+                no longer overcomes the system's static head below it), NaN if none
+            "min_speed_for_flow": lowest speed delivering required_flow_m3hr with at least
+                min_NPSH_margin, NaN if none or if required_flow_m3hr is not given
+    """
+    if speeds_rpm is not None:
+        if pump.speed_rpm is None:
+            raise ValueError("Pump curve has no rated speed, give speed_ratios instead")
+        speed_ratios = np.asarray(speeds_rpm, dtype=float) / pump.speed_rpm
+    elif speed_ratios is None:
+        speed_ratios = np.linspace(*speed_ratio_range, num_speeds)
+    speed_ratios = np.asarray(speed_ratios, dtype=float)
+    curves = PumpCurveSet.affinity(pump, speed_ratios)
+
+    flows = np.asarray(system["flow_rates"], dtype=float)
+    NPSHA = system.get("NPSHA")
+    Q = np.broadcast_to(flows, (len(curves), flows.size))
+    head = curves.head(Q)
+    valid = (Q <= curves.flow_max[:, None]) & (head > 0)
+    head = np.where(valid, head, np.nan)
+    efficiency = np.where(valid, curves.efficiency(Q), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        brake_power_kW = density * g * (Q / 3600) * head / efficiency / 1000
+    NPSHr = np.where(valid, curves.NPSHr(Q), np.nan)
+    NPSH_margin = (np.asarray(NPSHA, dtype=float) - NPSHr) if NPSHA is not None else np.full(Q.shape, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        operating = solve_operating_points(curves, flows, system["pump_head"], NPSHA, density)
+    runs = operating["within_curve"] & (operating["flow_m3hr"] > 0)
+    min_speed_ratio = float(speed_ratios[runs].min()) if runs.any() else np.nan
+
+    min_speed_for_flow = np.nan
+    if required_flow_m3hr is not None:
+        margin = operating["NPSH_margin_m"]
+        delivers = (runs & (operating["flow_m3hr"] >= required_flow_m3hr)
+                    & (np.isnan(margin) | (margin >= min_NPSH_margin)))
+        if delivers.any():
+            min_speed_for_flow = float(speed_ratios[delivers].min())
+
+    return {
+        "speed_ratio": speed_ratios,
+        "speed_rpm": curves.speed_rpm,
+        "flow_rates": flows,
+        "head_m": head,
+        "efficiency": efficiency,
+        "brake_power_kW": brake_power_kW,
+        "NPSHr_m": NPSHr,
+        "NPSH_margin_m": NPSH_margin,
+        "operating": operating,
+        "min_speed_ratio": min_speed_ratio,
+        "min_speed_for_flow": min_speed_for_flow,
+    }